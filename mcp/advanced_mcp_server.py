@@ -5,36 +5,571 @@
 """
 
 import asyncio
+import base64
+import contextlib
+import functools
+import io
 import json
 import logging
 import os
+import queue
+import re
 import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TextIO
 from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
 
-from mcp.server import Server
+try:
+    import fcntl
+except ImportError:  # Windows 没有 flock，只用进程内的线程锁
+    fcntl = None
+
+from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import (
-    CallToolResult, ListToolsResult, Tool, Resource,
-    ReadResourceResult, WriteResourceResult, ListResourcesResult
+    CallToolResult, ListToolsResult, Resource,
+    ReadResourceResult, ListResourcesResult
+)
+
+from expression import ExpressionError, evaluate, evaluate_batch, evaluate_many
+from http_transport import (
+    DEFAULT_HTTP_HOST, DEFAULT_HTTP_PORT, WORKER_INDEX_ENV, parse_transport_args, serve_http, serve_workers,
 )
+from metrics import METRICS_PORT, Metrics, OperationGroup, serve_prometheus
+from profiler import ToolProfiler, register_profiling_tool
+from renderer import OUTPUT_FORMATS, Field, ListRenderer, join_list, or_default, truncate
+from result_cache import ResultCache, normalize_arguments
+from tool_registry import ToolRegistry
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# SQLite 连接参数，每个连接建立时只设置一次
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("MCP_SQLITE_CACHE_KB", 64 * 1024))
+SQLITE_MMAP_SIZE = int(os.environ.get("MCP_SQLITE_MMAP_BYTES", 256 * 1024 * 1024))
+DB_EXECUTOR_WORKERS = int(os.environ.get("MCP_DB_WORKERS", 4))
+# 写锁被其他连接（或其他工作进程）持有时的最长等待时间
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("MCP_SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+# 组提交参数：在窗口时间内或凑满 N 行后合并成一个事务提交
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get("MCP_GROUP_COMMIT_WINDOW_MS", 2))
+GROUP_COMMIT_MAX_ROWS = int(os.environ.get("MCP_GROUP_COMMIT_MAX_ROWS", 128))
+
+INSERT_NOTE_SQL = 'INSERT INTO notes (title, content, tags) VALUES (?, ?, ?)'
+INSERT_TASK_SQL = (
+    'INSERT INTO tasks (title, description, priority, due_date, due_at, priority_rank) VALUES (?, ?, ?, ?, ?, ?)'
+)
+
+# 优先级排序：数值越小越靠前，未知优先级排在最后
+PRIORITY_RANKS = {"high": 0, "medium": 1, "low": 2}
+UNKNOWN_PRIORITY_RANK = len(PRIORITY_RANKS)
+# 按优先级排序时没有截止日期的任务排在同优先级的最后
+NO_DUE_SORT_KEY = 2 ** 63 - 1
+# list_upcoming_tasks 的时间窗口单位（秒）
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+DEFAULT_UPCOMING_WINDOW = "7d"
+
+# 分页参数
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+RESOURCE_PAGE_SIZE = 1000
+
+# 结构迁移，按顺序执行；PRAGMA user_version 记录已执行到第几个
+MIGRATIONS: List[List[str]] = [
+    # 1: 覆盖 list_tasks / list_notes 过滤与排序路径的索引
+    [
+        'CREATE INDEX IF NOT EXISTS idx_tasks_status_priority_created ON tasks (status, priority, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_priority_created ON tasks (priority, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_notes_created ON notes (created_at)',
+    ],
+    # 2: 笔记全文索引（外部内容 FTS5 表，由触发器保持同步）
+    [
+        '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                title, content, tags,
+                content='notes', content_rowid='id', tokenize='trigram'
+            )
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+                INSERT INTO notes_fts (rowid, title, content, tags)
+                VALUES (new.id, new.title, new.content, new.tags);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, title, content, tags)
+                VALUES ('delete', old.id, old.title, old.content, old.tags);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE ON notes BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, title, content, tags)
+                VALUES ('delete', old.id, old.title, old.content, old.tags);
+                INSERT INTO notes_fts (rowid, title, content, tags)
+                VALUES (new.id, new.title, new.content, new.tags);
+            END
+        ''',
+        # 标题权重最高，其次是标签
+        "INSERT INTO notes_fts (notes_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+        "INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')",
+    ],
+    # 3: 规范化的标签表，从 notes.tags 的 JSON 迁移，并由触发器保持同步
+    [
+        '''
+            CREATE TABLE IF NOT EXISTS note_tags (
+                note_id INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (note_id, tag)
+            ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_note_tags_tag ON note_tags (tag, note_id)',
+        '''
+            INSERT OR IGNORE INTO note_tags (note_id, tag)
+            SELECT notes.id, json_each.value FROM notes, json_each(notes.tags)
+            WHERE json_valid(notes.tags)
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS note_tags_insert AFTER INSERT ON notes
+            WHEN json_valid(new.tags) BEGIN
+                INSERT OR IGNORE INTO note_tags (note_id, tag)
+                SELECT new.id, value FROM json_each(new.tags);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS note_tags_delete AFTER DELETE ON notes BEGIN
+                DELETE FROM note_tags WHERE note_id = old.id;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS note_tags_update AFTER UPDATE OF tags ON notes BEGIN
+                DELETE FROM note_tags WHERE note_id = old.id;
+                INSERT OR IGNORE INTO note_tags (note_id, tag)
+                SELECT new.id, value FROM json_each(new.tags) WHERE json_valid(new.tags);
+            END
+        ''',
+    ],
+    # 4: 截止时刻 (Unix 时间戳) 和优先级序号，支持逾期/即将到期的范围扫描和按优先级排序
+    [
+        'ALTER TABLE tasks ADD COLUMN due_at INTEGER',
+        'ALTER TABLE tasks ADD COLUMN priority_rank INTEGER',
+        'UPDATE tasks SET priority_rank = CASE priority '
+        + ' '.join(f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANKS.items())
+        + f' ELSE {UNKNOWN_PRIORITY_RANK} END',
+        # 与 parse_due_date 一致：只有日期时截止到当天 23:59:59，没有时区的时间按本地时区；无法解析的保持为空
+        '''
+            UPDATE tasks SET due_at = CAST(CASE
+                WHEN due_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+                    THEN strftime('%s', due_date, '+1 day', '-1 second', 'utc')
+                WHEN due_date GLOB '*[+-][0-9][0-9]:[0-9][0-9]' OR due_date GLOB '*Z'
+                    THEN strftime('%s', due_date)
+                ELSE strftime('%s', due_date, 'utc')
+            END AS INTEGER)
+            WHERE due_date IS NOT NULL AND due_date != ''
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks (status, due_at)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_status_rank_due '
+        f'ON tasks (status, priority_rank, ifnull(due_at, {NO_DUE_SORT_KEY}))',
+    ],
+]
+
+TAG_MODES = ("any", "all")
+
+# data:// 资源的输出格式：json 为缩进格式，compact 去掉空白，ndjson 每行一条记录
+RESOURCE_FORMATS = ("json", "compact", "ndjson")
+_compact_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_pretty_encoder = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+# 列表查询可选择的字段（按输出顺序）、可截断的文本字段和分页游标需要的列
+NOTE_COLUMNS = ("id", "title", "content", "tags", "created_at")
+NOTE_TEXT_COLUMNS = ("title", "content")
+TASK_COLUMNS = ("id", "title", "description", "priority", "status", "due_date", "created_at")
+TASK_TEXT_COLUMNS = ("title", "description")
+CURSOR_COLUMNS = ("id", "created_at")
+DUE_CURSOR_COLUMNS = ("id", "due_at")
+PRIORITY_CURSOR_COLUMNS = ("id", "priority_rank", "due_at")
+TRUNCATION_MARK = "…"
+
+# trigram 分词要求每个搜索词至少 3 个字符，更短的词退回 LIKE 扫描（只能按时间倒序）
+FTS_MIN_TERM_LENGTH = 3
+# relevance 按 bm25 排序，recent 按 (created_at, id) 倒序
+SEARCH_SORTS = ("relevance", "recent")
+# 按时间排序时 FTS 需要取出全部匹配再排序，代价随匹配数增长；
+# 按时间倒序的 LIKE 扫描命中越多越早凑满一页。匹配数达到该值时改用 LIKE 扫描
+FTS_MAX_MATCHES = int(os.environ.get("MCP_FTS_MAX_MATCHES", 1000))
+# LIKE 路径的摘要在第一个命中前后各保留的字符数
+SNIPPET_CONTEXT = 16
+
+SEARCH_COLUMNS = ("id", "title", "snippet", "score", "created_at")
+
+def encode_token(value: Any) -> str:
+    """把任意 JSON 值编码为不透明的分页游标"""
+    raw = json.dumps(value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_token(token: str) -> Any:
+    """解码 encode_token 生成的分页游标"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError as e:
+        raise ValueError(f"无效的分页游标: {token}") from e
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    """把 (created_at, id) 编码为不透明的分页游标"""
+    return encode_token([created_at, row_id])
+
+def decode_cursor(token: str) -> tuple:
+    """解码分页游标，返回 (created_at, id)"""
+    try:
+        created_at, row_id = decode_token(token)
+        return created_at, int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的分页游标: {token}") from e
+
+def decode_key_cursor(token: str, length: int) -> List[int]:
+    """解码由整数排序键组成的分页游标（最后一项为 id）"""
+    try:
+        keys = [int(key) for key in decode_token(token)]
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的分页游标: {token}") from e
+    if len(keys) != length:
+        raise ValueError(f"无效的分页游标: {token}")
+    return keys
+
+def decode_rank_cursor(token: str) -> tuple:
+    """解码按相关度分页的游标，返回 (rank, id)"""
+    try:
+        rank, row_id = decode_token(token)
+        return float(rank), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的分页游标: {token}") from e
+
+def fts_query(terms: List[str]) -> str:
+    """把搜索词转成 FTS5 短语查询，各词之间为 AND 关系"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def clamp_page_size(limit: Any, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """把分页大小限制在 1 到 MAX_PAGE_SIZE 之间"""
+    if limit is None:
+        return default
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+class Projection:
+    """列表查询的字段投影、逐字段截断和字节预算
+
+    fields 决定 SELECT 读取哪些列：分页游标所需的列（默认 id、created_at）总会读取，未请求时不输出；
+    truncate 为 {字段: 最大字符数}，在 SQL 中只取前 N+1 个字符，超出的截断并追加省略号；
+    max_bytes 限制一页条目的 JSON 编码字节数（不含外层结构），超出时提前结束本页并返回游标。
+    """
+    
+    def __init__(self, columns: Sequence[str], text_columns: Sequence[str], json_columns: Sequence[str] = (),
+                 fields: List[str] = None, truncate: Dict[str, int] = None, max_bytes: int = None,
+                 cursor_columns: Sequence[str] = None):
+        if fields:
+            unknown = [field for field in fields if field not in columns]
+            if unknown:
+                raise ValueError(f"未知字段: {', '.join(unknown)}")
+            self.fields = [column for column in columns if column in fields]
+        else:
+            self.fields = list(columns)
+        cursor_columns = cursor_columns or CURSOR_COLUMNS
+        self.columns = [column for column in columns if column in self.fields or column in cursor_columns]
+        self.columns += [column for column in cursor_columns if column not in self.columns]
+        self.hidden = [column for column in self.columns if column not in self.fields]
+        
+        self.limits = {}
+        for field, length in (truncate or {}).items():
+            if field not in text_columns:
+                raise ValueError(f"不能截断的字段: {field}")
+            if field in self.fields:
+                self.limits[field] = max(1, int(length))
+        self.json_columns = [column for column in json_columns if column in self.columns]
+        self.max_bytes = max_bytes
+        self.select = ", ".join(
+            f"substr({column}, 1, {self.limits[column] + 1}) AS {column}" if column in self.limits else column
+            for column in self.columns
+        )
+    
+    def row(self, values: Sequence[Any]) -> Dict[str, Any]:
+        """把查询结果的一行转成字典，截断超长字段并解码 JSON 列"""
+        row = dict(zip(self.columns, values))
+        for column, length in self.limits.items():
+            value = row[column]
+            if value is not None and len(value) > length:
+                row[column] = value[:length] + TRUNCATION_MARK
+        for column in self.json_columns:
+            row[column] = json.loads(row[column]) if row[column] else []
+        return row
+    
+    def output(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """去掉只为分页读取的列"""
+        if not self.hidden:
+            return row
+        return {field: row[field] for field in self.fields}
+
+def note_projection(fields: List[str] = None, truncate: Dict[str, int] = None,
+                    max_bytes: int = None) -> Projection:
+    return Projection(NOTE_COLUMNS, NOTE_TEXT_COLUMNS, ("tags",), fields, truncate, max_bytes)
+
+def task_projection(fields: List[str] = None, truncate: Dict[str, int] = None,
+                    max_bytes: int = None, cursor_columns: Sequence[str] = None) -> Projection:
+    return Projection(TASK_COLUMNS, TASK_TEXT_COLUMNS, (), fields, truncate, max_bytes, cursor_columns)
+
+def created_cursor(row: Dict[str, Any]) -> str:
+    return encode_cursor(row['created_at'], row['id'])
+
+def rank_cursor(row: Dict[str, Any]) -> str:
+    return encode_token([row['score'], row['id']])
+
+def like_snippet(content: str, terms: List[str]) -> str:
+    """截取内容中第一个命中附近的文字并用 [] 标出搜索词，格式与 FTS 的 snippet() 一致"""
+    pattern = re.compile("|".join(map(re.escape, terms)), re.IGNORECASE)
+    match = pattern.search(content)
+    start = max(0, match.start() - SNIPPET_CONTEXT) if match else 0
+    end = (match.end() if match else 0) + SNIPPET_CONTEXT
+    snippet = pattern.sub(lambda m: f"[{m.group()}]", content[start:end])
+    return ("…" if start else "") + snippet + ("…" if end < len(content) else "")
+
+def due_cursor(row: Dict[str, Any]) -> str:
+    return encode_token([row['due_at'], row['id']])
+
+def priority_sort_key(row: Dict[str, Any]) -> tuple:
+    """与 idx_tasks_status_rank_due 一致的排序键"""
+    due_at = row['due_at']
+    return row['priority_rank'], NO_DUE_SORT_KEY if due_at is None else due_at, row['id']
+
+def priority_cursor(row: Dict[str, Any]) -> str:
+    return encode_token(list(priority_sort_key(row)))
+
+class Page:
+    """从多取一行的查询结果中截取一页
+
+    最多 limit 行；投影设置了 max_bytes 时累计每行的 JSON 编码字节数，超出预算时提前结束
+    （至少返回一行）。迭代结束后 next_cursor 指向本页最后一行（由 cursor 生成，默认按
+    created_at、id），没有更多数据时为 None。
+    """
+    
+    def __init__(self, rows: Iterator[Dict], limit: int, projection: Projection = None,
+                 cursor: Callable[[Dict], str] = created_cursor):
+        self.rows = rows
+        self.limit = limit
+        self.projection = projection
+        self.cursor = cursor
+        self.next_cursor: Optional[str] = None
+    
+    def __iter__(self) -> Iterator[Dict]:
+        output = self.projection.output if self.projection else None
+        max_bytes = self.projection.max_bytes if self.projection else None
+        count = 0
+        used = 0
+        last = None
+        for row in self.rows:
+            if count == self.limit:
+                self.next_cursor = self.cursor(last)
+                break
+            item = output(row) if output else row
+            if max_bytes:
+                used += len(_compact_encoder.encode(item).encode())
+                if count and used > max_bytes:
+                    self.next_cursor = self.cursor(last)
+                    break
+            yield item
+            count += 1
+            last = row
+
+def write_rows(out: TextIO, rows: Iterator[Dict], limit: int, fmt: str = "json",
+               projection: Projection = None) -> Optional[str]:
+    """把一页（最多 limit 行，不超过投影的字节预算）逐行序列化写入 out，返回下一页游标
+
+    rows 应比 limit 多提供一行，用于判断是否还有下一页。每行序列化后即可释放，不会同时持有
+    整页的行对象；但输出文本仍全部写入 out，峰值内存与整页输出大小成正比。
+    json/compact 输出 {"items": [...], "next_cursor": ...}，
+    ndjson 每行一条记录，最后一行为 {"next_cursor": ...}。
+    """
+    if fmt not in RESOURCE_FORMATS:
+        raise ValueError(f"未知的输出格式: {fmt}")
+    
+    page = Page(rows, limit, projection)
+    count = 0
+    for row in page:
+        if fmt == "ndjson":
+            out.write(_compact_encoder.encode(row))
+            out.write("\n")
+        elif fmt == "compact":
+            out.write(',' if count else '{"items":[')
+            out.write(_compact_encoder.encode(row))
+        else:
+            out.write(',\n    ' if count else '{\n  "items": [\n    ')
+            out.write(_pretty_encoder.encode(row).replace("\n", "\n    "))
+        count += 1
+    
+    next_cursor = page.next_cursor
+    if fmt == "ndjson":
+        out.write(_compact_encoder.encode({"next_cursor": next_cursor}))
+        out.write("\n")
+    elif fmt == "compact":
+        out.write('],' if count else '{"items":[],')
+        out.write(f'"next_cursor":{_compact_encoder.encode(next_cursor)}}}')
+    else:
+        out.write('\n  ],\n' if count else '{\n  "items": [],\n')
+        out.write(f'  "next_cursor": {_pretty_encoder.encode(next_cursor)}\n}}')
+    return next_cursor
+
+def note_params(title: str, content: str, tags: List[str] = None) -> tuple:
+    """构造笔记插入参数"""
+    return (title, content, json.dumps(tags or [], ensure_ascii=False))
+
+def parse_due_date(value: Optional[str]) -> tuple:
+    """校验并规范化截止日期，返回 (ISO 文本, 截止时刻的 Unix 时间戳)
+
+    只有日期 (YYYY-MM-DD) 时截止到当天 23:59:59；没有时区的时间按服务器本地时区解释。
+    空值返回 (None, None)，无法解析时抛出 ValueError。
+    """
+    if not value:
+        return None, None
+    try:
+        if len(value) == 10:
+            day = datetime.strptime(value, "%Y-%m-%d")
+            return day.date().isoformat(), int(day.replace(hour=23, minute=59, second=59).timestamp())
+        # Python 3.11 之前 fromisoformat 不接受 Z 后缀
+        moment = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError as e:
+        raise ValueError(f"无效的截止日期: {value} (应为 YYYY-MM-DD 或 ISO 8601 时间)") from e
+    return moment.isoformat(), int(moment.timestamp())
+
+def parse_window(value: str) -> int:
+    """把 30m / 12h / 7d / 2w 形式的时间窗口转成秒数"""
+    unit = WINDOW_UNITS.get(value[-1:])
+    try:
+        amount = float(value[:-1])
+    except ValueError:
+        amount = -1
+    if unit is None or amount <= 0:
+        raise ValueError(f"无效的时间窗口: {value} (应为数字加单位 m/h/d/w，如 7d)")
+    return int(amount * unit)
+
+def task_params(title: str, description: str = "", priority: str = "medium",
+                due_date: str = None) -> tuple:
+    """构造任务插入参数，截止日期规范化并计算截止时刻"""
+    due_date, due_at = parse_due_date(due_date)
+    return (title, description, priority, due_date, due_at, PRIORITY_RANKS.get(priority, UNKNOWN_PRIORITY_RANK))
+
+class WriteLock:
+    """写锁：进程内用线程锁，跨进程用锁文件上的 flock
+
+    多个工作进程共享同一个数据库时，写事务先在这里排队，拿到锁后再
+    BEGIN IMMEDIATE，不必靠 SQLite 忙等重试（退避睡眠会拉高尾延迟）。
+    锁文件按进程打开：flock 跟随打开的文件描述，fork 继承的描述符不能用来互斥。
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+        self._pid = None
+    
+    def _lock_file(self):
+        if self._pid != os.getpid():
+            self._file = open(self.path, "a+b")
+            self._pid = os.getpid()
+        return self._file
+    
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file(), fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        return self
+    
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._thread_lock.release()
+    
+    def close(self):
+        """关闭本进程的锁文件（fork 前调用）"""
+        with self._thread_lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+            self._pid = None
+
 class DatabaseManager:
-    """数据库管理器"""
+    """数据库管理器
+
+    每个工作线程持有一个长连接，首次使用时创建并完成 PRAGMA 配置，
+    之后的调用直接复用，避免每次调用都重新建立连接和冷启动页缓存。
+    """
     
-    def __init__(self, db_path: str = "mcp_data.db"):
+    def __init__(self, db_path: str = "mcp_data.db",
+                 cache_size_kb: int = SQLITE_CACHE_SIZE_KB,
+                 mmap_size: int = SQLITE_MMAP_SIZE):
         self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.write_lock = WriteLock(db_path + ".write-lock")
         self.init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """创建并配置一个新连接"""
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的长连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """关闭所有线程的连接；SQLite 连接不能跨 fork 使用，多进程模式在派生前调用"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+        self.write_lock.close()
+    
+    @contextlib.contextmanager
+    def write_transaction(self) -> Iterator[sqlite3.Connection]:
+        """持有写锁执行一个 BEGIN IMMEDIATE 写事务，正常退出时提交，异常时回滚"""
+        conn = self.get_connection()
+        with self.write_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+    
     def init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         # 创建笔记表
@@ -73,246 +608,697 @@ class DatabaseManager:
         ''')
         
         conn.commit()
-        conn.close()
+        self.migrate()
+    
+    def migrate(self):
+        """执行尚未应用的结构迁移"""
+        conn = self.get_connection()
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+            return
+        
+        with self.write_transaction() as conn:
+            # 拿到写锁后重新读取版本：同时启动的其他进程可能已经完成迁移
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {target}')
+                logger.info(f"数据库结构已迁移到版本 {target}")
     
     def add_note(self, title: str, content: str, tags: List[str] = None) -> int:
         """添加笔记"""
-        conn = sqlite3.connect(self.db_path)
+        with self.write_transaction() as conn:
+            return conn.execute(INSERT_NOTE_SQL, note_params(title, content, tags)).lastrowid
+    
+    def add_notes(self, notes: List[Dict]) -> List[int]:
+        """批量添加笔记，一个事务内 executemany"""
+        return self._insert_many(
+            INSERT_NOTE_SQL,
+            [note_params(n.get("title", ""), n.get("content", ""), n.get("tags")) for n in notes]
+        )
+    
+    def _insert_many(self, sql: str, rows: List[tuple]) -> List[int]:
+        """在一个事务中批量插入，返回每行的ID"""
+        if not rows:
+            return []
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(sql, rows)
+            # 同一写事务内 AUTOINCREMENT 分配的ID是连续的
+            last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    
+    def build_notes_query(self, after: str = None, limit: int = None,
+                          tags: List[str] = None, tag_mode: str = "any", select: str = None) -> tuple:
+        """构造笔记列表查询，按 (created_at, id) 倒序键集分页，返回 (SQL, 参数)
+
+        tags 不为空时按标签过滤：any 表示包含任意一个标签，all 表示包含全部标签；
+        select 为读取的列表达式，默认全部列。
+        """
+        query = f'SELECT {select or ", ".join(NOTE_COLUMNS)} FROM notes'
+        params = []
+        conditions = []
+        
+        if tags:
+            if tag_mode not in TAG_MODES:
+                raise ValueError(f"未知的标签匹配方式: {tag_mode}")
+            tags = list(dict.fromkeys(tags))
+            placeholders = ', '.join('?' * len(tags))
+            subquery = f'SELECT note_id FROM note_tags WHERE tag IN ({placeholders})'
+            params.extend(tags)
+            if tag_mode == "all" and len(tags) > 1:
+                subquery += ' GROUP BY note_id HAVING count(*) = ?'
+                params.append(len(tags))
+            conditions.append(f'id IN ({subquery})')
+        if after:
+            conditions.append('(created_at, id) < (?, ?)')
+            params.extend(decode_cursor(after))
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        
+        query += ' ORDER BY created_at DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    def iter_notes(self, limit: int = None, after: str = None,
+                   tags: List[str] = None, tag_mode: str = "any", projection: Projection = None) -> Iterator[Dict]:
+        """逐行读取笔记，不一次性取出全部结果；projection 决定读取的列和截断方式"""
+        projection = projection or note_projection()
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        tags_str = json.dumps(tags or [])
-        cursor.execute(
-            'INSERT INTO notes (title, content, tags) VALUES (?, ?, ?)',
-            (title, content, tags_str)
-        )
-        note_id = cursor.lastrowid
+        query, params = self.build_notes_query(after, limit, tags, tag_mode, projection.select)
+        cursor.execute(query, params)
         
-        conn.commit()
-        conn.close()
-        return note_id
+        for row in cursor:
+            yield projection.row(row)
+    
+    def get_notes_page(self, limit: int = 10, after: str = None,
+                       tags: List[str] = None, tag_mode: str = "any", projection: Projection = None) -> tuple:
+        """获取一页笔记，返回 (笔记列表, 下一页游标)"""
+        projection = projection or note_projection()
+        return self._page(self.iter_notes(limit + 1, after, tags, tag_mode, projection), limit, projection)
+    
+    def write_notes_page(self, out: TextIO, limit: int = RESOURCE_PAGE_SIZE, after: str = None,
+                         tags: List[str] = None, tag_mode: str = "any", fmt: str = "json",
+                         projection: Projection = None) -> Optional[str]:
+        """把一页笔记流式序列化写入 out，返回下一页游标"""
+        projection = projection or note_projection()
+        return write_rows(out, self.iter_notes(limit + 1, after, tags, tag_mode, projection), limit, fmt, projection)
     
-    def get_notes(self, limit: int = 10) -> List[Dict]:
+    def get_notes(self, limit: int = 10, after: str = None,
+                  tags: List[str] = None, tag_mode: str = "any") -> List[Dict]:
         """获取笔记列表"""
-        conn = sqlite3.connect(self.db_path)
+        return self.get_notes_page(limit, after, tags, tag_mode)[0]
+    
+    def get_tag_facets(self, limit: int = 50) -> List[Dict]:
+        """统计每个标签的笔记数量，按数量倒序"""
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute(
-            'SELECT id, title, content, tags, created_at FROM notes ORDER BY created_at DESC LIMIT ?',
+            'SELECT tag, count(*) AS notes FROM note_tags GROUP BY tag ORDER BY notes DESC, tag LIMIT ?',
             (limit,)
         )
+        return [{'tag': row[0], 'count': row[1]} for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _page(rows: Iterator[Dict], limit: int, projection: Projection,
+              cursor: Callable[[Dict], str] = created_cursor) -> tuple:
+        """截取一页，有剩余时生成指向本页最后一行的游标"""
+        page = Page(rows, limit, projection, cursor)
+        items = list(page)
+        return items, page.next_cursor
+    
+    def search_notes(self, query: str, limit: int = 10, after: str = None,
+                     sort: str = "relevance") -> tuple:
+        """全文搜索笔记，键集分页，返回 (结果列表, 下一页游标)
+
+        relevance 按 bm25 相关度 (rank, id) 排序；搜索词短于 FTS_MIN_TERM_LENGTH 时无法使用
+        FTS 索引，退回按时间倒序的 LIKE 扫描。recent 按 (created_at, id) 倒序：匹配数少于
+        FTS_MAX_MATCHES 时走 FTS 索引，否则沿 created_at 索引做 LIKE 扫描，两条路径的游标通用。
+        LIKE 路径的结果没有相关度（score 为 None），摘要在 Python 中截取。
+        """
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"未知的排序方式: {sort}")
+        terms = query.split()
+        if not terms:
+            return [], None
         
-        notes = []
-        for row in cursor.fetchall():
-            note = {
-                'id': row[0],
-                'title': row[1],
-                'content': row[2],
-                'tags': json.loads(row[3]) if row[3] else [],
-                'created_at': row[4]
-            }
-            notes.append(note)
+        conn = self.get_connection()
+        if all(len(term) >= FTS_MIN_TERM_LENGTH for term in terms) and (
+                sort == "relevance" or self.count_fts_matches(terms, FTS_MAX_MATCHES) < FTS_MAX_MATCHES):
+            sql, params = self.build_fts_search_query(terms, after, limit + 1, sort)
+            rows = (dict(zip(SEARCH_COLUMNS, row)) for row in conn.execute(sql, params))
+            return self._page(rows, limit, None, rank_cursor if sort == "relevance" else created_cursor)
         
-        conn.close()
-        return notes
+        sql, params = self.build_like_search_query(terms, after, limit + 1)
+        rows = (
+            {'id': row[0], 'title': row[1], 'snippet': like_snippet(row[2], terms),
+             'score': None, 'created_at': row[3]}
+            for row in conn.execute(sql, params)
+        )
+        return self._page(rows, limit, None)
+    
+    def count_fts_matches(self, terms: List[str], cap: int) -> int:
+        """FTS 匹配的笔记数，最多数到 cap 为止（只遍历倒排列表，不计算相关度）"""
+        return self.get_connection().execute(
+            'SELECT count(*) FROM (SELECT 1 FROM notes_fts WHERE notes_fts MATCH ? LIMIT ?)',
+            (fts_query(terms), cap)
+        ).fetchone()[0]
+    
+    def build_fts_search_query(self, terms: List[str], after: str = None, limit: int = None,
+                               sort: str = "relevance") -> tuple:
+        """构造 FTS 搜索查询，按 (rank, id) 升序或 (created_at, id) 倒序键集分页，返回 (SQL, 参数)"""
+        query = (
+            "SELECT n.id, n.title, snippet(notes_fts, 1, '[', ']', '…', 16), notes_fts.rank, n.created_at "
+            "FROM notes_fts JOIN notes AS n ON n.id = notes_fts.rowid WHERE notes_fts MATCH ?"
+        )
+        params: List[Any] = [fts_query(terms)]
+        if sort == "relevance":
+            if after:
+                query += ' AND (notes_fts.rank, n.id) > (?, ?)'
+                params.extend(decode_rank_cursor(after))
+            query += ' ORDER BY notes_fts.rank, n.id'
+        else:
+            if after:
+                query += ' AND (n.created_at, n.id) < (?, ?)'
+                params.extend(decode_cursor(after))
+            query += ' ORDER BY n.created_at DESC, n.id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    def build_like_search_query(self, terms: List[str], after: str = None, limit: int = None) -> tuple:
+        """构造 LIKE 扫描搜索查询，按 (created_at, id) 倒序键集分页，返回 (SQL, 参数)"""
+        query = 'SELECT id, title, content, created_at FROM notes'
+        params: List[Any] = []
+        conditions = []
+        
+        for term in terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append(
+                "(title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\' OR tags LIKE ? ESCAPE '\\')"
+            )
+            params.extend([pattern] * 3)
+        if after:
+            conditions.append('(created_at, id) < (?, ?)')
+            params.extend(decode_cursor(after))
+        query += ' WHERE ' + ' AND '.join(conditions)
+        
+        query += ' ORDER BY created_at DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
     
     def add_task(self, title: str, description: str = "", priority: str = "medium", 
                  due_date: str = None) -> int:
         """添加任务"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'INSERT INTO tasks (title, description, priority, due_date) VALUES (?, ?, ?, ?)',
-            (title, description, priority, due_date)
+        with self.write_transaction() as conn:
+            return conn.execute(INSERT_TASK_SQL, task_params(title, description, priority, due_date)).lastrowid
+    
+    def add_tasks(self, tasks: List[Dict]) -> List[int]:
+        """批量添加任务，一个事务内 executemany"""
+        return self._insert_many(
+            INSERT_TASK_SQL,
+            [task_params(t.get("title", ""), t.get("description", ""),
+                         t.get("priority", "medium"), t.get("due_date")) for t in tasks]
         )
-        task_id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
-        return task_id
     
-    def get_tasks(self, status: str = None, priority: str = None) -> List[Dict]:
-        """获取任务列表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = 'SELECT id, title, description, priority, status, due_date, created_at FROM tasks'
+    def build_tasks_query(self, status: str = None, priority: str = None,
+                          after: str = None, limit: int = None, select: str = None) -> tuple:
+        """构造任务列表查询，按 (created_at, id) 倒序键集分页，返回 (SQL, 参数)
+
+        select 为读取的列表达式，默认全部列。
+        """
+        query = f'SELECT {select or ", ".join(TASK_COLUMNS)} FROM tasks'
         params = []
+        conditions = []
         
-        if status or priority:
-            conditions = []
-            if status:
-                conditions.append('status = ?')
-                params.append(status)
-            if priority:
-                conditions.append('priority = ?')
-                params.append(priority)
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        if priority:
+            conditions.append('priority = ?')
+            params.append(priority)
+        if after:
+            conditions.append('(created_at, id) < (?, ?)')
+            params.extend(decode_cursor(after))
+        if conditions:
             query += ' WHERE ' + ' AND '.join(conditions)
         
-        query += ' ORDER BY created_at DESC'
+        query += ' ORDER BY created_at DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    def explain(self, query: str, params: List[Any] = ()) -> List[str]:
+        """返回查询计划的描述行"""
+        conn = self.get_connection()
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+    
+    def get_tasks_page(self, status: str = None, priority: str = None,
+                       limit: int = DEFAULT_PAGE_SIZE, after: str = None, projection: Projection = None) -> tuple:
+        """获取一页任务，返回 (任务列表, 下一页游标)"""
+        projection = projection or task_projection()
+        return self._page(self.iter_tasks(status, priority, limit + 1, after, projection), limit, projection)
+    
+    def write_tasks_page(self, out: TextIO, status: str = None, priority: str = None,
+                         limit: int = RESOURCE_PAGE_SIZE, after: str = None, fmt: str = "json",
+                         projection: Projection = None) -> Optional[str]:
+        """把一页任务流式序列化写入 out，返回下一页游标"""
+        projection = projection or task_projection()
+        return write_rows(out, self.iter_tasks(status, priority, limit + 1, after, projection), limit, fmt, projection)
+    
+    def iter_tasks(self, status: str = None, priority: str = None,
+                   limit: int = None, after: str = None, projection: Projection = None) -> Iterator[Dict]:
+        """逐行读取任务，不一次性取出全部结果；projection 决定读取的列和截断方式"""
+        projection = projection or task_projection()
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
+        query, params = self.build_tasks_query(status, priority, after, limit, projection.select)
         cursor.execute(query, params)
         
-        tasks = []
-        for row in cursor.fetchall():
-            task = {
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'priority': row[3],
-                'status': row[4],
-                'due_date': row[5],
-                'created_at': row[6]
-            }
-            tasks.append(task)
-        
-        conn.close()
-        return tasks
+        for row in cursor:
+            yield projection.row(row)
+    
+    def get_tasks(self, status: str = None, priority: str = None,
+                  limit: int = None, after: str = None) -> List[Dict]:
+        """获取任务列表"""
+        return list(self.iter_tasks(status, priority, limit, after))
+    
+    def build_due_tasks_query(self, due_before: int, due_from: int = None, after: str = None,
+                              limit: int = None, select: str = None) -> tuple:
+        """构造按截止时刻的范围查询：待完成且 due_from <= due_at < due_before，按 (due_at, id) 升序键集分页"""
+        query = f'SELECT {select or ", ".join(TASK_COLUMNS)} FROM tasks'
+        conditions = ["status = 'pending'", 'due_at < ?']
+        params: List[Any] = [due_before]
+        if due_from is not None:
+            conditions.append('due_at >= ?')
+            params.append(due_from)
+        if after:
+            conditions.append('(due_at, id) > (?, ?)')
+            params.extend(decode_key_cursor(after, 2))
+        query += ' WHERE ' + ' AND '.join(conditions) + ' ORDER BY due_at, id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    def get_due_tasks_page(self, due_before: int, due_from: int = None, limit: int = DEFAULT_PAGE_SIZE,
+                           after: str = None, projection: Projection = None) -> tuple:
+        """获取一页截止时刻在范围内的待完成任务，返回 (任务列表, 下一页游标)"""
+        projection = projection or task_projection(cursor_columns=DUE_CURSOR_COLUMNS)
+        query, params = self.build_due_tasks_query(due_before, due_from, after, limit + 1, projection.select)
+        rows = map(projection.row, self.get_connection().execute(query, params))
+        return self._page(rows, limit, projection, due_cursor)
+    
+    def build_priority_tasks_query(self, status: str = "pending", after: str = None, limit: int = None,
+                                   select: str = None, next_ranks: bool = False) -> tuple:
+        """构造按优先级、截止时刻排序的任务查询（由 idx_tasks_status_rank_due 提供顺序），返回 (SQL, 参数)
+
+        有游标时分两段：默认是游标所在优先级内的后续任务，next_ranks=True 时是更低优先级的任务。
+        SQLite 对行值比较只用索引的第一列定位，拆开后两段都能直接定位到起点，不必扫描同优先级中已读过的行。
+        """
+        due_key = f'ifnull(due_at, {NO_DUE_SORT_KEY})'
+        query = f'SELECT {select or ", ".join(TASK_COLUMNS)} FROM tasks WHERE status = ?'
+        params: List[Any] = [status]
+        if after:
+            rank, due, task_id = decode_key_cursor(after, 3)
+            if next_ranks:
+                query += ' AND priority_rank > ?'
+                params.append(rank)
+            else:
+                query += f' AND priority_rank = ? AND {due_key} >= ? AND ({due_key}, id) > (?, ?)'
+                params.extend([rank, due, due, task_id])
+        query += f' ORDER BY priority_rank, {due_key}, id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return query, params
+    
+    def get_priority_tasks_page(self, status: str = "pending", limit: int = DEFAULT_PAGE_SIZE,
+                                after: str = None, projection: Projection = None) -> tuple:
+        """获取一页按优先级排序的任务，返回 (任务列表, 下一页游标)"""
+        projection = projection or task_projection(cursor_columns=PRIORITY_CURSOR_COLUMNS)
+        conn = self.get_connection()
+        query, params = self.build_priority_tasks_query(status, after, limit + 1, projection.select)
+        rows = conn.execute(query, params).fetchall()
+        if after and len(rows) <= limit:
+            query, params = self.build_priority_tasks_query(
+                status, after, limit + 1 - len(rows), projection.select, next_ranks=True
+            )
+            rows.extend(conn.execute(query, params))
+        return self._page(map(projection.row, rows), limit, projection, priority_cursor)
     
     def update_task_status(self, task_id: int, status: str) -> bool:
         """更新任务状态"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'UPDATE tasks SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (status, task_id)
-        )
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return success
+        with self.write_transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE tasks SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (status, task_id)
+            )
+            return cursor.rowcount > 0
+
+class GroupCommitWriter:
+    """组提交写入器
+
+    单个写线程从队列中取出插入请求，在一个短窗口内（或凑满 max_rows 行）
+    合并为一个事务提交，每个调用方仍通过自己的 Future 拿到各自的行ID。
+    写线程在第一次提交时才启动，多进程模式下主进程 fork 前不会持有线程。
+    """
+    
+    def __init__(self, db: DatabaseManager,
+                 window_ms: float = GROUP_COMMIT_WINDOW_MS,
+                 max_rows: int = GROUP_COMMIT_MAX_ROWS,
+                 metrics: Optional[OperationGroup] = None):
+        self.db = db
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        # 每批提交记为一次 group_commit
+        self._commit_batch = metrics.timed("group_commit", self._commit) if metrics else self._commit
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+    
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mcp-db-writer", daemon=True)
+                self._thread.start()
+    
+    def submit(self, sql: str, params: tuple) -> Future:
+        """提交一条插入语句，返回结果为行ID的 Future"""
+        if self._thread is None:
+            self._start()
+        future: Future = Future()
+        self._queue.put((sql, params, future))
+        return future
+    
+    def close(self):
+        """提交剩余请求并停止写线程"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_rows:
+                try:
+                    timeout = deadline - time.monotonic()
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit_batch(batch)
+    
+    def _commit(self, batch: List[tuple]):
+        try:
+            with self.db.write_transaction() as conn:
+                row_ids = [conn.execute(sql, params).lastrowid for sql, params, _ in batch]
+        except Exception:
+            # 整批失败时逐条重试，避免一条坏数据拖累同批的其他调用
+            for sql, params, future in batch:
+                try:
+                    with self.db.write_transaction() as conn:
+                        row_id = conn.execute(sql, params).lastrowid
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(row_id)
+            return
+        for (_, _, future), row_id in zip(batch, row_ids):
+            future.set_result(row_id)
+
+class AsyncDatabaseManager:
+    """异步数据访问层
+
+    把同步的 DatabaseManager 调用放到专用线程池中执行，慢查询或 fsync
+    只占用一个 DB 线程，不会阻塞事件循环上的其他请求。
+    传入 metrics 时按方法名记录在 DB 线程中的执行时间（不含线程池排队）；
+    传入 cache 时每次写入完成后增加对应表的版本号，使依赖它的缓存结果失效。
+    """
+    
+    def __init__(self, db: DatabaseManager, max_workers: int = DB_EXECUTOR_WORKERS,
+                 writer: GroupCommitWriter = None, metrics: Optional[OperationGroup] = None,
+                 cache: Optional[ResultCache] = None):
+        self.db = db
+        self.metrics = metrics
+        self.cache = cache
+        self.writer = writer or GroupCommitWriter(db, metrics=metrics)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-db")
+    
+    async def _run(self, func, *args, **kwargs):
+        """在 DB 线程池中执行同步调用"""
+        loop = asyncio.get_running_loop()
+        if self.metrics is not None:
+            return await loop.run_in_executor(self._executor, self._timed, func, args, kwargs)
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    def _timed(self, func, args, kwargs):
+        operation = self.metrics.start(func.__name__)
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self.metrics.finish(operation, time.perf_counter() - start, failed)
+    
+    async def _write(self, table: str, write) -> Any:
+        """等待写入完成后使该表的缓存结果失效；失败时同样失效，出错前可能已有部分写入提交"""
+        try:
+            return await write
+        finally:
+            if self.cache is not None:
+                self.cache.bump(table)
+    
+    async def add_note(self, title: str, content: str, tags: List[str] = None) -> int:
+        return await self._write("notes", asyncio.wrap_future(
+            self.writer.submit(INSERT_NOTE_SQL, note_params(title, content, tags))
+        ))
+    
+    async def add_notes(self, notes: List[Dict]) -> List[int]:
+        return await self._write("notes", self._run(self.db.add_notes, notes))
+    
+    async def get_notes(self, limit: int = 10, after: str = None,
+                        tags: List[str] = None, tag_mode: str = "any") -> List[Dict]:
+        return await self._run(self.db.get_notes, limit, after, tags, tag_mode)
+    
+    async def get_notes_page(self, limit: int = 10, after: str = None,
+                             tags: List[str] = None, tag_mode: str = "any", projection: Projection = None) -> tuple:
+        return await self._run(self.db.get_notes_page, limit, after, tags, tag_mode, projection)
+    
+    async def write_notes_page(self, out: TextIO, limit: int = RESOURCE_PAGE_SIZE, after: str = None,
+                               tags: List[str] = None, tag_mode: str = "any", fmt: str = "json",
+                               projection: Projection = None) -> Optional[str]:
+        return await self._run(self.db.write_notes_page, out, limit, after, tags, tag_mode, fmt, projection)
+    
+    async def get_tag_facets(self, limit: int = 50) -> List[Dict]:
+        return await self._run(self.db.get_tag_facets, limit)
+    
+    async def search_notes(self, query: str, limit: int = 10, after: str = None,
+                           sort: str = "relevance") -> tuple:
+        return await self._run(self.db.search_notes, query, limit, after, sort)
+    
+    async def add_task(self, title: str, description: str = "", priority: str = "medium",
+                       due_date: str = None) -> int:
+        return await self._write("tasks", asyncio.wrap_future(
+            self.writer.submit(INSERT_TASK_SQL, task_params(title, description, priority, due_date))
+        ))
+    
+    async def add_tasks(self, tasks: List[Dict]) -> List[int]:
+        return await self._write("tasks", self._run(self.db.add_tasks, tasks))
+    
+    async def get_tasks(self, status: str = None, priority: str = None,
+                        limit: int = None, after: str = None) -> List[Dict]:
+        return await self._run(self.db.get_tasks, status, priority, limit, after)
+    
+    async def get_tasks_page(self, status: str = None, priority: str = None,
+                             limit: int = DEFAULT_PAGE_SIZE, after: str = None, projection: Projection = None) -> tuple:
+        return await self._run(self.db.get_tasks_page, status, priority, limit, after, projection)
+    
+    async def write_tasks_page(self, out: TextIO, status: str = None, priority: str = None,
+                               limit: int = RESOURCE_PAGE_SIZE, after: str = None, fmt: str = "json",
+                               projection: Projection = None) -> Optional[str]:
+        return await self._run(self.db.write_tasks_page, out, status, priority, limit, after, fmt, projection)
+    
+    async def get_due_tasks_page(self, due_before: int, due_from: int = None, limit: int = DEFAULT_PAGE_SIZE,
+                                 after: str = None, projection: Projection = None) -> tuple:
+        return await self._run(self.db.get_due_tasks_page, due_before, due_from, limit, after, projection)
+    
+    async def get_priority_tasks_page(self, status: str = "pending", limit: int = DEFAULT_PAGE_SIZE,
+                                      after: str = None, projection: Projection = None) -> tuple:
+        return await self._run(self.db.get_priority_tasks_page, status, limit, after, projection)
+    
+    async def update_task_status(self, task_id: int, status: str) -> bool:
+        return await self._write("tasks", self._run(self.db.update_task_status, task_id, status))
+    
+    def shutdown(self):
+        """停止写线程和线程池并关闭连接"""
+        self.writer.close()
+        self._executor.shutdown(wait=True)
+        self.db.close()
+
+# 列表渲染器
+NOTE_RENDERER = ListRenderer("笔记列表:", [
+    Field("id", "ID"),
+    Field("title", "标题"),
+    Field("content", "内容", truncate(100)),
+    Field("tags", "标签", join_list()),
+    Field("created_at", "创建时间"),
+], empty_text="暂无笔记")
+
+SEARCH_RENDERER = ListRenderer("搜索结果:", [
+    Field("id", "ID"),
+    Field("title", "标题"),
+    Field("score", "相关度", lambda score: "" if score is None else f"{-score:.3g}"),
+    Field("snippet", "摘要"),
+    Field("created_at", "创建时间"),
+], empty_text="没有找到匹配的笔记")
+
+TAG_RENDERER = ListRenderer("标签统计:", [
+    Field("tag", "标签"),
+    Field("count", "笔记数"),
+], empty_text="暂无标签")
+
+TASK_RENDERER = ListRenderer("任务列表:", [
+    Field("id", "ID"),
+    Field("title", "标题"),
+    Field("description", "描述"),
+    Field("priority", "优先级"),
+    Field("status", "状态"),
+    Field("due_date", "截止日期", or_default()),
+    Field("created_at", "创建时间"),
+], empty_text="暂无任务")
+
+def format_ms(value: float) -> str:
+    return f"{value:.2f}"
+
+STATS_FIELDS = [
+    Field("name", "名称"),
+    Field("calls", "调用"),
+    Field("errors", "错误"),
+    Field("in_flight", "在途"),
+    Field("mean_ms", "平均 ms", format_ms),
+    Field("p50_ms", "p50 ms", format_ms),
+    Field("p95_ms", "p95 ms", format_ms),
+    Field("p99_ms", "p99 ms", format_ms),
+    Field("max_ms", "最大 ms", format_ms),
+]
+TOOL_STATS_RENDERER = ListRenderer("工具调用:", STATS_FIELDS, empty_text="暂无工具调用")
+DB_STATS_RENDERER = ListRenderer("数据库方法:", STATS_FIELDS, empty_text="暂无数据库调用")
+
+def stats_rows(summary: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """把 OperationGroup.summary() 展开为渲染用的行"""
+    rows = []
+    for name, stats in summary.items():
+        row = {"name": name, "calls": stats["calls"], "errors": stats["errors"], "in_flight": stats["in_flight"]}
+        row.update(stats["latency"])
+        rows.append(row)
+    return rows
+
+def cache_stats_line(summary: Dict[str, Any]) -> str:
+    """结果缓存的一行摘要"""
+    if not summary["enabled"]:
+        return "结果缓存: 已关闭"
+    return (
+        f"结果缓存: 命中率 {summary['hit_rate']:.1%}（命中 {summary['hits']}，未命中 {summary['misses']}，"
+        f"失效 {summary['invalidations']}，淘汰 {summary['evictions']}），"
+        f"{summary['entries']}/{summary['max_entries']} 条，{summary['bytes'] / 1024:.0f} KiB"
+    )
+
+FORMAT_PROPERTY = {"type": "string", "enum": list(OUTPUT_FORMATS), "description": "输出格式 (默认 text)"}
+
+def projection_properties(columns: Sequence[str], text_columns: Sequence[str]) -> Dict[str, Any]:
+    """列表工具的 fields / truncate / max_bytes 参数"""
+    return {
+        "fields": {"type": "array", "items": {"type": "string", "enum": list(columns)},
+                   "description": "只返回这些字段 (默认全部)，未选的列不会从数据库读取"},
+        "truncate": {"type": "object",
+                     "properties": {column: {"type": "integer", "minimum": 1} for column in text_columns},
+                     "additionalProperties": False,
+                     "description": f"逐字段截断的最大字符数，超出部分替换为 {TRUNCATION_MARK}，如 {{\"{text_columns[-1]}\": 200}}"},
+        "max_bytes": {"type": "integer", "minimum": 1,
+                      "description": "本页条目 JSON 编码的字节数预算，超出时提前结束本页并返回分页游标"}
+    }
+
+def resource_projection(factory, query: Dict[str, str]) -> Projection:
+    """从资源 URI 的 ?fields=a,b&truncate=content:200&max_bytes=N 构造投影"""
+    fields = query["fields"].split(",") if query.get("fields") else None
+    truncate = {}
+    for item in filter(None, query.get("truncate", "").split(",")):
+        field, _, length = item.partition(":")
+        truncate[field] = int(length)
+    max_bytes = int(query["max_bytes"]) if query.get("max_bytes") else None
+    return factory(fields, truncate, max_bytes)
 
 # 创建MCP服务器实例
 server = Server("advanced-mcp-server")
 
+# 进程内指标：工具调用与数据库方法的计数、在途数和延迟直方图
+metrics = Metrics()
+
+# 抽样性能剖析，默认关闭，可用 MCP_PROFILE_RATE 或 profiling 工具开启
+profiler = ToolProfiler()
+
+# 工具注册表：各工具通过 @tools.tool 注册
+tools = ToolRegistry(metrics=metrics.tools, profiler=profiler)
+
+# 只读工具和 data:// 资源的结果缓存，写入后按表失效；命中率计入指标
+result_cache = ResultCache()
+metrics.add_collector(result_cache)
+
 # 创建数据库管理器
-db_manager = DatabaseManager()
+db_manager = DatabaseManager(os.environ.get("MCP_DB_PATH", "mcp_data.db"))
+async_db = AsyncDatabaseManager(db_manager, metrics=metrics.db, cache=result_cache)
+
+def result_size(result: CallToolResult) -> int:
+    """工具结果占用的大致字节数，用于缓存的容量限制"""
+    return sum(
+        sys.getsizeof(item.get("text", "") if isinstance(item, dict) else getattr(item, "text", ""))
+        for item in result.content
+    )
+
+def cached_tool(*tables: str):
+    """装饰器：按工具名 + 规范化参数缓存处理函数的结果，tables 中任一表被写入后失效；错误结果不缓存"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(arguments: Dict[str, Any]) -> CallToolResult:
+            return await result_cache.get_or_compute(
+                (handler.__name__, normalize_arguments(arguments)), tables, lambda: handler(arguments),
+                size=result_size, cacheable=lambda result: not getattr(result, "isError", False),
+            )
+        return wrapper
+    return decorator
 
 @server.list_tools()
 async def handle_list_tools() -> ListToolsResult:
     """列出可用的工具"""
-    tools = [
-        Tool(
-            name="add_note",
-            description="添加一个新的笔记",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string", "description": "笔记标题"},
-                    "content": {"type": "string", "description": "笔记内容"},
-                    "tags": {"type": "array", "items": {"type": "string"}, "description": "标签列表"}
-                },
-                "required": ["title", "content"]
-            }
-        ),
-        Tool(
-            name="list_notes",
-            description="列出所有笔记",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "limit": {"type": "integer", "description": "返回的笔记数量限制"}
-                }
-            }
-        ),
-        Tool(
-            name="add_task",
-            description="添加一个新的任务",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string", "description": "任务标题"},
-                    "description": {"type": "string", "description": "任务描述"},
-                    "priority": {"type": "string", "enum": ["low", "medium", "high"], "description": "任务优先级"},
-                    "due_date": {"type": "string", "description": "截止日期 (YYYY-MM-DD)"}
-                },
-                "required": ["title"]
-            }
-        ),
-        Tool(
-            name="list_tasks",
-            description="列出所有任务",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "status": {"type": "string", "enum": ["pending", "completed"], "description": "任务状态过滤"},
-                    "priority": {"type": "string", "enum": ["low", "medium", "high"], "description": "优先级过滤"}
-                }
-            }
-        ),
-        Tool(
-            name="complete_task",
-            description="完成任务",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_id": {"type": "integer", "description": "任务ID"}
-                },
-                "required": ["task_id"]
-            }
-        ),
-        Tool(
-            name="get_time",
-            description="获取当前时间",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "format": {"type": "string", "description": "时间格式 (可选)"}
-                }
-            }
-        ),
-        Tool(
-            name="calculate",
-            description="执行简单的数学计算",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "expression": {"type": "string", "description": "数学表达式，如 '2 + 3 * 4'"}
-                },
-                "required": ["expression"]
-            }
-        ),
-        Tool(
-            name="get_weather_info",
-            description="获取天气信息（模拟）",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "city": {"type": "string", "description": "城市名称"}
-                },
-                "required": ["city"]
-            }
-        )
-    ]
-    return ListToolsResult(tools=tools)
+    return tools.list_tools()
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
     """处理工具调用"""
     try:
-        if name == "add_note":
-            return await add_note(arguments)
-        elif name == "list_notes":
-            return await list_notes(arguments)
-        elif name == "add_task":
-            return await add_task(arguments)
-        elif name == "list_tasks":
-            return await list_tasks(arguments)
-        elif name == "complete_task":
-            return await complete_task(arguments)
-        elif name == "get_time":
-            return await get_time(arguments)
-        elif name == "calculate":
-            return await calculate(arguments)
-        elif name == "get_weather_info":
-            return await get_weather_info(arguments)
-        else:
-            return CallToolResult(
-                content=[{"type": "text", "text": f"未知工具: {name}"}],
-                isError=True
-            )
+        return await tools.call(name, arguments)
     except Exception as e:
         logger.error(f"工具调用错误: {e}")
         return CallToolResult(
@@ -320,13 +1306,26 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
             isError=True
         )
 
+@tools.tool(
+    name="add_note",
+    description="添加一个新的笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "笔记标题"},
+            "content": {"type": "string", "description": "笔记内容"},
+            "tags": {"type": "array", "items": {"type": "string"}, "description": "标签列表"}
+        },
+        "required": ["title", "content"]
+    }
+)
 async def add_note(arguments: Dict[str, Any]) -> CallToolResult:
     """添加笔记"""
     title = arguments.get("title", "")
     content = arguments.get("content", "")
     tags = arguments.get("tags", [])
     
-    note_id = db_manager.add_note(title, content, tags)
+    note_id = await async_db.add_note(title, content, tags)
     
     return CallToolResult(
         content=[{
@@ -335,29 +1334,142 @@ async def add_note(arguments: Dict[str, Any]) -> CallToolResult:
         }]
     )
 
+@tools.tool(
+    name="add_notes",
+    description="批量添加笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "notes": {
+                "type": "array",
+                "description": "笔记列表",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "description": "笔记标题"},
+                        "content": {"type": "string", "description": "笔记内容"},
+                        "tags": {"type": "array", "items": {"type": "string"}, "description": "标签列表"}
+                    },
+                    "required": ["title", "content"]
+                }
+            }
+        },
+        "required": ["notes"]
+    }
+)
+async def add_notes(arguments: Dict[str, Any]) -> CallToolResult:
+    """批量添加笔记"""
+    notes = arguments.get("notes", [])
+    
+    note_ids = await async_db.add_notes(notes)
+    
+    return CallToolResult(
+        content=[{
+            "type": "text",
+            "text": f"已添加 {len(note_ids)} 条笔记\nID: {', '.join(map(str, note_ids))}"
+        }]
+    )
+
+@tools.tool(
+    name="list_notes",
+    description="列出所有笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "limit": {"type": "integer", "description": "返回的笔记数量限制"},
+            "cursor": {"type": "string", "description": "上一页返回的分页游标"},
+            "tags": {"type": "array", "items": {"type": "string"}, "description": "按标签过滤"},
+            "tag_mode": {"type": "string", "enum": ["any", "all"], "description": "any: 包含任意标签 (默认), all: 包含全部标签"},
+            **projection_properties(NOTE_COLUMNS, NOTE_TEXT_COLUMNS),
+            "format": FORMAT_PROPERTY
+        }
+    }
+)
+@cached_tool("notes")
 async def list_notes(arguments: Dict[str, Any]) -> CallToolResult:
     """列出笔记"""
-    limit = arguments.get("limit", 10)
-    notes = db_manager.get_notes(limit)
+    limit = clamp_page_size(arguments.get("limit"), 10)
+    projection = note_projection(arguments.get("fields"), arguments.get("truncate"), arguments.get("max_bytes"))
+    notes, next_cursor = await async_db.get_notes_page(
+        limit, arguments.get("cursor"), arguments.get("tags"), arguments.get("tag_mode", "any"), projection
+    )
     
-    if not notes:
-        return CallToolResult(
-            content=[{"type": "text", "text": "暂无笔记"}]
-        )
+    result = NOTE_RENDERER.project(projection.fields).render(notes, arguments.get("format", "text"), next_cursor)
     
-    result = "笔记列表:\n\n"
-    for note in notes:
-        result += f"ID: {note['id']}\n"
-        result += f"标题: {note['title']}\n"
-        result += f"内容: {note['content'][:100]}{'...' if len(note['content']) > 100 else ''}\n"
-        result += f"标签: {', '.join(note['tags']) if note['tags'] else '无'}\n"
-        result += f"创建时间: {note['created_at']}\n"
-        result += "-" * 50 + "\n"
+    return CallToolResult(
+        content=[{"type": "text", "text": result}]
+    )
+
+@tools.tool(
+    name="tag_facets",
+    description="统计各标签下的笔记数量",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "limit": {"type": "integer", "description": "返回的标签数量限制"},
+            "format": FORMAT_PROPERTY
+        }
+    }
+)
+@cached_tool("notes")
+async def tag_facets(arguments: Dict[str, Any]) -> CallToolResult:
+    """统计标签"""
+    limit = clamp_page_size(arguments.get("limit"))
+    facets = await async_db.get_tag_facets(limit)
+    result = TAG_RENDERER.render(facets, arguments.get("format", "text"))
     
     return CallToolResult(
         content=[{"type": "text", "text": result}]
     )
 
+@tools.tool(
+    name="search_notes",
+    description="全文搜索笔记（标题、内容、标签），按相关度或创建时间排序",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "搜索词，多个词用空格分隔，需同时匹配"},
+            "limit": {"type": "integer", "description": "返回的结果数量限制"},
+            "cursor": {"type": "string", "description": "上一页返回的分页游标（需使用相同的 sort）"},
+            "sort": {"type": "string", "enum": list(SEARCH_SORTS),
+                     "description": "relevance: 按相关度 (默认，短于 3 个字符的搜索词只能按时间), recent: 按创建时间倒序"},
+            "format": FORMAT_PROPERTY
+        },
+        "required": ["query"]
+    }
+)
+@cached_tool("notes")
+async def search_notes(arguments: Dict[str, Any]) -> CallToolResult:
+    """全文搜索笔记"""
+    query = arguments.get("query", "")
+    limit = clamp_page_size(arguments.get("limit"), 10)
+    
+    results, next_cursor = await async_db.search_notes(
+        query, limit, arguments.get("cursor"), arguments.get("sort", "relevance")
+    )
+    result = SEARCH_RENDERER.render(
+        results, arguments.get("format", "text"), next_cursor,
+        title=f"搜索结果 ({query}):", empty_text=f"没有找到与 \"{query}\" 匹配的笔记"
+    )
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": result}]
+    )
+
+@tools.tool(
+    name="add_task",
+    description="添加一个新的任务",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "任务标题"},
+            "description": {"type": "string", "description": "任务描述"},
+            "priority": {"type": "string", "enum": ["low", "medium", "high"], "description": "任务优先级"},
+            "due_date": {"type": "string", "description": "截止日期 (YYYY-MM-DD，当天结束前到期) 或 ISO 8601 时间"}
+        },
+        "required": ["title"]
+    }
+)
 async def add_task(arguments: Dict[str, Any]) -> CallToolResult:
     """添加任务"""
     title = arguments.get("title", "")
@@ -365,7 +1477,7 @@ async def add_task(arguments: Dict[str, Any]) -> CallToolResult:
     priority = arguments.get("priority", "medium")
     due_date = arguments.get("due_date", "")
     
-    task_id = db_manager.add_task(title, description, priority, due_date)
+    task_id = await async_db.add_task(title, description, priority, due_date)
     
     return CallToolResult(
         content=[{
@@ -374,38 +1486,190 @@ async def add_task(arguments: Dict[str, Any]) -> CallToolResult:
         }]
     )
 
+@tools.tool(
+    name="add_tasks",
+    description="批量添加任务",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "tasks": {
+                "type": "array",
+                "description": "任务列表",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "description": "任务标题"},
+                        "description": {"type": "string", "description": "任务描述"},
+                        "priority": {"type": "string", "enum": ["low", "medium", "high"], "description": "任务优先级"},
+                        "due_date": {"type": "string", "description": "截止日期 (YYYY-MM-DD，当天结束前到期) 或 ISO 8601 时间"}
+                    },
+                    "required": ["title"]
+                }
+            }
+        },
+        "required": ["tasks"]
+    }
+)
+async def add_tasks(arguments: Dict[str, Any]) -> CallToolResult:
+    """批量添加任务"""
+    tasks = arguments.get("tasks", [])
+    
+    task_ids = await async_db.add_tasks(tasks)
+    
+    return CallToolResult(
+        content=[{
+            "type": "text",
+            "text": f"已添加 {len(task_ids)} 个任务\nID: {', '.join(map(str, task_ids))}"
+        }]
+    )
+
+@tools.tool(
+    name="list_tasks",
+    description="列出所有任务",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "status": {"type": "string", "enum": ["pending", "completed"], "description": "任务状态过滤"},
+            "priority": {"type": "string", "enum": ["low", "medium", "high"], "description": "优先级过滤"},
+            "limit": {"type": "integer", "description": f"每页任务数量 (默认 {DEFAULT_PAGE_SIZE})"},
+            "cursor": {"type": "string", "description": "上一页返回的分页游标"},
+            **projection_properties(TASK_COLUMNS, TASK_TEXT_COLUMNS),
+            "format": FORMAT_PROPERTY
+        }
+    }
+)
+@cached_tool("tasks")
 async def list_tasks(arguments: Dict[str, Any]) -> CallToolResult:
     """列出任务"""
     status_filter = arguments.get("status")
     priority_filter = arguments.get("priority")
     
-    tasks = db_manager.get_tasks(status_filter, priority_filter)
+    limit = clamp_page_size(arguments.get("limit"))
+    projection = task_projection(arguments.get("fields"), arguments.get("truncate"), arguments.get("max_bytes"))
     
-    if not tasks:
-        return CallToolResult(
-            content=[{"type": "text", "text": "暂无任务"}]
-        )
+    tasks, next_cursor = await async_db.get_tasks_page(
+        status_filter, priority_filter, limit, arguments.get("cursor"), projection
+    )
+    result = TASK_RENDERER.project(projection.fields).render(tasks, arguments.get("format", "text"), next_cursor)
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": result}]
+    )
+
+@tools.tool(
+    name="list_overdue_tasks",
+    description="列出已过截止时间的待完成任务，最早到期的在前",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "limit": {"type": "integer", "description": f"每页任务数量 (默认 {DEFAULT_PAGE_SIZE})"},
+            "cursor": {"type": "string", "description": "上一页返回的分页游标"},
+            **projection_properties(TASK_COLUMNS, TASK_TEXT_COLUMNS),
+            "format": FORMAT_PROPERTY
+        }
+    }
+)
+async def list_overdue_tasks(arguments: Dict[str, Any]) -> CallToolResult:
+    """列出逾期任务"""
+    limit = clamp_page_size(arguments.get("limit"))
+    projection = task_projection(arguments.get("fields"), arguments.get("truncate"), arguments.get("max_bytes"),
+                                 DUE_CURSOR_COLUMNS)
     
-    result = "任务列表:\n\n"
-    for task in tasks:
-        result += f"ID: {task['id']}\n"
-        result += f"标题: {task['title']}\n"
-        result += f"描述: {task['description']}\n"
-        result += f"优先级: {task['priority']}\n"
-        result += f"状态: {task['status']}\n"
-        result += f"截止日期: {task['due_date'] if task['due_date'] else '无'}\n"
-        result += f"创建时间: {task['created_at']}\n"
-        result += "-" * 50 + "\n"
+    tasks, next_cursor = await async_db.get_due_tasks_page(
+        int(time.time()), None, limit, arguments.get("cursor"), projection
+    )
+    result = TASK_RENDERER.project(projection.fields).render(
+        tasks, arguments.get("format", "text"), next_cursor, title="逾期任务:", empty_text="没有逾期任务"
+    )
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": result}]
+    )
+
+@tools.tool(
+    name="list_upcoming_tasks",
+    description="列出在指定时间窗口内到期的待完成任务，最早到期的在前",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "window": {"type": "string",
+                       "description": f"时间窗口，数字加单位 m/h/d/w，如 12h、7d (默认 {DEFAULT_UPCOMING_WINDOW})"},
+            "limit": {"type": "integer", "description": f"每页任务数量 (默认 {DEFAULT_PAGE_SIZE})"},
+            "cursor": {"type": "string", "description": "上一页返回的分页游标"},
+            **projection_properties(TASK_COLUMNS, TASK_TEXT_COLUMNS),
+            "format": FORMAT_PROPERTY
+        }
+    }
+)
+async def list_upcoming_tasks(arguments: Dict[str, Any]) -> CallToolResult:
+    """列出即将到期的任务"""
+    window = arguments.get("window", DEFAULT_UPCOMING_WINDOW)
+    seconds = parse_window(window)
+    limit = clamp_page_size(arguments.get("limit"))
+    projection = task_projection(arguments.get("fields"), arguments.get("truncate"), arguments.get("max_bytes"),
+                                 DUE_CURSOR_COLUMNS)
+    
+    now = int(time.time())
+    tasks, next_cursor = await async_db.get_due_tasks_page(
+        now + seconds, now, limit, arguments.get("cursor"), projection
+    )
+    result = TASK_RENDERER.project(projection.fields).render(
+        tasks, arguments.get("format", "text"), next_cursor,
+        title=f"{window} 内到期的任务:", empty_text=f"{window} 内没有到期的任务"
+    )
     
     return CallToolResult(
         content=[{"type": "text", "text": result}]
     )
 
+@tools.tool(
+    name="list_tasks_by_priority",
+    description="按优先级（高到低）和截止时间（早到晚，无截止日期的在最后）列出任务",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "status": {"type": "string", "enum": ["pending", "completed"], "description": "任务状态 (默认 pending)"},
+            "limit": {"type": "integer", "description": f"每页任务数量 (默认 {DEFAULT_PAGE_SIZE})"},
+            "cursor": {"type": "string", "description": "上一页返回的分页游标"},
+            **projection_properties(TASK_COLUMNS, TASK_TEXT_COLUMNS),
+            "format": FORMAT_PROPERTY
+        }
+    }
+)
+@cached_tool("tasks")
+async def list_tasks_by_priority(arguments: Dict[str, Any]) -> CallToolResult:
+    """按优先级列出任务"""
+    limit = clamp_page_size(arguments.get("limit"))
+    projection = task_projection(arguments.get("fields"), arguments.get("truncate"), arguments.get("max_bytes"),
+                                 PRIORITY_CURSOR_COLUMNS)
+    
+    tasks, next_cursor = await async_db.get_priority_tasks_page(
+        arguments.get("status", "pending"), limit, arguments.get("cursor"), projection
+    )
+    result = TASK_RENDERER.project(projection.fields).render(
+        tasks, arguments.get("format", "text"), next_cursor, title="按优先级排列的任务:"
+    )
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": result}]
+    )
+
+@tools.tool(
+    name="complete_task",
+    description="完成任务",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "task_id": {"type": "integer", "description": "任务ID"}
+        },
+        "required": ["task_id"]
+    }
+)
 async def complete_task(arguments: Dict[str, Any]) -> CallToolResult:
     """完成任务"""
     task_id = arguments.get("task_id")
     
-    if db_manager.update_task_status(task_id, "completed"):
+    if await async_db.update_task_status(task_id, "completed"):
         return CallToolResult(
             content=[{"type": "text", "text": f"任务 {task_id} 已完成"}]
         )
@@ -415,6 +1679,16 @@ async def complete_task(arguments: Dict[str, Any]) -> CallToolResult:
             isError=True
         )
 
+@tools.tool(
+    name="get_time",
+    description="获取当前时间",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "format": {"type": "string", "description": "时间格式 (可选)"}
+        }
+    }
+)
 async def get_time(arguments: Dict[str, Any]) -> CallToolResult:
     """获取当前时间"""
     time_format = arguments.get("format", "default")
@@ -431,21 +1705,24 @@ async def get_time(arguments: Dict[str, Any]) -> CallToolResult:
         content=[{"type": "text", "text": f"当前时间: {time_str}"}]
     )
 
+@tools.tool(
+    name="calculate",
+    description="执行简单的数学计算",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "expression": {"type": "string", "description": "数学表达式，如 '2 + 3 * 4'"}
+        },
+        "required": ["expression"]
+    }
+)
 async def calculate(arguments: Dict[str, Any]) -> CallToolResult:
     """执行数学计算"""
     expression = arguments.get("expression", "")
     
     try:
-        # 安全地执行数学表达式
-        allowed_names = {
-            'abs': abs, 'round': round, 'min': min, 'max': max,
-            'sum': sum, 'len': len, 'int': int, 'float': float
-        }
-        
-        # 构建安全的表达式
-        safe_expression = expression.replace('__', '').replace('import', '').replace('eval', '')
-        
-        result = eval(safe_expression, {"__builtins__": {}}, allowed_names)
+        # 白名单 AST 求值，编译结果按表达式文本缓存
+        result = evaluate(expression)
         
         return CallToolResult(
             content=[{"type": "text", "text": f"计算结果: {expression} = {result}"}]
@@ -456,6 +1733,75 @@ async def calculate(arguments: Dict[str, Any]) -> CallToolResult:
             isError=True
         )
 
+@tools.tool(
+    name="batch_calculate",
+    description="批量数学计算：计算多个表达式，或对同一个表达式代入多组变量取值",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "expressions": {"type": "array", "items": {"type": "string"}, "description": "表达式列表"},
+            "expression": {"type": "string", "description": "含变量的表达式，如 'x * 2 + y'"},
+            "variables": {
+                "type": "object",
+                "additionalProperties": {"type": "array", "items": {"type": "number"}},
+                "description": "变量名到等长取值数组的映射，如 {\"x\": [1, 2], \"y\": [3, 4]}"
+            },
+            "format": {"type": "string", "enum": ["text", "json"], "description": "输出格式 (默认 text)"}
+        }
+    }
+)
+async def batch_calculate(arguments: Dict[str, Any]) -> CallToolResult:
+    """批量数学计算"""
+    expressions = arguments.get("expressions")
+    expression = arguments.get("expression")
+    variables = arguments.get("variables") or {}
+    
+    try:
+        if expressions is not None:
+            results = await asyncio.to_thread(evaluate_many, expressions)
+            labels = expressions
+        elif expression:
+            results = await asyncio.to_thread(evaluate_batch, expression, variables)
+            labels = [f"[{index}]" for index in range(len(results))]
+        else:
+            raise ExpressionError("需要提供 expressions，或 expression 加 variables")
+    except ExpressionError as e:
+        return CallToolResult(
+            content=[{"type": "text", "text": f"计算错误: {str(e)}"}],
+            isError=True
+        )
+    
+    if arguments.get("format") == "json":
+        payload = {
+            "results": [None if isinstance(r, ExpressionError) else r for r in results],
+            "errors": [
+                {"index": index, "error": str(r)}
+                for index, r in enumerate(results) if isinstance(r, ExpressionError)
+            ]
+        }
+        result = json.dumps(payload, ensure_ascii=False)
+    else:
+        lines = [
+            f"{label} = 错误: {r}" if isinstance(r, ExpressionError) else f"{label} = {r}"
+            for label, r in zip(labels, results)
+        ]
+        result = f"批量计算结果 ({len(results)} 个):\n" + "\n".join(lines)
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": result}]
+    )
+
+@tools.tool(
+    name="get_weather_info",
+    description="获取天气信息（模拟）",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "city": {"type": "string", "description": "城市名称"}
+        },
+        "required": ["city"]
+    }
+)
 async def get_weather_info(arguments: Dict[str, Any]) -> CallToolResult:
     """获取天气信息（模拟）"""
     city = arguments.get("city", "北京")
@@ -479,6 +1825,35 @@ async def get_weather_info(arguments: Dict[str, Any]) -> CallToolResult:
         content=[{"type": "text", "text": result}]
     )
 
+@tools.tool(
+    name="server_stats",
+    description="查看服务器指标：每个工具和数据库方法的调用次数、错误数、在途数和延迟百分位数，以及结果缓存命中率",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "format": FORMAT_PROPERTY
+        }
+    }
+)
+async def server_stats(arguments: Dict[str, Any]) -> CallToolResult:
+    """查看服务器指标"""
+    fmt = arguments.get("format", "text")
+    snapshot = metrics.snapshot()
+    if fmt == "json":
+        text = json.dumps(snapshot, ensure_ascii=False)
+    else:
+        text = (
+            f"进程 {snapshot['pid']} 已运行 {snapshot['uptime_seconds']:.0f} 秒\n\n"
+            + TOOL_STATS_RENDERER.render(stats_rows(snapshot["tools"]), fmt) + "\n"
+            + DB_STATS_RENDERER.render(stats_rows(snapshot["db"]), fmt) + "\n\n"
+            + cache_stats_line(snapshot["cache"])
+        )
+    return CallToolResult(
+        content=[{"type": "text", "text": text}]
+    )
+
+register_profiling_tool(tools, profiler)
+
 @server.list_resources()
 async def handle_list_resources() -> List[Resource]:
     """列出可用的资源"""
@@ -486,13 +1861,15 @@ async def handle_list_resources() -> List[Resource]:
         Resource(
             uri="data://notes",
             name="notes",
-            description="所有笔记数据",
+            description="所有笔记数据（支持 ?limit=&cursor= 分页，?tag=&tag_mode= 标签过滤，?format=json|compact|ndjson，"
+                        "?fields=id,title 字段投影，?truncate=content:200 截断，?max_bytes= 字节预算）",
             mimeType="application/json"
         ),
         Resource(
             uri="data://tasks", 
             name="tasks",
-            description="所有任务数据",
+            description="所有任务数据（支持 ?limit=&cursor= 分页，?format=json|compact|ndjson，"
+                        "?fields=id,title 字段投影，?truncate=description:200 截断，?max_bytes= 字节预算）",
             mimeType="application/json"
         ),
         Resource(
@@ -500,45 +1877,103 @@ async def handle_list_resources() -> List[Resource]:
             name="config",
             description="配置数据",
             mimeType="application/json"
+        ),
+        Resource(
+            uri="data://metrics",
+            name="metrics",
+            description="服务器指标（JSON；?format=prometheus 为 Prometheus 文本格式）",
+            mimeType="application/json"
         )
     ]
     return resources
 
+async def read_data_page(base: str, query: Dict[str, str], query_lists: Dict[str, List[str]]) -> str:
+    """序列化 data://notes 或 data://tasks 的一页
+
+    资源读取接口需要返回完整字符串，因此整页输出先写入内存缓冲，页大小由 limit 限制。
+    """
+    limit = clamp_page_size(query.get("limit"), RESOURCE_PAGE_SIZE)
+    fmt = query.get("format", "json")
+    out = io.StringIO()
+    if base == "data://notes":
+        await async_db.write_notes_page(
+            out, limit, query.get("cursor"), query_lists.get("tag"), query.get("tag_mode", "any"), fmt,
+            resource_projection(note_projection, query)
+        )
+    else:
+        await async_db.write_tasks_page(
+            out, query.get("status"), query.get("priority"), limit, query.get("cursor"), fmt,
+            resource_projection(task_projection, query)
+        )
+    return out.getvalue()
+
 @server.read_resource()
 async def handle_read_resource(uri: str) -> ReadResourceResult:
     """读取资源"""
     try:
-        if uri == "data://notes":
-            notes = db_manager.get_notes(1000)  # 获取所有笔记
-            content = json.dumps(notes, ensure_ascii=False, indent=2)
-            return ReadResourceResult(contents=content)
-        elif uri == "data://tasks":
-            tasks = db_manager.get_tasks()  # 获取所有任务
-            content = json.dumps(tasks, ensure_ascii=False, indent=2)
+        parts = urlsplit(uri)
+        base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        query_lists = parse_qs(parts.query)
+        query = {key: values[-1] for key, values in query_lists.items()}
+        
+        if base in ("data://notes", "data://tasks"):
+            content = await result_cache.get_or_compute(
+                (base, normalize_arguments(query_lists)), (parts.netloc,),
+                lambda: read_data_page(base, query, query_lists), size=sys.getsizeof,
+            )
             return ReadResourceResult(contents=content)
         elif uri == "data://config":
             content = json.dumps({"version": "1.0.0", "server": "advanced-mcp-server"}, ensure_ascii=False, indent=2)
             return ReadResourceResult(contents=content)
+        elif base == "data://metrics":
+            if query.get("format") == "prometheus":
+                return ReadResourceResult(contents=metrics.render_prometheus())
+            return ReadResourceResult(contents=json.dumps(metrics.snapshot(), ensure_ascii=False))
         else:
             return ReadResourceResult(contents="资源不存在", isError=True)
     except Exception as e:
         return ReadResourceResult(contents=f"读取资源失败: {str(e)}", isError=True)
 
-async def main():
+async def main(transport: str = "stdio", host: str = DEFAULT_HTTP_HOST, port: int = DEFAULT_HTTP_PORT,
+               json_response: bool = False, sock=None):
     """主函数"""
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="advanced-mcp-server",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=None,
-                    experimental_capabilities=None,
-                ),
-            ),
-        )
+    metrics_server = None
+    if METRICS_PORT:
+        # 多进程模式下每个工作进程各自导出，端口依次加上工作进程序号
+        port_offset = int(os.environ.get(WORKER_INDEX_ENV, 0))
+        metrics_server = serve_prometheus(metrics, int(METRICS_PORT) + port_offset)
+    try:
+        if transport == "http":
+            await serve_http(server, host, port, json_response, sock)
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="advanced-mcp-server",
+                        server_version="1.0.0",
+                        capabilities=server.get_capabilities(
+                            notification_options=NotificationOptions(),
+                            experimental_capabilities={},
+                        ),
+                    ),
+                )
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        async_db.shutdown()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    args = parse_transport_args("高级MCP服务器", workers=True)
+    if args.transport == "http" and args.workers > 1:
+        # 数据库已在主进程中完成初始化和迁移；SQLite 连接不能跨 fork，由各工作进程重新建立
+        db_manager.close()
+        # 其他工作进程的写入不会使本进程的缓存失效
+        result_cache.disable()
+        serve_workers(
+            lambda sock: asyncio.run(main("http", json_response=args.json_response, sock=sock)),
+            args.host, args.port, args.workers,
+        )
+    else:
+        asyncio.run(main(args.transport, args.host, args.port, args.json_response)) 
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+批量计算基准测试
+对比逐次调用 calculate、逐组复用编译闭包和 NumPy 向量化三种方式
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import expression
+from expression import evaluate, evaluate_batch
+
+def measure(label: str, func, count: int) -> list:
+    start = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:>10.2f} ms  {elapsed / count * 1e6:>8.3f} µs/项")
+    return results
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="批量计算基准测试")
+    parser.add_argument("--rows", type=int, default=100000, help="变量取值组数")
+    args = parser.parse_args()
+
+    formula = "round(max(x * 1.5 - y, 0) + (x + y) ** 2 / 7, 3)"
+    rng = random.Random(42)
+    variables = {
+        "x": [rng.uniform(-100, 100) for _ in range(args.rows)],
+        "y": [rng.uniform(-100, 100) for _ in range(args.rows)],
+    }
+    # 逐次调用：每组取值都拼成一个新表达式，相当于客户端发起 N 次 calculate
+    expressions = [f"round(max({x!r} * 1.5 - {y!r}, 0) + ({x!r} + {y!r}) ** 2 / 7, 3)"
+                   for x, y in zip(variables["x"], variables["y"])]
+
+    print(f"=== {args.rows} 组取值: {formula} ===")
+    single = measure("逐次 calculate", lambda: [evaluate(e) for e in expressions], args.rows)
+
+    numpy_module = expression.np
+    expression.np = None
+    try:
+        scalar = measure("批量 (逐组闭包)", lambda: evaluate_batch(formula, variables), args.rows)
+    finally:
+        expression.np = numpy_module
+
+    if numpy_module is None:
+        print("批量 (NumPy 向量化)          未安装 numpy，跳过")
+        vector = scalar
+    else:
+        vector = measure("批量 (NumPy 向量化)", lambda: evaluate_batch(formula, variables), args.rows)
+
+    assert single == scalar
+    assert all(abs(a - b) < 1e-6 for a, b in zip(scalar, vector))
+
+if __name__ == "__main__":
+    main()
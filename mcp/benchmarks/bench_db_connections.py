@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+数据库连接基准测试
+对比每次调用都新建连接与线程长连接两种方式的 calls/sec
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MCP_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+from advanced_mcp_server import DatabaseManager
+
+class ConnectPerCallDatabase:
+    """旧实现：每次调用都打开并关闭连接"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def add_note(self, title: str, content: str, tags=None) -> int:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO notes (title, content, tags) VALUES (?, ?, ?)',
+            (title, content, json.dumps(tags or []))
+        )
+        note_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return note_id
+
+    def get_notes(self, limit: int = 10):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, title, content, tags, created_at FROM notes ORDER BY created_at DESC LIMIT ?',
+            (limit,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+def measure(label: str, func, calls: int) -> float:
+    """执行 calls 次并返回 calls/sec"""
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    elapsed = time.perf_counter() - start
+    rate = calls / elapsed
+    print(f"{label:<32} {rate:>12.0f} calls/sec")
+    return rate
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="数据库连接基准测试")
+    parser.add_argument("--calls", type=int, default=5000, help="每种场景的调用次数")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    pooled = DatabaseManager(os.path.join(workdir, "pooled.db"))
+    legacy_path = os.path.join(workdir, "legacy.db")
+    DatabaseManager(legacy_path).close()
+    legacy = ConnectPerCallDatabase(legacy_path)
+
+    for name, db in (("每次新建连接", legacy), ("线程长连接", pooled)):
+        print(f"\n=== {name} ===")
+        write_rate = measure("add_note", lambda i: db.add_note(f"标题{i}", "内容" * 20, ["a"]), args.calls)
+        read_rate = measure("get_notes(10)", lambda i: db.get_notes(10), args.calls)
+        print(f"{'合计':<32} {2 * args.calls / (args.calls / write_rate + args.calls / read_rate):>12.0f} calls/sec")
+
+    pooled.close()
+
+if __name__ == "__main__":
+    main()
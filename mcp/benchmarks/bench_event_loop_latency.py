@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+事件循环延迟测试
+模拟一次很慢的写入，检查并发的 get_time 调用是否仍能及时返回
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MCP_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+import advanced_mcp_server
+from advanced_mcp_server import AsyncDatabaseManager, DatabaseManager, GroupCommitWriter
+
+class SlowDatabaseManager(DatabaseManager):
+    """每个写事务提交前人为阻塞，模拟慢 fsync（组提交写线程和批量写入都经过这里）"""
+
+    delay = 0.5
+
+    @contextlib.contextmanager
+    def write_transaction(self):
+        with super().write_transaction() as conn:
+            yield conn
+            time.sleep(self.delay)
+
+class InlineWriter(GroupCommitWriter):
+    """旧行为：不经过写线程，在调用方线程上直接提交"""
+
+    def submit(self, sql, params):
+        future = Future()
+        self._commit_batch([(sql, params, future)])
+        return future
+
+class BlockingDatabaseManager(AsyncDatabaseManager):
+    """旧行为：在事件循环线程上直接执行同步调用和写入"""
+
+    def __init__(self, db):
+        super().__init__(db, writer=InlineWriter(db))
+
+    async def _run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+async def probe_get_time(count: int, interval: float):
+    """周期性调用 get_time，记录从计划发起到拿到结果的延迟"""
+    latencies = []
+    for _ in range(count):
+        scheduled = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await advanced_mcp_server.handle_call_tool("get_time", {})
+        latencies.append(time.perf_counter() - scheduled)
+    return latencies
+
+async def run_scenario(label: str, async_db: AsyncDatabaseManager, probes: int) -> float:
+    """慢写入与 get_time 探针并发执行，返回探针的最大延迟"""
+    advanced_mcp_server.async_db = async_db
+    start = time.perf_counter()
+    probe = asyncio.create_task(probe_get_time(probes, 0.01))
+    await asyncio.sleep(0.03)
+    await advanced_mcp_server.handle_call_tool("add_note", {"title": "慢写入", "content": "x"})
+    latencies = await probe
+    worst = max(latencies)
+    print(f"{label:<20} 探针最大延迟 {worst * 1000:8.2f} ms  总耗时 {(time.perf_counter() - start) * 1000:8.2f} ms")
+    return worst
+
+async def run(args):
+    workdir = tempfile.mkdtemp()
+    SlowDatabaseManager.delay = args.delay
+    slow_db = SlowDatabaseManager(os.path.join(workdir, "slow.db"))
+
+    blocked = await run_scenario("事件循环内执行", BlockingDatabaseManager(slow_db), args.probes)
+    worst = await run_scenario("DB 线程池执行", AsyncDatabaseManager(slow_db), args.probes)
+
+    threshold = args.delay / 10
+    if blocked < threshold:
+        # 对照组没有被阻塞，说明慢写入没有生效，本次测试不能说明任何问题
+        print(f"✗ 对照组未被慢写入阻塞 ({blocked * 1000:.2f} ms < {threshold * 1000:.2f} ms)，模拟的慢写入没有生效")
+        return 1
+    if worst >= threshold:
+        print(f"✗ get_time 被慢写入阻塞 ({worst * 1000:.2f} ms >= {threshold * 1000:.2f} ms)")
+        return 1
+    print("✓ 慢写入不再阻塞并发的 get_time 调用")
+    return 0
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="事件循环延迟测试")
+    parser.add_argument("--delay", type=float, default=0.5, help="模拟写入耗时（秒）")
+    parser.add_argument("--probes", type=int, default=100, help="get_time 探针次数")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
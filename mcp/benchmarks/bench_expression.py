@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+表达式计算基准测试
+对比旧的 eval 实现与缓存编译的 AST 白名单求值器
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from expression import compile_expression, evaluate
+
+ALLOWED_NAMES = {
+    'abs': abs, 'round': round, 'min': min, 'max': max,
+    'sum': sum, 'len': len, 'int': int, 'float': float
+}
+
+def legacy_eval(expression: str):
+    """旧实现：每次调用都字符串过滤后 eval"""
+    safe_expression = expression.replace('__', '').replace('import', '').replace('eval', '')
+    return eval(safe_expression, {"__builtins__": {}}, ALLOWED_NAMES)
+
+def measure(label: str, func, expressions) -> None:
+    start = time.perf_counter()
+    for expression in expressions:
+        func(expression)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / len(expressions) * 1e6:>10.2f} µs/次")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="表达式计算基准测试")
+    parser.add_argument("--calls", type=int, default=20000, help="调用次数")
+    args = parser.parse_args()
+
+    template = "round((({i} + 3) * 4 - max(1, 2, {i}) / 7) ** 2 % 1000, 3)"
+    repeated = [template.format(i=1)] * args.calls
+    distinct = [template.format(i=i) for i in range(args.calls)]
+    for expression in distinct[:100]:
+        assert evaluate(expression) == legacy_eval(expression)
+
+    print("=== 重复表达式 ===")
+    measure("eval", legacy_eval, repeated)
+    measure("AST 求值器 (缓存命中)", evaluate, repeated)
+
+    print("\n=== 不同表达式 ===")
+    compile_expression.cache_clear()
+    measure("eval", legacy_eval, distinct)
+    measure("AST 求值器 (缓存未命中)", evaluate, distinct)
+    print(f"\n缓存统计: {compile_expression.cache_info()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+组提交基准测试
+对比逐条提交、组提交和 executemany 批量插入的吞吐量
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MCP_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+from advanced_mcp_server import AsyncDatabaseManager, DatabaseManager, GroupCommitWriter
+
+class FullSyncDatabaseManager(DatabaseManager):
+    """synchronous=FULL，每次提交都 fsync"""
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.execute('PRAGMA synchronous=FULL')
+        return conn
+
+def report(label: str, rows: int, elapsed: float):
+    print(f"{label:<28} {rows / elapsed:>12.0f} rows/sec  ({elapsed * 1000:.1f} ms)")
+
+async def run(args):
+    workdir = tempfile.mkdtemp()
+    db_class = FullSyncDatabaseManager if args.full_sync else DatabaseManager
+    db = db_class(os.path.join(workdir, "bench.db"))
+    async_db = AsyncDatabaseManager(db, writer=GroupCommitWriter(db, args.window_ms, args.max_rows))
+
+    async def burst(add):
+        start = time.perf_counter()
+        ids = await asyncio.gather(*[add(i) for i in range(args.rows)])
+        assert len(set(ids)) == args.rows
+        return time.perf_counter() - start
+
+    # 逐条提交：每个 add_note 自己一个事务
+    elapsed = await burst(lambda i: async_db._run(db.add_note, f"标题{i}", "内容", ["bench"]))
+    report("逐条提交", args.rows, elapsed)
+
+    # 组提交：同一窗口内的插入合并为一个事务
+    elapsed = await burst(lambda i: async_db.add_note(f"标题{i}", "内容", ["bench"]))
+    report("组提交", args.rows, elapsed)
+
+    # 批量工具：一次 executemany
+    notes = [{"title": f"标题{i}", "content": "内容", "tags": ["bench"]} for i in range(args.rows)]
+    start = time.perf_counter()
+    ids = await async_db.add_notes(notes)
+    assert len(ids) == args.rows
+    report("add_notes (executemany)", args.rows, time.perf_counter() - start)
+
+    async_db.shutdown()
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="组提交基准测试")
+    parser.add_argument("--rows", type=int, default=2000, help="每种场景插入的行数")
+    parser.add_argument("--window-ms", type=float, default=2, help="组提交窗口（毫秒）")
+    parser.add_argument("--max-rows", type=int, default=128, help="每个事务最多合并的行数")
+    parser.add_argument("--full-sync", action="store_true", help="使用 synchronous=FULL，每次提交都 fsync")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
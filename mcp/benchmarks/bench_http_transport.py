@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+传输方式负载测试
+对比 N 个 stdio 服务器进程（每个客户端一个）与一个 HTTP 服务器进程同时服务 N 个客户端时
+的请求吞吐量和服务器进程总内存 (RSS)
+"""
+
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+SERVERS = {
+    "simple": "simple_mcp_server.py",
+    "demo": "mcp_server.py",
+    "advanced": "advanced_mcp_server.py",
+}
+PROTOCOL_VERSION = "2025-06-18"
+# 高级服务器的数据库放到临时目录，不影响 mcp_data.db
+SERVER_ENV = dict(os.environ, MCP_DB_PATH=os.path.join(tempfile.mkdtemp(), "bench_http.db"))
+
+_ids = itertools.count(1)
+
+def request(method: str, params: dict = None) -> dict:
+    message = {"jsonrpc": "2.0", "id": next(_ids), "method": method}
+    if params is not None:
+        message["params"] = params
+    return message
+
+def initialize_request() -> dict:
+    return request("initialize", {
+        "protocolVersion": PROTOCOL_VERSION,
+        "capabilities": {},
+        "clientInfo": {"name": "bench-http-transport", "version": "1.0.0"},
+    })
+
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+def rss_kib(pid: int) -> int:
+    """读取进程常驻内存 (Linux /proc)，不可用时返回 0"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def spawn(script: str, *args: str, stdio: bool = True) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        sys.executable, script, *args,
+        cwd=SERVER_DIR,
+        env=SERVER_ENV,
+        stdin=asyncio.subprocess.PIPE if stdio else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE if stdio else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+async def stop(process: asyncio.subprocess.Process) -> None:
+    if process.stdin is not None:
+        process.stdin.close()
+    if process.returncode is None:
+        process.terminate()
+    await process.wait()
+    await asyncio.sleep(0)  # 让管道的关闭回调在事件循环结束前执行
+
+# ---- stdio ----
+
+async def stdio_call(process: asyncio.subprocess.Process, message: dict) -> dict:
+    process.stdin.write(json.dumps(message).encode() + b"\n")
+    await process.stdin.drain()
+    while True:
+        response = json.loads(await process.stdout.readline())
+        if response.get("id") == message["id"]:
+            return response
+
+async def stdio_session(script: str) -> asyncio.subprocess.Process:
+    process = await spawn(script)
+    await stdio_call(process, initialize_request())
+    process.stdin.write(json.dumps(INITIALIZED).encode() + b"\n")
+    return process
+
+async def stdio_calls(process: asyncio.subprocess.Process, tool: str, arguments: dict, calls: int) -> None:
+    for _ in range(calls):
+        response = await stdio_call(process, request("tools/call", {"name": tool, "arguments": arguments}))
+        assert "result" in response, response
+
+async def run_stdio(script: str, clients: int, tool: str, arguments: dict, calls: int):
+    processes = await asyncio.gather(*(stdio_session(script) for _ in range(clients)))
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(stdio_calls(p, tool, arguments, calls) for p in processes))
+        elapsed = time.perf_counter() - start
+        return elapsed, sum(rss_kib(p.pid) for p in processes)
+    finally:
+        await asyncio.gather(*(stop(p) for p in processes))
+
+# ---- HTTP ----
+
+def parse_response(response: httpx.Response, request_id: int) -> dict:
+    """解析 JSON 或 SSE 响应，返回 id 匹配的 JSON-RPC 消息"""
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        for line in response.text.splitlines():
+            if line.startswith("data:"):
+                message = json.loads(line[5:])
+                if message.get("id") == request_id:
+                    return message
+        raise RuntimeError("SSE 响应中没有对应的结果")
+    return response.json()
+
+HTTP_HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+async def http_session(url: str) -> tuple:
+    """每个客户端一个 AsyncClient，即一条独立的 keep-alive 连接"""
+    client = httpx.AsyncClient(timeout=30)
+    message = initialize_request()
+    response = await client.post(url, json=message, headers=HTTP_HEADERS)
+    result = parse_response(response, message["id"])["result"]
+    headers = dict(HTTP_HEADERS)
+    # 无状态模式（多进程）不返回会话ID
+    if "mcp-session-id" in response.headers:
+        headers["mcp-session-id"] = response.headers["mcp-session-id"]
+    headers["mcp-protocol-version"] = result["protocolVersion"]
+    await client.post(url, json=INITIALIZED, headers=headers)
+    return client, headers
+
+async def http_calls(url: str, session: tuple, tool: str, arguments: dict, calls: int) -> None:
+    client, headers = session
+    for _ in range(calls):
+        message = request("tools/call", {"name": tool, "arguments": arguments})
+        response = await client.post(url, json=message, headers=headers)
+        assert "result" in parse_response(response, message["id"])
+
+async def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+async def run_http(script: str, clients: int, tool: str, arguments: dict, calls: int,
+                   json_response: bool = False):
+    port = free_port()
+    flags = ["--json-response"] if json_response else []
+    process = await spawn(script, "--transport", "http", "--port", str(port), *flags, stdio=False)
+    try:
+        await wait_for_port(port)
+        url = f"http://127.0.0.1:{port}/mcp"
+        sessions = await asyncio.gather(*(http_session(url) for _ in range(clients)))
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(http_calls(url, session, tool, arguments, calls) for session in sessions))
+            elapsed = time.perf_counter() - start
+            return elapsed, rss_kib(process.pid)
+        finally:
+            await asyncio.gather(*(client.aclose() for client, _ in sessions))
+    finally:
+        await stop(process)
+
+async def run(args) -> None:
+    script = SERVERS[args.server]
+    arguments = json.loads(args.arguments)
+    total = args.clients * args.calls
+    print(f"=== {script}: {args.clients} 个客户端 × {args.calls} 次 {args.tool} ===")
+    runners = (
+        ("stdio (每客户端一个进程)", run_stdio),
+        ("HTTP SSE (单进程)", run_http),
+        ("HTTP JSON (单进程)", functools.partial(run_http, json_response=True)),
+    )
+    for label, runner in runners:
+        elapsed, memory = await runner(script, args.clients, args.tool, arguments, args.calls)
+        print(f"{label:<24} {total / elapsed:>10.0f} 请求/秒  服务器内存 {memory / 1024:>8.1f} MiB")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="传输方式负载测试")
+    parser.add_argument("--server", choices=SERVERS, default="simple", help="被测服务器")
+    parser.add_argument("--clients", type=int, default=16, help="并发客户端数量")
+    parser.add_argument("--calls", type=int, default=500, help="每个客户端的调用次数")
+    parser.add_argument("--tool", default="get_time", help="调用的工具")
+    parser.add_argument("--arguments", default="{}", help="工具参数 (JSON)")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+指标开销基准测试
+测量直方图记录的单次耗时、工具分发有无指标时的每次调用耗时，
+并在对数正态分布的延迟样本上检查直方图百分位数的相对误差
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp.types import CallToolResult
+
+from metrics import PERCENTILES, Histogram, Metrics
+from tool_registry import ToolRegistry
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"title": {"type": "string"}},
+}
+
+RESULT = CallToolResult(content=[{"type": "text", "text": "ok"}])
+
+async def handler(arguments):
+    return RESULT
+
+def measure_record(samples: int) -> float:
+    histogram = Histogram()
+    values = [random.lognormvariate(math.log(0.001), 1.0) for _ in range(1000)]
+    start = time.perf_counter()
+    for i in range(samples):
+        histogram.record(values[i % 1000])
+    return (time.perf_counter() - start) / samples
+
+async def measure_call(registry: ToolRegistry, calls: int) -> float:
+    arguments = {"title": "x"}
+    start = time.perf_counter()
+    for _ in range(calls):
+        await registry.call("tool", arguments)
+    return (time.perf_counter() - start) / calls
+
+def check_accuracy(samples: int) -> float:
+    """直方图百分位数与精确百分位数的最大相对误差"""
+    values = [random.lognormvariate(math.log(0.002), 1.5) for _ in range(samples)]
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    exact = sorted(values)
+    summary = histogram.summary()
+    worst = 0.0
+    for p in PERCENTILES:
+        expected = exact[max(1, -int(-samples * p // 100)) - 1] * 1000
+        actual = summary[f"p{p:g}_ms"]
+        error = abs(actual - expected) / expected
+        worst = max(worst, error)
+        print(f"  p{p:<5g} 精确 {expected:>9.3f} ms  直方图 {actual:>9.3f} ms  误差 {error:>6.2%}")
+    return worst
+
+async def run(args) -> None:
+    random.seed(0)
+    print(f"直方图记录: {measure_record(args.calls) * 1e9:.0f} ns/次")
+
+    plain = ToolRegistry()
+    plain.register("tool", "测试工具", SCHEMA, handler)
+    instrumented = ToolRegistry(metrics=Metrics().tools)
+    instrumented.register("tool", "测试工具", SCHEMA, handler)
+    await measure_call(plain, 1000)
+    await measure_call(instrumented, 1000)
+
+    base = min([await measure_call(plain, args.calls) for _ in range(3)])
+    with_metrics = min([await measure_call(instrumented, args.calls) for _ in range(3)])
+    overhead = with_metrics - base
+    print(f"工具分发 无指标: {base * 1e6:.2f} µs/次")
+    print(f"工具分发 有指标: {with_metrics * 1e6:.2f} µs/次 (每次调用增加 {overhead * 1e6:.2f} µs)")
+
+    print(f"\n{args.samples} 个对数正态样本的百分位数:")
+    worst = check_accuracy(args.samples)
+    print(f"最大相对误差 {worst:.2%}")
+
+    if overhead > args.budget_us / 1e6:
+        print(f"指标开销超出预算 {args.budget_us} µs")
+        sys.exit(1)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="指标开销基准测试")
+    parser.add_argument("--calls", type=int, default=200_000, help="每项测量的调用次数")
+    parser.add_argument("--samples", type=int, default=100_000, help="精度检查的样本数")
+    parser.add_argument("--budget-us", type=float, default=5.0, help="每次工具调用允许增加的微秒数")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
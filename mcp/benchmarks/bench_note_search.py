@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+笔记全文搜索基准测试
+在大量笔记上对比按时间倒序取一页结果时 LIKE 扫描与 FTS5 索引的耗时，
+以及 search_notes 按相关度排序和按时间排序（按匹配数自动选择路径）的耗时
+"""
+
+import argparse
+import itertools
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MCP_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+from advanced_mcp_server import FTS_MAX_MATCHES, INSERT_NOTE_SQL, DatabaseManager, fts_query, note_params
+
+_vocabulary_rng = random.Random(1)
+VOCABULARY = [
+    "".join(_vocabulary_rng.choices(string.ascii_lowercase, k=_vocabulary_rng.randint(5, 9)))
+    for _ in range(50000)
+]
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, 50001)))
+TOPICS = ["性能优化", "会议纪要", "项目计划", "故障复盘", "接口设计", "数据迁移"]
+QUERIES = [
+    VOCABULARY[0],
+    VOCABULARY[99],
+    VOCABULARY[9999],
+    f"{VOCABULARY[9]} {VOCABULARY[199]}",
+    "故障复盘",
+    "zzzzzzzzzz",
+]
+
+def populate(db: DatabaseManager, rows: int, batch: int = 20000):
+    """写入 rows 条笔记，词频服从 Zipf 分布，FTS 索引由触发器同步维护"""
+    rng = random.Random(7)
+    conn = db.get_connection()
+    for offset in range(0, rows, batch):
+        count = min(batch, rows - offset)
+        conn.executemany(INSERT_NOTE_SQL, [
+            note_params(
+                " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=3)),
+                " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=20)) + (" " + rng.choice(TOPICS) if rng.random() < 0.01 else ""),
+                rng.choices(VOCABULARY[:100], k=2),
+            )
+            for _ in range(count)
+        ])
+        conn.commit()
+
+def best_of(func, repeat: int) -> float:
+    """返回 repeat 次中最快的一次耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="笔记全文搜索基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="笔记数量")
+    parser.add_argument("--limit", type=int, default=10, help="每页结果数量")
+    parser.add_argument("--repeat", type=int, default=3, help="每个查询重复次数")
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    start = time.perf_counter()
+    populate(db, args.rows)
+    print(f"写入 {args.rows} 条笔记耗时 {time.perf_counter() - start:.1f} s\n")
+
+    conn = db.get_connection()
+    print(f"{'查询':<24} {'匹配行数':>10} {'LIKE ms':>12} {'FTS5 ms':>12} {'relevance ms':>14} {'recent ms':>12}  recent 路径")
+    for query in QUERIES:
+        terms = query.split()
+        like_ms = best_of(
+            lambda: conn.execute(*db.build_like_search_query(terms, None, args.limit)).fetchall(),
+            args.repeat,
+        )
+        fts_ms = best_of(
+            lambda: conn.execute(*db.build_fts_search_query(terms, None, args.limit, "recent")).fetchall(),
+            args.repeat,
+        )
+        relevance_ms = best_of(lambda: db.search_notes(query, args.limit, None, "relevance"), args.repeat)
+        recent_ms = best_of(lambda: db.search_notes(query, args.limit, None, "recent"), args.repeat)
+        matches = conn.execute(
+            'SELECT count(*) FROM notes_fts WHERE notes_fts MATCH ?', (fts_query(terms),)
+        ).fetchone()[0]
+        path = "FTS5" if matches < FTS_MAX_MATCHES else "LIKE"
+        print(f"{query:<24} {matches:>10} {like_ms:>12.2f} {fts_ms:>12.2f} {relevance_ms:>14.2f} {recent_ms:>12.2f}  {path}")
+
+    db.close()
+
+if __name__ == "__main__":
+    main()
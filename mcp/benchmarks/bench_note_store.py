@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+内存笔记存储基准测试
+在 100 万条笔记上对比旧的字典列表与 NoteStore 的每条笔记内存占用，
+以及按 id / 标签查询的耗时
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from note_store import NoteStore
+
+TAGS = ["工作", "学习", "生活", "会议", "想法", "待办", "阅读", "旅行"]
+
+def note_fields(count: int):
+    rng = random.Random(42)
+    for i in range(count):
+        yield f"笔记 {i}", f"内容 {i}", rng.sample(TAGS, rng.randint(0, 3))
+
+def build_list(count: int) -> list:
+    """旧实现：data_store["notes"] 中的字典列表"""
+    notes = []
+    for title, content, tags in note_fields(count):
+        notes.append({
+            "id": len(notes) + 1,
+            "title": title,
+            "content": content,
+            "tags": tags,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+    return notes
+
+def build_store(count: int) -> NoteStore:
+    store = NoteStore()
+    for title, content, tags in note_fields(count):
+        store.add(title, content, tags)
+    return store
+
+def measure_memory(label: str, build, count: int):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(count)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16} {size / count:>8.1f} 字节/条  总计 {size / 2**20:>8.1f} MiB  构建 {elapsed:.2f} s")
+    return result
+
+def measure(label: str, func, calls: int) -> None:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed / calls * 1e6:>12.2f} µs/次")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="内存笔记存储基准测试")
+    parser.add_argument("--notes", type=int, default=1_000_000, help="笔记数量")
+    args = parser.parse_args()
+
+    print(f"=== 内存占用 ({args.notes} 条笔记，tracemalloc 统计) ===")
+    notes = measure_memory("字典列表", build_list, args.notes)
+    store = measure_memory("NoteStore", build_store, args.notes)
+
+    print("\n=== 查询 ===")
+    rng = random.Random(7)
+    ids = [rng.randint(1, args.notes) for _ in range(1000)]
+    measure("列表线性查找 id", lambda: next(n for n in notes if n["id"] == ids[0]), 20)
+    measure("NoteStore.get (1000 个 id)", lambda: [store.get(i) for i in ids], 1000)
+    measure("列表过滤标签 (最近 20 条)",
+            lambda: [n for n in notes if "会议" in n["tags"]][-20:], 3)
+    measure("NoteStore.with_tag (最近 20 条)", lambda: store.with_tag("会议", 20), 10000)
+    measure("NoteStore.latest(10)", lambda: store.latest(10), 10000)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+持久化基准测试
+向 NoteStore 写入 100 万次修改（添加 / 更新 / 删除），测量写日志的开销，
+以及从纯日志重放和从快照恢复两种情况下的重启耗时
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from note_store import NoteStore
+from persistence import Persistence
+
+TAGS = ["工作", "学习", "生活", "会议", "想法"]
+
+def open_store(directory: str, snapshot_every: int, fsync_ms: float):
+    store = NoteStore()
+    persistence = Persistence(directory, "bench", store.apply_log_entry, store.dump_state, store.load_state,
+                              fsync_interval_ms=fsync_ms, snapshot_every=snapshot_every)
+    stats = persistence.open()
+    store.listener = persistence.append
+    return store, persistence, stats
+
+def run_operations(store: NoteStore, count: int) -> None:
+    rng = random.Random(42)
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.8 or len(store) < 100:
+            store.add(f"笔记 {i}", f"内容 {i}", rng.sample(TAGS, rng.randint(0, 2)))
+        elif roll < 0.95:
+            store.update(rng.randint(1, i), title=f"修改 {i}")
+        else:
+            store.delete(rng.randint(1, i))
+
+def write_phase(label: str, count: int, fsync_ms: float, snapshot_every: int = None):
+    """写入 count 次修改；snapshot_every 为空时日志中保留全部修改"""
+    directory = tempfile.mkdtemp(prefix="mcp-persist-")
+    store, persistence, _ = open_store(directory, snapshot_every or count + 1, fsync_ms)
+    start = time.perf_counter()
+    run_operations(store, count)
+    persistence.close()
+    elapsed = time.perf_counter() - start
+    wal_size = os.path.getsize(persistence.wal_path)
+    print(f"{label:<26} {elapsed:>7.2f} s  {count / elapsed:>10.0f} 次/秒  日志 {wal_size / 2**20:.1f} MiB")
+    return directory, len(store), store.version
+
+def restart(label: str, directory: str, expected_notes: int, expected_version: int) -> None:
+    start = time.perf_counter()
+    store, persistence, stats = open_store(directory, 10**9, 10)
+    elapsed = time.perf_counter() - start
+    persistence.close()
+    assert len(store) == expected_notes and store.version == expected_version
+    print(f"{label:<26} {elapsed:>7.2f} s  (快照 {stats['snapshot_seconds']:.2f} s, "
+          f"重放 {stats['replayed_entries']} 条 {stats['replay_seconds']:.2f} s)  {len(store)} 条笔记")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="持久化基准测试")
+    parser.add_argument("--ops", type=int, default=1_000_000, help="修改次数")
+    parser.add_argument("--fsync-ms", type=float, default=10, help="批量 fsync 间隔 (ms)")
+    args = parser.parse_args()
+
+    baseline_start = time.perf_counter()
+    run_operations(NoteStore(), args.ops)
+    baseline = time.perf_counter() - baseline_start
+    print(f"=== {args.ops} 次修改 ===")
+    print(f"{'不持久化':<26} {baseline:>7.2f} s  {args.ops / baseline:>10.0f} 次/秒")
+
+    wal_only, notes, version = write_phase("写日志 (不写快照)", args.ops, args.fsync_ms)
+    snapshotted, _, _ = write_phase("写日志 + 每 10 万条快照", args.ops, args.fsync_ms, 100_000)
+
+    print("\n=== 重启 ===")
+    try:
+        restart("从日志重放", wal_only, notes, version)
+        restart("从快照恢复", snapshotted, notes, version)
+    finally:
+        shutil.rmtree(wal_only, ignore_errors=True)
+        shutil.rmtree(snapshotted, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
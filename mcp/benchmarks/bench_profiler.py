@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+性能剖析开销基准测试
+测量工具分发在不带剖析器、剖析器关闭、全部抽样（可选内存追踪）时的每次调用耗时，
+确认默认关闭时的开销在预算内
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp.types import CallToolResult
+
+from profiler import ToolProfiler
+from tool_registry import ToolRegistry
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"title": {"type": "string"}},
+}
+
+RESULT = CallToolResult(content=[{"type": "text", "text": "ok"}])
+
+async def handler(arguments):
+    return RESULT
+
+def make_registry(profiler=None) -> ToolRegistry:
+    registry = ToolRegistry(profiler=profiler)
+    registry.register("tool", "测试工具", SCHEMA, handler)
+    return registry
+
+async def measure_call(registry: ToolRegistry, calls: int) -> float:
+    arguments = {"title": "x"}
+    start = time.perf_counter()
+    for _ in range(calls):
+        await registry.call("tool", arguments)
+    return (time.perf_counter() - start) / calls
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        plain = make_registry()
+        disabled = make_registry(ToolProfiler(sample_rate=0, directory=directory))
+        await measure_call(plain, 1000)
+        await measure_call(disabled, 1000)
+        base = min([await measure_call(plain, args.calls) for _ in range(3)])
+        off = min([await measure_call(disabled, args.calls) for _ in range(3)])
+        overhead = off - base
+        print(f"工具分发 无剖析器: {base * 1e6:.2f} µs/次")
+        print(f"工具分发 剖析关闭: {off * 1e6:.2f} µs/次 (每次调用增加 {overhead * 1e6:.2f} µs)")
+
+        for memory in (False, True):
+            profiler = ToolProfiler(sample_rate=1, directory=directory, max_files=args.max_files, memory=memory)
+            sampled = await measure_call(make_registry(profiler), args.sampled_calls)
+            profiler.configure(sample_rate=0)
+            label = "全部抽样+内存" if memory else "全部抽样"
+            print(f"工具分发 {label}: {sampled * 1e6:.0f} µs/次 (不含后台写文件)")
+        # 等待后台线程写完结果再删除目录
+        await asyncio.sleep(0.5)
+
+    if overhead > args.budget_us / 1e6:
+        print(f"剖析关闭时的开销超出预算 {args.budget_us} µs")
+        sys.exit(1)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="性能剖析开销基准测试")
+    parser.add_argument("--calls", type=int, default=200_000, help="关闭剖析时每项测量的调用次数")
+    parser.add_argument("--sampled-calls", type=int, default=200, help="全部抽样时的调用次数")
+    parser.add_argument("--max-files", type=int, default=20, help="测量期间保留的结果文件数")
+    parser.add_argument("--budget-us", type=float, default=1.0, help="剖析关闭时每次调用允许增加的微秒数")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+列表渲染基准测试
+对比逐行字符串拼接与预编译模板渲染在大列表上的耗时
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from renderer import OUTPUT_FORMATS, Field, ListRenderer, join_list, truncate
+
+NOTE_RENDERER = ListRenderer("笔记列表:", [
+    Field("id", "ID"),
+    Field("title", "标题"),
+    Field("content", "内容", truncate(100)),
+    Field("tags", "标签", join_list()),
+    Field("created_at", "创建时间"),
+], empty_text="暂无笔记")
+
+def concat_notes(notes):
+    """旧实现：每行 += 六次"""
+    result = "笔记列表:\n\n"
+    for note in notes:
+        result += f"ID: {note['id']}\n"
+        result += f"标题: {note['title']}\n"
+        result += f"内容: {note['content'][:100]}{'...' if len(note['content']) > 100 else ''}\n"
+        result += f"标签: {', '.join(note['tags']) if note['tags'] else '无'}\n"
+        result += f"创建时间: {note['created_at']}\n"
+        result += "-" * 50 + "\n"
+    return result
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="列表渲染基准测试")
+    parser.add_argument("--rows", type=int, default=10_000, help="行数")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数")
+    args = parser.parse_args()
+
+    notes = [
+        {
+            "id": i,
+            "title": f"笔记标题 {i}",
+            "content": "这是笔记的正文内容，" * (i % 20),
+            "tags": ["工作", "会议"] if i % 3 else [],
+            "created_at": "2024-01-15 10:00:00",
+        }
+        for i in range(args.rows)
+    ]
+    assert NOTE_RENDERER.render(notes) == concat_notes(notes)
+
+    print(f"{'方式':<20} {'ms/次':>10} {'rows/sec':>14}")
+    scenarios = [("字符串拼接", lambda: concat_notes(notes))]
+    scenarios += [(f"渲染器 {fmt}", lambda fmt=fmt: NOTE_RENDERER.render(notes, fmt)) for fmt in OUTPUT_FORMATS]
+    for label, func in scenarios:
+        elapsed = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f"{label:<20} {elapsed * 1000:>10.2f} {args.rows / elapsed:>14.0f}")
+
+if __name__ == "__main__":
+    main()
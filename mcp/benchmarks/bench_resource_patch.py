@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+资源增量写入基准测试
+在 10 万条笔记上对比修改一条笔记的一个字段时：
+整体读取-修改-写回 data://notes、JSON Patch 与 merge patch（patch_notes 工具）的耗时
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mcp_server
+from mcp_server import handle_call_tool, note_store
+
+def result_text_of(result) -> str:
+    content = result.content[0]
+    return content["text"] if isinstance(content, dict) else content.text
+
+async def measure(label: str, write, calls: int) -> None:
+    start = time.perf_counter()
+    for i in range(calls):
+        result = await write(i)
+        assert not result.isError, result_text_of(result)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed / calls * 1000:>10.3f} ms/次")
+
+async def run(note_count: int, calls: int) -> None:
+    note_store.replace(
+        {"title": f"笔记 {i}", "content": f"内容 {i}", "tags": ["工作"] if i % 3 else ["生活"]}
+        for i in range(note_count)
+    )
+    rng = random.Random(42)
+    ids = [rng.randint(1, note_count) for _ in range(calls)]
+
+    async def full_replace(i):
+        # 与读取 data://notes 相同的序列化，客户端修改后整体写回
+        etag = mcp_server.make_etag(note_store.version)
+        notes = json.loads(json.dumps(note_store.to_list(), ensure_ascii=False, indent=2))
+        notes[ids[i] - 1]["title"] = f"修改 {i}"
+        patch = json.loads(json.dumps(notes))
+        return await handle_call_tool("patch_notes", {"patch": patch, "mode": "replace", "if_match": etag})
+
+    async def json_patch(i):
+        etag = mcp_server.make_etag(note_store.version)
+        patch = [{"op": "replace", "path": f"/{ids[i]}/title", "value": f"修改 {i}"}]
+        return await handle_call_tool("patch_notes", {"patch": patch, "mode": "json", "if_match": etag})
+
+    async def merge(i):
+        etag = mcp_server.make_etag(note_store.version)
+        patch = {str(ids[i]): {"title": f"修改 {i}"}}
+        return await handle_call_tool("patch_notes", {"patch": patch, "mode": "merge", "if_match": etag})
+
+    print(f"=== {note_count} 条笔记，修改一条笔记的标题 ===")
+    await measure("整体读取并写回", full_replace, max(calls // 100, 1))
+    await measure("JSON Patch", json_patch, calls)
+    await measure("merge patch", merge, calls)
+    assert len(note_store) == note_count
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="资源增量写入基准测试")
+    parser.add_argument("--notes", type=int, default=100000, help="笔记数量")
+    parser.add_argument("--calls", type=int, default=1000, help="补丁写入次数（整体写回为其 1/100）")
+    args = parser.parse_args()
+    asyncio.run(run(args.notes, args.calls))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+资源序列化基准测试
+对比整页构建后 json.dumps(indent=2) 与逐行流式序列化的峰值内存、吞吐量和输出大小，
+以及字段投影和截断下推到 SELECT 后的差异。
+资源读取要返回完整字符串，流式序列化省掉的是整页的行对象，输出文本仍整页驻留，
+峰值内存仍与输出大小成正比（见“峰值/输出”列）
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MCP_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+from advanced_mcp_server import RESOURCE_FORMATS, DatabaseManager, note_projection, task_projection
+
+def populate(db: DatabaseManager, rows: int):
+    """写入 rows 条笔记和任务"""
+    db.add_notes([
+        {"title": f"笔记{i}", "content": "这是一条用于序列化测试的笔记内容。" * 4, "tags": ["bench", f"t{i % 10}"]}
+        for i in range(rows)
+    ])
+    db.add_tasks([
+        {"title": f"任务{i}", "description": "任务描述" * 8, "priority": "high", "due_date": "2024-12-31"}
+        for i in range(rows)
+    ])
+
+def buffered(db: DatabaseManager, kind: str, rows: int) -> str:
+    """旧实现：先取出整页再一次性 json.dumps"""
+    if kind == "notes":
+        items, next_cursor = db.get_notes_page(rows)
+    else:
+        items, next_cursor = db.get_tasks_page(limit=rows)
+    return json.dumps({"items": items, "next_cursor": next_cursor}, ensure_ascii=False, indent=2)
+
+def streamed(db: DatabaseManager, kind: str, rows: int, fmt: str, fields=None, truncate=None) -> str:
+    """流式实现：逐行写入 StringIO，可选字段投影和截断"""
+    out = io.StringIO()
+    if kind == "notes":
+        db.write_notes_page(out, rows, fmt=fmt, projection=note_projection(fields, truncate))
+    else:
+        db.write_tasks_page(out, limit=rows, fmt=fmt, projection=task_projection(fields, truncate))
+    return out.getvalue()
+
+def measure(func):
+    """返回 (耗时秒, 峰值内存字节, 输出字节数)"""
+    start = time.perf_counter()
+    content = func()
+    elapsed = time.perf_counter() - start
+    size = len(content.encode())
+    del content
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="资源序列化基准测试")
+    parser.add_argument("--rows", type=int, default=100_000, help="每张表的行数")
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    populate(db, args.rows)
+
+    for kind in ("notes", "tasks"):
+        print(f"\n=== data://{kind} ({args.rows} 行) ===")
+        print(f"{'方式':<26} {'rows/sec':>12} {'峰值内存 MB':>12} {'输出 MB':>10} {'峰值/输出':>10}")
+        scenarios = [("整页 json.dumps", lambda: buffered(db, kind, args.rows))]
+        scenarios += [
+            (f"流式 {fmt}", lambda fmt=fmt: streamed(db, kind, args.rows, fmt)) for fmt in RESOURCE_FORMATS
+        ]
+        text_field = "content" if kind == "notes" else "description"
+        scenarios += [
+            ("compact fields=id,title", lambda: streamed(db, kind, args.rows, "compact", ["id", "title"])),
+            (f"compact {text_field}:16", lambda: streamed(db, kind, args.rows, "compact", None, {text_field: 16})),
+        ]
+        for label, func in scenarios:
+            elapsed, peak, size = measure(func)
+            print(f"{label:<26} {args.rows / elapsed:>12.0f} {peak / 2**20:>12.1f} {size / 2**20:>10.1f} {peak / size:>10.1f}")
+
+    db.close()
+
+if __name__ == "__main__":
+    main()
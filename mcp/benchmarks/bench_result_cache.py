@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+结果缓存基准测试
+分别关闭和开启结果缓存启动高级服务器，在预置任务上按读写比例调用 list_tasks / complete_task，
+报告客户端吞吐量、服务器端 list_tasks 平均耗时、实际执行的数据库查询次数和缓存命中率
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp_client import MCPClient, result_text
+
+SERVER_DIR = str(Path(__file__).resolve().parent.parent)
+FILTERS = [{}, {"status": "pending"}, {"status": "completed"}, {"priority": "high"}, {"priority": "low"}]
+
+async def run_case(cache_size: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MCP_DB_PATH=os.path.join(directory, "bench.db"),
+                   MCP_RESULT_CACHE_SIZE=str(cache_size))
+        async with MCPClient("advanced_mcp_server.py", cwd=SERVER_DIR, env=env) as client:
+            rng = random.Random(args.seed)
+            await client.call_tool("add_tasks", {"tasks": [
+                {"title": f"任务 {i}", "description": "结果缓存基准测试" * 4,
+                 "priority": rng.choice(["low", "medium", "high"])}
+                for i in range(args.tasks)
+            ]})
+            start = time.perf_counter()
+            for _ in range(args.calls):
+                if rng.random() < args.write_ratio:
+                    await client.call_tool("complete_task", {"task_id": rng.randint(1, args.tasks)})
+                else:
+                    arguments = dict(rng.choice(FILTERS), limit=args.limit)
+                    await client.call_tool("list_tasks", arguments)
+            elapsed = time.perf_counter() - start
+            stats = json.loads(result_text(await client.call_tool("server_stats", {"format": "json"})))
+    return {
+        "throughput": args.calls / elapsed,
+        "list_mean_ms": stats["tools"]["list_tasks"]["latency"]["mean_ms"],
+        "queries": stats["db"].get("get_tasks_page", {}).get("calls", 0),
+        "hit_rate": stats["cache"]["hit_rate"],
+    }
+
+async def run(args) -> None:
+    print(f"{args.tasks} 个任务，{args.calls} 次调用，写入比例 {args.write_ratio:.0%}，每页 {args.limit} 条\n")
+    print(f"{'缓存':<8}{'吞吐量 (次/秒)':>16}{'list_tasks 平均 ms':>20}{'数据库查询':>12}{'命中率':>10}")
+    for label, size in (("关闭", 0), ("开启", args.cache_size)):
+        result = await run_case(size, args)
+        print(f"{label:<8}{result['throughput']:>16.0f}{result['list_mean_ms']:>20.3f}"
+              f"{result['queries']:>12}{result['hit_rate']:>10.1%}")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="结果缓存基准测试")
+    parser.add_argument("--tasks", type=int, default=2000, help="预置任务数")
+    parser.add_argument("--calls", type=int, default=2000, help="调用次数")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="complete_task 占调用的比例")
+    parser.add_argument("--limit", type=int, default=50, help="list_tasks 每页条数")
+    parser.add_argument("--cache-size", type=int, default=256, help="开启时的缓存条数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
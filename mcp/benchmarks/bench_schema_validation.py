@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+参数校验基准测试
+测量高级服务器各工具预编译 inputSchema 校验的单次耗时，
+安装了 jsonschema 时一并对比其预构建的校验器
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MCP_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+from advanced_mcp_server import async_db, tools
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+CALLS = {
+    "add_note": {"title": "周会纪要", "content": "讨论了性能优化计划", "tags": ["会议", "性能"]},
+    "add_tasks": {"tasks": [
+        {"title": f"任务 {i}", "description": "说明", "priority": "high", "due_date": "2024-12-31"}
+        for i in range(20)
+    ]},
+    "list_notes": {"limit": 20, "tags": ["会议"], "tag_mode": "all", "format": "json"},
+    "list_tasks": {"status": "pending", "priority": "high", "limit": 50},
+    "complete_task": {"task_id": 42},
+    "calculate": {"expression": "2 + 3 * 4"},
+}
+
+def measure(label: str, validate, arguments, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        validate(arguments)
+    per_call = (time.perf_counter() - start) / calls * 1e6
+    print(f"  {label:<16} {per_call:>8.2f} µs/次")
+    return per_call
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="参数校验基准测试")
+    parser.add_argument("--calls", type=int, default=100000, help="每个工具的校验次数")
+    parser.add_argument("--budget-us", type=float, default=5.0,
+                        help="单个参数的工具允许的最大耗时 (µs)，超出时返回非零退出码")
+    args = parser.parse_args()
+
+    schemas = {tool.name: tool.inputSchema for tool in tools.list_tools().tools}
+    failed = False
+    try:
+        for name, arguments in CALLS.items():
+            print(f"{name}:")
+            per_call = measure("预编译校验", lambda a, n=name: tools.validate(n, a), arguments, args.calls)
+            if jsonschema is not None:
+                validator = jsonschema.validators.validator_for(schemas[name])(schemas[name])
+                measure("jsonschema", validator.validate, arguments, max(args.calls // 10, 1))
+            if name != "add_tasks" and per_call > args.budget_us:
+                print(f"  超出 {args.budget_us} µs 预算")
+                failed = True
+    finally:
+        async_db.shutdown()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
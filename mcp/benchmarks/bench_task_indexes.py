@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+任务索引基准测试
+用 EXPLAIN QUERY PLAN 检查热点查询走索引，并对比有无索引时的查询耗时
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MCP_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+from advanced_mcp_server import PRIORITY_RANKS, DatabaseManager, encode_cursor, encode_token
+
+STATUSES = ["pending", "completed"]
+PRIORITIES = ["low", "medium", "high"]
+FILTERS = [
+    (None, None),
+    ("pending", None),
+    (None, "high"),
+    ("pending", "high"),
+]
+# 截止时间查询的参考“当前时刻”：2024-07-01 00:00:00 UTC
+NOW = 1719792000
+# 约 20% 的任务没有截止日期
+NO_DUE_RATIO = 0.2
+
+def populate(db: DatabaseManager, rows: int, batch: int = 50000):
+    """写入 rows 个任务和同样数量的笔记，创建时间和截止时间分布在一年内"""
+    conn = db.get_connection()
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+    for offset in range(0, rows, batch):
+        count = min(batch, rows - offset)
+        stamps = [
+            (start + timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+            for _ in range(count)
+        ]
+        tasks = []
+        for i in range(count):
+            priority = rng.choice(PRIORITIES)
+            due_at = None if rng.random() < NO_DUE_RATIO else NOW + rng.randrange(-180 * 86400, 180 * 86400)
+            due_date = None if due_at is None else time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(due_at))
+            tasks.append((f"任务{offset + i}", "描述", priority, rng.choice(STATUSES), stamps[i],
+                          due_date, due_at, PRIORITY_RANKS[priority]))
+        conn.executemany(
+            'INSERT INTO tasks (title, description, priority, status, created_at, due_date, due_at, priority_rank) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            tasks
+        )
+        conn.executemany(
+            'INSERT INTO notes (title, content, tags, created_at) VALUES (?, ?, ?, ?)',
+            [(f"笔记{offset + i}", "内容", "[]", stamps[i]) for i in range(count)]
+        )
+        conn.commit()
+    conn.execute('ANALYZE')
+    conn.commit()
+
+def hot_queries(db: DatabaseManager):
+    """热点查询：(名称, SQL, 参数)"""
+    queries = []
+    middle = encode_cursor("2024-07-01 00:00:00", 1)
+    for status, priority in FILTERS:
+        for after in (None, middle):
+            query, params = db.build_tasks_query(status, priority, after, 50)
+            label = f"list_tasks status={status} priority={priority}{' (翻页)' if after else ''}"
+            queries.append((label, query, params))
+    for after in (None, middle):
+        query, params = db.build_notes_query(after, 10)
+        queries.append((f"list_notes limit=10{' (翻页)' if after else ''}", query, params))
+    for after in (None, encode_token([NOW - 30 * 86400, 1])):
+        query, params = db.build_due_tasks_query(NOW, None, after, 50)
+        queries.append((f"list_overdue_tasks{' (翻页)' if after else ''}", query, params))
+    query, params = db.build_due_tasks_query(NOW + 7 * 86400, NOW, None, 50)
+    queries.append(("list_upcoming_tasks window=7d", query, params))
+    query, params = db.build_priority_tasks_query("pending", None, 50)
+    queries.append(("list_tasks_by_priority", query, params))
+    cursor = encode_token([PRIORITY_RANKS["medium"], NOW, 1])
+    for next_ranks in (False, True):
+        query, params = db.build_priority_tasks_query("pending", cursor, 50, next_ranks=next_ranks)
+        label = "更低优先级" if next_ranks else "同优先级"
+        queries.append((f"list_tasks_by_priority (翻页, {label})", query, params))
+    return queries
+
+def check_plans(db: DatabaseManager) -> bool:
+    """断言热点查询都走索引且不需要额外排序"""
+    ok = True
+    for name, query, params in hot_queries(db):
+        plan = db.explain(query, params)
+        uses_index = any("USING INDEX" in line or "USING COVERING INDEX" in line for line in plan)
+        sorts = any("TEMP B-TREE" in line for line in plan)
+        passed = uses_index and not sorts
+        ok = ok and passed
+        print(f"{'✓' if passed else '✗'} {name}: {' | '.join(plan)}")
+    return ok
+
+def time_queries(db: DatabaseManager, repeat: int):
+    """返回每个热点查询的平均耗时（毫秒）"""
+    conn = db.get_connection()
+    results = {}
+    for name, query, params in hot_queries(db):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(query, params).fetchall()
+        results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="任务索引基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="任务和笔记的行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询重复次数")
+    parser.add_argument("--check-only", action="store_true", help="只检查查询计划")
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    populate(db, 1000 if args.check_only else args.rows)
+
+    print("=== 查询计划 ===")
+    if not check_plans(db):
+        sys.exit(1)
+    if args.check_only:
+        return
+
+    print(f"\n=== 查询耗时 ({args.rows} 行) ===")
+    indexed = time_queries(db, args.repeat)
+
+    conn = db.get_connection()
+    index_names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+    )]
+    for name in index_names:
+        conn.execute(f'DROP INDEX {name}')
+    conn.commit()
+    unindexed = time_queries(db, args.repeat)
+
+    print(f"{'查询':<52} {'无索引 ms':>12} {'有索引 ms':>12}")
+    for name, elapsed in indexed.items():
+        print(f"{name:<52} {unindexed[name]:>12.2f} {elapsed:>12.2f}")
+
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+工具分发基准测试
+对比 if/elif 链与注册表字典分发，以及每次重建与缓存的 tools/list
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp.types import CallToolResult, ListToolsResult, Tool
+
+from tool_registry import ToolRegistry
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "description": "标题"},
+        "limit": {"type": "integer", "description": "数量限制"},
+        "tags": {"type": "array", "items": {"type": "string"}, "description": "标签列表"}
+    },
+    "required": ["title"]
+}
+
+async def handler(arguments):
+    return CallToolResult(content=[{"type": "text", "text": "ok"}])
+
+def build_chain(names):
+    """生成与旧 handle_call_tool 相同结构的 if/elif 分发函数"""
+    lines = ["async def dispatch(name, arguments):"]
+    for index, name in enumerate(names):
+        lines.append(f"    {'if' if index == 0 else 'elif'} name == {name!r}:")
+        lines.append("        return await handler(arguments)")
+    namespace = {"handler": handler}
+    exec("\n".join(lines), namespace)
+    return namespace["dispatch"]
+
+async def measure(label: str, func, calls: int) -> None:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30} {elapsed / calls * 1e6:>10.2f} µs/次")
+
+async def run(tool_count: int, calls: int) -> None:
+    names = [f"tool_{i}" for i in range(tool_count)]
+    registry = ToolRegistry()
+    for name in names:
+        registry.register(name, f"{name} 描述", SCHEMA, handler)
+    chain = build_chain(names)
+    last = names[-1]
+
+    print(f"=== {tool_count} 个工具 ===")
+    await measure("if/elif 链 (最后一个工具)", lambda: chain(last, {}), calls)
+    await measure("注册表字典分发", lambda: registry.call(last, {}), calls)
+
+    async def rebuild():
+        return ListToolsResult(tools=[
+            Tool(name=name, description=f"{name} 描述", inputSchema=SCHEMA) for name in names
+        ])
+
+    async def cached():
+        return registry.list_tools()
+
+    await measure("tools/list 每次重建", rebuild, max(calls // 100, 1))
+    await measure("tools/list 缓存", cached, calls)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="工具分发基准测试")
+    parser.add_argument("--tools", type=int, default=40, help="注册的工具数量")
+    parser.add_argument("--calls", type=int, default=100000, help="调用次数")
+    args = parser.parse_args()
+    asyncio.run(run(args.tools, args.calls))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+多进程模式扩展性测试
+以 1/2/4/8 个工作进程启动高级服务器的 HTTP 传输，所有进程共享同一个 SQLite 数据库，
+由本地负载生成器按读写比例调用 list_notes / add_note，报告吞吐量、错误数，
+并在结束后核对数据库中的笔记数量（检查并发写入没有丢失）
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from bench_http_transport import (
+    SERVER_DIR, SERVER_ENV, free_port, http_session, parse_response, request, rss_kib, stop, wait_for_port,
+)
+
+async def spawn_server(port: int, workers: int) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "advanced_mcp_server.py",
+        "--transport", "http", "--port", str(port), "--json-response", "--workers", str(workers),
+        cwd=SERVER_DIR,
+        env=SERVER_ENV,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+def children_rss_kib(pid: int) -> int:
+    """主进程与全部工作进程的常驻内存之和"""
+    total = rss_kib(pid)
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            total += sum(rss_kib(int(child)) for child in f.read().split())
+    except OSError:
+        pass
+    return total
+
+async def client_calls(url: str, session: tuple, calls: int, write_ratio: float, rng: random.Random) -> tuple:
+    """返回 (写入成功数, 错误数)"""
+    client, headers = session
+    writes = errors = 0
+    for i in range(calls):
+        if rng.random() < write_ratio:
+            message = request("tools/call", {"name": "add_note", "arguments": {
+                "title": f"bench {i}", "content": "multi-worker load", "tags": ["bench"],
+            }})
+        else:
+            message = request("tools/call", {"name": "list_notes", "arguments": {"limit": 10}})
+        response = await client.post(url, json=message, headers=headers)
+        result = parse_response(response, message["id"]).get("result")
+        if result is None or result.get("isError"):
+            errors += 1
+        elif message["params"]["name"] == "add_note":
+            writes += 1
+    return writes, errors
+
+def count_notes(db_path: str) -> int:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT count(*) FROM notes").fetchone()[0]
+
+async def run_workers(workers: int, args) -> None:
+    db_path = SERVER_ENV["MCP_DB_PATH"]
+    before = count_notes(db_path) if os.path.exists(db_path) else 0
+    port = free_port()
+    process = await spawn_server(port, workers)
+    try:
+        await wait_for_port(port)
+        url = f"http://127.0.0.1:{port}/mcp"
+        sessions = await asyncio.gather(*(http_session(url) for _ in range(args.clients)))
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(
+                client_calls(url, session, args.calls, args.write_ratio, random.Random(i))
+                for i, session in enumerate(sessions)
+            ))
+            elapsed = time.perf_counter() - start
+            memory = children_rss_kib(process.pid)
+        finally:
+            await asyncio.gather(*(client.aclose() for client, _ in sessions))
+    finally:
+        await stop(process)
+
+    writes = sum(w for w, _ in results)
+    errors = sum(e for _, e in results)
+    stored = count_notes(db_path) - before
+    total = args.clients * args.calls
+    status = "一致" if stored == writes else f"不一致 (写入 {writes}, 数据库 {stored})"
+    print(f"{workers:>4} 个工作进程 {total / elapsed:>10.0f} 请求/秒  错误 {errors:>4}  "
+          f"内存 {memory / 1024:>7.1f} MiB  写入 {writes:>6} 条, {status}")
+
+async def run(args) -> None:
+    print(f"=== {args.clients} 个客户端 × {args.calls} 次调用，写入比例 {args.write_ratio:.0%}，"
+          f"CPU 核数 {os.cpu_count()} ===")
+    for workers in args.workers:
+        await run_workers(workers, args)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="多进程模式扩展性测试")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="依次测试的工作进程数")
+    parser.add_argument("--clients", type=int, default=32, help="并发客户端数量")
+    parser.add_argument("--calls", type=int, default=200, help="每个客户端的调用次数")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="add_note 调用所占比例")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,15 @@ import asyncio
 import json
 import subprocess
 import sys
-import time
-from typing import Dict, Any
+from pathlib import Path
+
+from mcp_client import MCPClient, MCPError, result_text
+
+SERVER_DIR = Path(__file__).resolve().parent
 
 class MCPDemo:
     def __init__(self):
-        self.process = None
+        self.client = None
         
     async def start_demo(self):
         """启动演示"""
@@ -65,17 +68,11 @@ class MCPDemo:
         """演示服务器功能"""
         print("\n启动MCP服务器进行演示...")
         
-        # 启动服务器
+        # 启动服务器并完成 initialize 握手
         try:
-            self.process = await asyncio.create_subprocess_exec(
-                sys.executable, "simple_mcp_server.py",
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            # 等待服务器启动
-            await asyncio.sleep(2)
+            self.client = MCPClient("simple_mcp_server.py", cwd=str(SERVER_DIR), client_name="mcp-demo")
+            info = await self.client.start()
+            print(f"已连接: {info.get('serverInfo', {}).get('name')} (协议 {info.get('protocolVersion')})")
             
             # 演示工具列表
             print("\n--- 演示工具列表 ---")
@@ -96,85 +93,37 @@ class MCPDemo:
         except Exception as e:
             print(f"演示过程中出错: {e}")
         finally:
-            if self.process:
-                self.process.terminate()
-                await self.process.wait()
+            if self.client:
+                await self.client.close()
     
-    async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """发送请求到MCP服务器"""
-        if not self.process:
-            return {"error": "服务器未启动"}
-        
+    async def call_tool(self, name: str, arguments: dict = None) -> str:
+        """调用工具，返回结果文本"""
         try:
-            request_str = json.dumps(request) + "\n"
-            self.process.stdin.write(request_str.encode())
-            await self.process.stdin.drain()
-            
-            response_line = await self.process.stdout.readline()
-            response = json.loads(response_line.decode().strip())
-            return response
-        except Exception as e:
-            return {"error": f"请求失败: {e}"}
+            result = await self.client.call_tool(name, arguments)
+        except MCPError as e:
+            return f"请求失败: {e}"
+        return ("✗ " if result.get("isError") else "") + result_text(result)
     
     async def demo_list_tools(self):
         """演示工具列表"""
-        request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/list",
-            "params": {}
-        }
-        
-        response = await self.send_request(request)
-        print(f"可用工具: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        tools = await self.client.list_tools()
+        print(f"可用工具: {json.dumps([tool['name'] for tool in tools], ensure_ascii=False)}")
     
     async def demo_add_note(self):
         """演示添加笔记"""
-        request = {
-            "jsonrpc": "2.0",
-            "id": 2,
-            "method": "tools/call",
-            "params": {
-                "name": "add_note",
-                "arguments": {
-                    "title": "演示笔记",
-                    "content": "这是一个通过MCP协议添加的演示笔记"
-                }
-            }
-        }
-        
-        response = await self.send_request(request)
-        print(f"添加笔记结果: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        result = await self.call_tool("add_note", {
+            "title": "演示笔记",
+            "content": "这是一个通过MCP协议添加的演示笔记"
+        })
+        print(f"添加笔记结果: {result}")
     
     async def demo_list_notes(self):
         """演示列出笔记"""
-        request = {
-            "jsonrpc": "2.0",
-            "id": 3,
-            "method": "tools/call",
-            "params": {
-                "name": "list_notes",
-                "arguments": {}
-            }
-        }
-        
-        response = await self.send_request(request)
-        print(f"笔记列表: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        print(f"笔记列表: {await self.call_tool('list_notes')}")
     
     async def demo_get_time(self):
         """演示获取时间"""
-        request = {
-            "jsonrpc": "2.0",
-            "id": 4,
-            "method": "tools/call",
-            "params": {
-                "name": "get_time",
-                "arguments": {}
-            }
-        }
-        
-        response = await self.send_request(request)
-        print(f"时间信息: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        print(f"时间信息: {await self.call_tool('get_time')}")
 
 def main():
     """主函数"""
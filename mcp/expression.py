@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+安全的数学表达式引擎
+只允许白名单内的 AST 节点，每个不同的表达式只编译一次为闭包并缓存
+"""
+
+import ast
+import functools
+import operator
+from typing import Any, Callable, Dict, List, Mapping, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时批量计算逐项求值
+    np = None
+
+# 防止恶意输入占满 CPU 的限制
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NODES = 200
+MAX_EXPONENT = 1000
+MAX_INT_BITS = 4096
+# 列表/元组运算结果的最大长度（[0] * n 会在分配前检查）
+MAX_SEQUENCE_LENGTH = 10_000
+CACHE_SIZE = 1024
+MAX_BATCH_SIZE = 100_000
+
+FUNCTIONS: Dict[str, Callable] = {
+    'abs': abs, 'round': round, 'min': min, 'max': max,
+    'sum': None, 'len': len, 'int': int, 'float': float
+}
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+class ExpressionError(ValueError):
+    """表达式不合法或超出计算限制"""
+
+def _check_int(value: Any) -> Any:
+    """限制整数结果的位数"""
+    if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+        raise ExpressionError(f"结果超过 {MAX_INT_BITS} 位")
+    return value
+
+def _checked_pow(base: Any, exponent: Any) -> Any:
+    """限制指数大小，并在计算前估算整数结果的位数"""
+    if isinstance(exponent, (int, float)) and abs(exponent) > MAX_EXPONENT:
+        raise ExpressionError(f"指数不能超过 {MAX_EXPONENT}")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if base.bit_length() * exponent > MAX_INT_BITS:
+            raise ExpressionError(f"结果超过 {MAX_INT_BITS} 位")
+    return operator.pow(base, exponent)
+
+def _check_length(length: int) -> None:
+    if length > MAX_SEQUENCE_LENGTH:
+        raise ExpressionError(f"列表长度不能超过 {MAX_SEQUENCE_LENGTH}")
+
+def _checked_mul(left: Any, right: Any) -> Any:
+    """限制整数乘法结果的位数，以及列表/元组重复后的长度"""
+    if isinstance(left, int) and isinstance(right, int):
+        if left.bit_length() + right.bit_length() > MAX_INT_BITS:
+            raise ExpressionError(f"结果超过 {MAX_INT_BITS} 位")
+    elif isinstance(left, (list, tuple)) and isinstance(right, int):
+        _check_length(len(left) * right)
+    elif isinstance(right, (list, tuple)) and isinstance(left, int):
+        _check_length(len(right) * left)
+    return operator.mul(left, right)
+
+def _checked_add(left: Any, right: Any) -> Any:
+    """限制列表/元组拼接后的长度"""
+    if isinstance(left, (list, tuple)) and isinstance(right, (list, tuple)):
+        _check_length(len(left) + len(right))
+    return operator.add(left, right)
+
+def _checked_sum(values: Any, start: Any = 0) -> Any:
+    """逐项经 _checked_add 累加，sum(列表的列表, []) 同样受长度限制"""
+    if isinstance(start, str):
+        raise TypeError("sum() can't sum strings [use ''.join(seq) instead]")
+    total = start
+    for value in values:
+        if total is not start and isinstance(total, list) and isinstance(value, list):
+            # total 已是本次新建的列表，原地扩展，避免每一项都拷贝一遍
+            _check_length(len(total) + len(value))
+            total += value
+        else:
+            total = _checked_add(total, value)
+    return total
+
+FUNCTIONS['sum'] = _checked_sum
+
+CHECKED_OPERATORS = {
+    ast.Add: _checked_add,
+    ast.Pow: _checked_pow,
+    ast.Mult: _checked_mul,
+}
+
+def _is_sequence(value: Any) -> bool:
+    return isinstance(value, (list, tuple))
+
+def _has_array(args: Sequence[Any]) -> bool:
+    """参数（或作为参数的列表中的元素）里是否有 NumPy 数组"""
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            return True
+        if _is_sequence(arg) and any(isinstance(item, np.ndarray) for item in arg):
+            return True
+    return False
+
+def _vectorized(scalar: Callable, vector: Callable) -> Callable:
+    """有数组参数时逐元素计算；只涉及常量时调用标量实现，与 evaluate 的结果和检查完全一致"""
+    def apply(*args):
+        return vector(*args) if _has_array(args) else scalar(*args)
+    return apply
+
+def _no_sequences(*args: Any) -> None:
+    # 标量路径中列表与数字的运算按每组取值分别进行，数组广播后的形状与之不同
+    if any(_is_sequence(arg) for arg in args):
+        raise ExpressionError("列表与变量的运算不支持向量化")
+
+def _vector_pow(base: Any, exponent: Any) -> Any:
+    """向量化的乘方，同样限制指数大小"""
+    _no_sequences(base, exponent)
+    if np.max(np.abs(exponent)) > MAX_EXPONENT:
+        raise ExpressionError(f"指数不能超过 {MAX_EXPONENT}")
+    return np.power(base, exponent)
+
+def _vector_mul(left: Any, right: Any) -> Any:
+    """[x, y] * 3 与标量路径一样做长度受限的重复，数组逐元素相乘"""
+    if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+        _no_sequences(left, right)
+        return np.multiply(left, right)
+    return _checked_mul(left, right)
+
+def _vector_add(left: Any, right: Any) -> Any:
+    """[x] + [y] 与标量路径一样做长度受限的拼接，数组逐元素相加"""
+    if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+        _no_sequences(left, right)
+        return np.add(left, right)
+    return _checked_add(left, right)
+
+def _vector_elementwise(func: Callable) -> Callable:
+    def apply(left, right):
+        _no_sequences(left, right)
+        return func(left, right)
+    return apply
+
+def _vector_operators() -> Dict[type, Callable]:
+    operators = {op_type: _vector_elementwise(op) for op_type, op in BINARY_OPERATORS.items()}
+    operators.update({ast.Add: _vector_add, ast.Pow: _vector_pow, ast.Mult: _vector_mul})
+    return {
+        op_type: _vectorized(CHECKED_OPERATORS.get(op_type, BINARY_OPERATORS[op_type]), op)
+        for op_type, op in operators.items()
+    }
+
+def _vector_reduce(func: Callable) -> Callable:
+    """min/max/sum 在向量模式下按元素计算：max(x, 0) 或 max([x, y, z])"""
+    def reduce(*args):
+        if len(args) == 1:
+            args = args[0]
+        if not _is_sequence(args):
+            # 标量路径中 max(x) 对单个数字报错，这里不能改为对整列求最大值
+            raise ExpressionError("向量模式下的参数必须是多个值或列表")
+        return functools.reduce(func, args)
+    return reduce
+
+def _vector_functions() -> Dict[str, Callable]:
+    vector = {
+        'abs': np.abs,
+        'round': lambda value, digits=0: np.round(value, digits),
+        'min': _vector_reduce(np.minimum),
+        'max': _vector_reduce(np.maximum),
+        'sum': _vector_reduce(_vector_add),
+        'int': np.trunc,
+        'float': lambda value: value,
+    }
+    return {name: _vectorized(FUNCTIONS[name], func) for name, func in vector.items()}
+
+class _Compiler:
+    """把白名单内的 AST 节点编译为 env -> value 闭包"""
+
+    def __init__(self, functions: Mapping[str, Callable], operators: Mapping[type, Callable]):
+        self.functions = functions
+        self.operators = operators
+
+    def compile(self, node: ast.AST) -> Callable[[Mapping[str, Any]], Any]:
+        method = getattr(self, f"_compile_{type(node).__name__}", None)
+        if method is None:
+            raise ExpressionError(f"不支持的语法: {type(node).__name__}")
+        return method(node)
+
+    def _compile_Expression(self, node: ast.Expression):
+        return self.compile(node.body)
+
+    def _compile_Constant(self, node: ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ExpressionError(f"不支持的常量: {value!r}")
+        return lambda env: value
+
+    def _compile_Name(self, node: ast.Name):
+        name = node.id
+
+        def lookup(env):
+            try:
+                return env[name]
+            except KeyError:
+                raise ExpressionError(f"未定义的变量: {name}") from None
+        return lookup
+
+    def _compile_UnaryOp(self, node: ast.UnaryOp):
+        op = UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"不支持的运算符: {type(node.op).__name__}")
+        operand = self.compile(node.operand)
+        return lambda env: op(operand(env))
+
+    def _compile_BinOp(self, node: ast.BinOp):
+        op_type = type(node.op)
+        op = self.operators.get(op_type) or BINARY_OPERATORS.get(op_type)
+        if op is None:
+            raise ExpressionError(f"不支持的运算符: {op_type.__name__}")
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        return lambda env: op(left(env), right(env))
+
+    def _compile_Call(self, node: ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in self.functions:
+            raise ExpressionError("只能调用以下函数: " + ", ".join(self.functions))
+        if node.keywords:
+            raise ExpressionError("函数调用不支持关键字参数")
+        func = self.functions[node.func.id]
+        args = [self.compile(arg) for arg in node.args]
+        if len(args) == 1:
+            arg = args[0]
+            return lambda env: func(arg(env))
+        return lambda env: func(*[arg(env) for arg in args])
+
+    def _compile_List(self, node: ast.List):
+        items = [self.compile(item) for item in node.elts]
+        return lambda env: [item(env) for item in items]
+
+    _compile_Tuple = _compile_List
+
+def parse(expression: str) -> ast.Expression:
+    """解析表达式并检查长度与节点数量"""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"表达式长度不能超过 {MAX_EXPRESSION_LENGTH} 个字符")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"语法错误: {e.msg}") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise ExpressionError(f"表达式过于复杂（超过 {MAX_NODES} 个节点）")
+    return tree
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(expression: str) -> Callable[[Mapping[str, Any]], Any]:
+    """编译表达式为闭包，按表达式文本做 LRU 缓存"""
+    code = _Compiler(FUNCTIONS, CHECKED_OPERATORS).compile(parse(expression))
+    return lambda env: _check_int(code(env))
+
+def evaluate(expression: str, variables: Mapping[str, Any] = None) -> Any:
+    """计算表达式的值"""
+    return compile_expression(expression)(variables or {})
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_vector_expression(expression: str) -> Callable[[Mapping[str, Any]], Any]:
+    """编译为按 NumPy 数组逐元素计算的闭包（需要 numpy）"""
+    return _Compiler(_vector_functions(), _vector_operators()).compile(parse(expression))
+
+def evaluate_many(expressions: Sequence[str]) -> List[Any]:
+    """逐个计算多个表达式，出错的项返回 ExpressionError"""
+    if len(expressions) > MAX_BATCH_SIZE:
+        raise ExpressionError(f"一次最多计算 {MAX_BATCH_SIZE} 个表达式")
+    results = []
+    for expression in expressions:
+        try:
+            results.append(evaluate(expression))
+        except (ArithmeticError, TypeError, ValueError) as e:
+            results.append(e if isinstance(e, ExpressionError) else ExpressionError(str(e)))
+    return results
+
+def evaluate_batch(expression: str, variables: Mapping[str, Sequence[Any]]) -> List[Any]:
+    """对同一个表达式按多组变量取值批量计算
+
+    variables 把变量名映射到等长的取值数组，第 i 个结果对应每个数组的第 i 个值。
+    安装了 numpy 时整个数组一次性按 float64 向量化计算，结果为浮点数，超过 2**53 的整数会损失精度；
+    向量路径与标量路径使用相同的指数和列表长度限制，结果中出现 inf/nan（溢出或除零）时
+    整批改为逐组求值，因此两条路径对同一输入给出相同的错误。
+    没有 numpy 或向量化失败时，复用编译好的闭包逐组求值，出错的项返回 ExpressionError。
+    """
+    lengths = {len(values) for values in variables.values()}
+    if len(lengths) > 1:
+        raise ExpressionError("所有变量的取值数组长度必须相同")
+    count = lengths.pop() if lengths else 1
+    if count > MAX_BATCH_SIZE:
+        raise ExpressionError(f"一次最多计算 {MAX_BATCH_SIZE} 组变量")
+
+    code = compile_expression(expression)
+
+    if np is not None and variables:
+        try:
+            arrays = {name: np.asarray(values, dtype=float) for name, values in variables.items()}
+            with np.errstate(all="ignore"):
+                result = compile_vector_expression(expression)(arrays)
+            # 溢出或除零交给标量路径，得到与 evaluate 一致的逐项错误
+            if np.isfinite(result).all():
+                return np.broadcast_to(result, (count,)).tolist()
+        except (ArithmeticError, TypeError, ValueError):
+            pass  # 向量化不适用时退回逐组求值
+
+    names = list(variables)
+    columns = [variables[name] for name in names]
+    results = []
+    for row in zip(*columns) if columns else [()]:
+        try:
+            results.append(code(dict(zip(names, row))))
+        except (ArithmeticError, TypeError, ValueError) as e:
+            results.append(e if isinstance(e, ExpressionError) else ExpressionError(str(e)))
+    return results
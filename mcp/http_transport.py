@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+传输方式选择与 HTTP 传输
+各服务器共用：stdio 为默认传输；http 使用 MCP streamable HTTP（POST 请求，SSE 流式响应），
+由 uvicorn 在一个进程里通过 keep-alive 连接同时服务多个客户端；
+也可以预派生多个工作进程共享同一个监听套接字（serve_workers），突破单核上限
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import signal
+import socket
+import time
+from typing import AsyncIterator, Callable, Optional
+
+from mcp.server import Server
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("stdio", "http")
+
+# 命令行参数的默认值，可用环境变量覆盖
+DEFAULT_TRANSPORT = os.environ.get("MCP_TRANSPORT", "stdio")
+DEFAULT_HTTP_HOST = os.environ.get("MCP_HTTP_HOST", "127.0.0.1")
+DEFAULT_HTTP_PORT = int(os.environ.get("MCP_HTTP_PORT", 8000))
+HTTP_PATH = "/mcp"
+# 空闲 keep-alive 连接保持的秒数
+HTTP_KEEP_ALIVE_SECONDS = int(os.environ.get("MCP_HTTP_KEEP_ALIVE", 30))
+# 多进程模式的工作进程数，1 表示单进程
+DEFAULT_HTTP_WORKERS = int(os.environ.get("MCP_HTTP_WORKERS", 1))
+HTTP_BACKLOG = 2048
+# 工作进程中设置为进程序号 (0..N-1)，供需要按进程区分的资源使用（如指标端口）
+WORKER_INDEX_ENV = "MCP_WORKER_INDEX"
+# 工作进程启动后不到这么多秒就退出时，推迟重新派生，避免崩溃循环占满 CPU
+WORKER_RESPAWN_DELAY_SECONDS = 1.0
+
+def parse_transport_args(description: str, workers: bool = False) -> argparse.Namespace:
+    """解析服务器的传输相关命令行参数；workers 为 True 时提供 --workers 选项"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--transport", choices=TRANSPORTS, default=DEFAULT_TRANSPORT,
+                        help="传输方式 (默认 stdio，也可用 MCP_TRANSPORT 设置)")
+    parser.add_argument("--host", default=DEFAULT_HTTP_HOST, help="HTTP 监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_HTTP_PORT, help="HTTP 监听端口")
+    parser.add_argument("--json-response", action="store_true",
+                        help="HTTP 响应使用普通 JSON 而不是 SSE 流")
+    if workers:
+        parser.add_argument("--workers", type=int, default=DEFAULT_HTTP_WORKERS,
+                            help="HTTP 工作进程数 (默认 1，也可用 MCP_HTTP_WORKERS 设置)")
+    return parser.parse_args()
+
+class MCPEndpoint:
+    """ASGI 端点：把 /mcp 上的请求交给会话管理器（类实例不会被 Starlette 当作 request 函数包装）"""
+
+    def __init__(self, session_manager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
+def create_http_app(server: Server, json_response: bool = False, stateless: bool = False):
+    """创建在 /mcp 提供服务的 ASGI 应用，会话由 StreamableHTTPSessionManager 管理
+
+    stateless 为 True 时不保存会话，每个请求独立处理。
+    """
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    session_manager = StreamableHTTPSessionManager(app=server, json_response=json_response, stateless=stateless)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app) -> AsyncIterator[None]:
+        async with session_manager.run():
+            yield
+
+    return Starlette(
+        routes=[Route(HTTP_PATH, endpoint=MCPEndpoint(session_manager), methods=["GET", "POST", "DELETE"])],
+        lifespan=lifespan,
+    )
+
+async def serve_http(server: Server, host: str = DEFAULT_HTTP_HOST, port: int = DEFAULT_HTTP_PORT,
+                     json_response: bool = False, sock: Optional[socket.socket] = None) -> None:
+    """在当前事件循环中运行 uvicorn，直到收到退出信号
+
+    传入 sock 时在这个已监听的套接字上提供服务（多进程模式）。此时会话不在进程间共享，
+    同一客户端的请求可能落到不同工作进程，因此以无状态模式运行。
+    """
+    import uvicorn
+
+    config = uvicorn.Config(
+        create_http_app(server, json_response, stateless=sock is not None),
+        host=host,
+        port=port,
+        timeout_keep_alive=HTTP_KEEP_ALIVE_SECONDS,
+        log_level="warning",
+    )
+    if sock is None:
+        logger.info(f"HTTP 传输已启动: http://{host}:{port}{HTTP_PATH}")
+        await uvicorn.Server(config).serve()
+    else:
+        await uvicorn.Server(config).serve(sockets=[sock])
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """创建可被子进程继承的监听套接字"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(HTTP_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+def serve_workers(worker: Callable[[socket.socket], None], host: str, port: int, workers: int) -> None:
+    """预派生 workers 个工作进程共享一个监听套接字，由内核在进程间分发连接
+
+    每个子进程调用 worker(sock) 提供服务。主进程只负责监督：工作进程意外退出时重新派生，
+    收到 SIGINT / SIGTERM 时通知所有工作进程退出并等待。调用方需要在此之前关闭
+    不能跨 fork 使用的资源（数据库连接、线程）。
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("多进程模式需要 os.fork，当前平台不支持")
+    sock = bind_socket(host, port)
+    children = {}
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.environ[WORKER_INDEX_ENV] = str(index)
+            code = 0
+            try:
+                worker(sock)
+            except BaseException:
+                logger.exception(f"工作进程 {index} 异常退出")
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        children[pid] = (index, time.monotonic())
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        for index in range(workers):
+            spawn(index)
+        logger.info(f"HTTP 传输已启动: http://{host}:{port}{HTTP_PATH}，{workers} 个工作进程")
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid not in children:
+                continue
+            index, started = children.pop(pid)
+            if stopping:
+                continue
+            logger.warning(f"工作进程 {index} (pid {pid}) 退出，状态 {status}，重新派生")
+            if time.monotonic() - started < WORKER_RESPAWN_DELAY_SECONDS:
+                time.sleep(WORKER_RESPAWN_DELAY_SECONDS)
+            if not stopping:
+                spawn(index)
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        sock.close()
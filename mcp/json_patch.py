@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+JSON Patch (RFC 6902) 与 JSON Merge Patch (RFC 7396)
+在调用方提供的文档上原地修改，只访问补丁涉及的路径；
+需要原子性时由调用方传入副本，失败后丢弃
+"""
+
+import copy
+from typing import Any, Dict, List
+
+PATCH_OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+class PatchError(ValueError):
+    """补丁格式错误或无法应用"""
+
+def parse_pointer(pointer: str) -> List[str]:
+    """解析 JSON Pointer (RFC 6901)，空字符串表示整个文档"""
+    if not isinstance(pointer, str):
+        raise PatchError(f"路径必须是字符串: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"路径必须以 / 开头: {pointer}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+def _list_index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"无效的数组下标: {token}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"数组下标越界: {token}")
+    return index
+
+def _child(container: Any, token: str) -> Any:
+    if isinstance(container, dict):
+        if token not in container:
+            raise PatchError(f"路径不存在: {token}")
+        return container[token]
+    if isinstance(container, list):
+        return container[_list_index(container, token)]
+    raise PatchError(f"无法在标量值中查找: {token}")
+
+def resolve(document: Any, tokens: List[str]) -> Any:
+    """取出路径指向的值"""
+    for token in tokens:
+        document = _child(document, token)
+    return document
+
+def _add(document: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = resolve(document, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, token, allow_end=True), value)
+    else:
+        raise PatchError(f"无法在标量值中添加: {token}")
+    return document
+
+def _remove(document: Any, tokens: List[str]) -> Any:
+    if not tokens:
+        raise PatchError("不能删除整个文档")
+    parent = resolve(document, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise PatchError(f"路径不存在: {token}")
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, token))
+    raise PatchError(f"无法在标量值中删除: {token}")
+
+def apply_patch(document: Any, operations: List[Dict[str, Any]]) -> Any:
+    """按顺序应用 JSON Patch 操作，返回修改后的文档（替换根节点时为新对象）"""
+    if not isinstance(operations, list):
+        raise PatchError("JSON Patch 必须是操作数组")
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get("op") not in PATCH_OPERATIONS:
+            raise PatchError(f"无效的补丁操作: {operation!r}")
+        op = operation["op"]
+        if "path" not in operation:
+            raise PatchError(f"{op} 操作缺少 path")
+        tokens = parse_pointer(operation["path"])
+
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"{op} 操作缺少 value")
+
+        if op == "add":
+            document = _add(document, tokens, operation["value"])
+        elif op == "remove":
+            _remove(document, tokens)
+        elif op == "replace":
+            if tokens:
+                _remove(document, tokens)
+            document = _add(document, tokens, operation["value"])
+        elif op == "test":
+            if resolve(document, tokens) != operation["value"]:
+                raise PatchError(f"test 失败: {operation['path']}")
+        else:
+            if "from" not in operation:
+                raise PatchError(f"{op} 操作缺少 from")
+            source = parse_pointer(operation["from"])
+            if op == "move":
+                if tokens[:len(source)] == source and len(tokens) > len(source):
+                    raise PatchError("不能把节点移动到它自己的子节点中")
+                value = _remove(document, source)
+            else:
+                value = copy.deepcopy(resolve(document, source))
+            document = _add(document, tokens, value)
+    return document
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """应用 JSON Merge Patch：null 删除键，对象递归合并，其它值直接替换"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    if not isinstance(target, dict):
+        target = {}
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = merge_patch(target.get(key), value)
+    return target
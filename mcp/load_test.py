@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+MCP服务器负载测试
+启动任意一个服务器，完成 initialize 握手后按配置的工具调用比例，以固定并发（闭环）
+或固定速率（开环）施加负载，报告吞吐量和 p50/p95/p99 延迟，并可保存为 JSON
+与之前的结果对比，用于回归测试
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp_client import MCPClient, MCPError
+
+SERVER_DIR = Path(__file__).resolve().parent
+SERVERS = {
+    "simple": "simple_mcp_server.py",
+    "demo": "mcp_server.py",
+    "advanced": "advanced_mcp_server.py",
+}
+
+# 各服务器的默认调用比例 (工具:权重)
+DEFAULT_MIXES = {
+    "simple": "get_time:6,list_notes:3,add_note:1",
+    "demo": "get_time:4,list_notes:4,add_note:2",
+    "advanced": "calculate:3,list_notes:3,list_tasks:2,search_notes:1,add_note:1",
+}
+
+# 各工具的默认参数，可用 --arguments 覆盖
+DEFAULT_ARGUMENTS: Dict[str, Dict[str, Any]] = {
+    "get_time": {},
+    "add_note": {"title": "压测笔记", "content": "负载测试写入的笔记内容"},
+    "list_notes": {"limit": 10},
+    "search_notes": {"query": "压测", "limit": 10},
+    "tag_facets": {},
+    "add_task": {"title": "压测任务", "description": "负载测试写入的任务"},
+    "list_tasks": {"limit": 10},
+    "calculate": {"expression": "abs(-2.5) * (3 + 4) ** 2"},
+    "batch_calculate": {"expression": "x * 2 + 1", "variables": {"x": list(range(100))}},
+    "get_weather_info": {"city": "北京"},
+}
+
+PERCENTILES = (50, 95, 99)
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    """解析 "tool:weight,tool:weight"，省略权重时为 1"""
+    mix = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, weight = item.partition(":")
+        weight = float(weight) if weight else 1.0
+        if weight <= 0:
+            raise ValueError(f"权重必须大于 0: {item}")
+        mix.append((name.strip(), weight))
+    if not mix:
+        raise ValueError("调用比例不能为空")
+    return mix
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """汇总一组延迟（秒），延迟以毫秒输出"""
+    values = sorted(latencies)
+    count = len(values)
+    latency_ms = {f"p{p}": percentile(values, p) * 1000 for p in PERCENTILES}
+    latency_ms["mean"] = sum(values) / count * 1000 if count else 0.0
+    latency_ms["max"] = values[-1] * 1000 if count else 0.0
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": count / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": latency_ms,
+    }
+
+class LoadTest:
+    """在一组已握手的客户端上执行负载，记录每个工具的延迟"""
+
+    def __init__(self, clients: List[MCPClient], mix: List[Tuple[str, float]],
+                 arguments: Dict[str, Dict[str, Any]], seed: int = 0):
+        self.clients = clients
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.arguments = arguments
+        self.random = random.Random(seed)
+        self._next_client = itertools.cycle(clients)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.names}
+        self.errors: Dict[str, int] = {name: 0 for name in self.names}
+        self.first_error: Optional[str] = None
+
+    def _pick(self) -> str:
+        return self.random.choices(self.names, self.weights)[0]
+
+    async def _call(self, name: str, scheduled: float, record: bool = True) -> None:
+        """调用一次工具；延迟从计划发出的时间算起（开环时包含排队时间）"""
+        client = next(self._next_client)
+        try:
+            result = await client.call_tool(name, self.arguments.get(name, {}))
+            failed = bool(result.get("isError"))
+            error = failed and str(result.get("content"))
+        except (MCPError, ConnectionError) as e:
+            failed, error = True, str(e)
+        if not record:
+            return
+        if failed:
+            self.errors[name] += 1
+            if self.first_error is None:
+                self.first_error = f"{name}: {error}"
+        else:
+            self.latencies[name].append(time.perf_counter() - scheduled)
+
+    async def warmup(self, requests: int, concurrency: int) -> None:
+        """预热，不记录结果"""
+        await self.closed_loop(concurrency, requests=requests, record=False)
+
+    async def closed_loop(self, concurrency: int, requests: Optional[int] = None,
+                          duration: Optional[float] = None, record: bool = True) -> float:
+        """固定并发：concurrency 个调用者各自在上一次调用返回后立即发出下一次"""
+        remaining = itertools.count()
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+
+        async def caller():
+            while True:
+                if requests is not None and next(remaining) >= requests:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                await self._call(self._pick(), time.perf_counter(), record)
+
+        await asyncio.gather(*(caller() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    async def open_loop(self, rate: float, concurrency: int, requests: Optional[int] = None,
+                        duration: Optional[float] = None) -> float:
+        """固定速率：按计划时间发出请求，不等待之前的响应；在途请求数以 concurrency 为上限"""
+        limit = asyncio.Semaphore(concurrency)
+        interval = 1 / rate
+        start = time.perf_counter()
+        tasks = []
+
+        async def limited(name, scheduled):
+            async with limit:
+                await self._call(name, scheduled)
+
+        for i in itertools.count():
+            scheduled = start + i * interval
+            if requests is not None and i >= requests:
+                break
+            if duration is not None and scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(limited(self._pick(), scheduled)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        return {
+            "total": summarize(all_latencies, sum(self.errors.values()), elapsed),
+            "tools": {
+                name: summarize(self.latencies[name], self.errors[name], elapsed)
+                for name in self.names
+            },
+        }
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    header = f"{'工具':<18}{'请求':>8}{'错误':>6}{'请求/秒':>10}" + "".join(
+        f"{f'p{p} ms':>10}" for p in PERCENTILES) + f"{'max ms':>10}"
+    print(header)
+    rows = [(name, stats) for name, stats in results["tools"].items()] + [("总计", results["total"])]
+    for name, stats in rows:
+        latency = stats["latency_ms"]
+        print(f"{name:<18}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>10.1f}"
+              + "".join(f"{latency[f'p{p}']:>10.2f}" for p in PERCENTILES) + f"{latency['max']:>10.2f}")
+
+    if baseline is None:
+        return
+    print("\n与基线对比 (正数表示变慢/变少):")
+    for name, stats in rows:
+        old = baseline["total"] if name == "总计" else baseline.get("tools", {}).get(name)
+        if not old or not old["requests"]:
+            continue
+        changes = [f"吞吐量 {change(old['throughput_rps'], stats['throughput_rps'], invert=True)}"]
+        changes += [
+            f"p{p} {change(old['latency_ms'][f'p{p}'], stats['latency_ms'][f'p{p}'])}" for p in PERCENTILES
+        ]
+        print(f"{name:<18}" + "  ".join(changes))
+
+def change(old: float, new: float, invert: bool = False) -> str:
+    """相对变化百分比；invert 为 True 时下降记为正数（吞吐量）"""
+    if not old:
+        return "n/a"
+    delta = (new - old) / old * 100
+    return f"{-delta if invert else delta:+.1f}%"
+
+def server_env(db_path: Optional[str]) -> Dict[str, str]:
+    """高级服务器默认使用临时数据库，内存服务器不加载持久化目录，避免污染现有数据"""
+    env = dict(os.environ)
+    env["MCP_DB_PATH"] = db_path or os.path.join(tempfile.mkdtemp(), "load_test.db")
+    env.pop("MCP_DATA_DIR", None)
+    return env
+
+async def run(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix or DEFAULT_MIXES[args.server])
+    arguments = dict(DEFAULT_ARGUMENTS)
+    arguments.update(json.loads(args.arguments) if args.arguments else {})
+    env = server_env(args.db_path)
+
+    clients = [
+        MCPClient(SERVERS[args.server], cwd=str(SERVER_DIR), env=env, client_name="mcp-load-test")
+        for _ in range(args.connections)
+    ]
+    try:
+        await asyncio.gather(*(client.start() for client in clients))
+        available = {tool["name"] for tool in await clients[0].list_tools()}
+        unknown = [name for name, _ in mix if name not in available]
+        if unknown:
+            raise SystemExit(f"服务器 {args.server} 没有这些工具: {', '.join(unknown)}")
+
+        test = LoadTest(clients, mix, arguments, args.seed)
+        if args.warmup:
+            await test.warmup(args.warmup, args.concurrency)
+        requests = None if args.duration else args.requests
+        if args.rate:
+            elapsed = await test.open_loop(args.rate, args.concurrency, requests, args.duration)
+        else:
+            elapsed = await test.closed_loop(args.concurrency, requests, args.duration)
+    finally:
+        await asyncio.gather(*(client.close() for client in clients))
+
+    results = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "server": args.server,
+            "mix": dict(mix),
+            "connections": args.connections,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "requests": requests,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "elapsed_s": elapsed,
+    }
+    results.update(test.report(elapsed))
+    if test.first_error:
+        results["first_error"] = test.first_error
+    return results
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="MCP服务器负载测试")
+    parser.add_argument("--server", choices=SERVERS, default="simple", help="被测服务器")
+    parser.add_argument("--mix", help="工具调用比例，如 get_time:6,list_notes:3,add_note:1")
+    parser.add_argument("--arguments", help='覆盖工具参数的 JSON，如 {"list_notes": {"limit": 50}}')
+    parser.add_argument("--connections", type=int, default=1, help="stdio 连接数（每个连接一个服务器进程）")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发调用数（开环时为在途请求上限）")
+    parser.add_argument("--rate", type=float, help="固定速率（请求/秒），不设置时按固定并发运行")
+    parser.add_argument("--requests", type=int, default=2000, help="请求总数")
+    parser.add_argument("--duration", type=float, help="运行秒数，设置后忽略 --requests")
+    parser.add_argument("--warmup", type=int, default=100, help="预热请求数（不计入结果）")
+    parser.add_argument("--seed", type=int, default=0, help="选择工具的随机种子")
+    parser.add_argument("--db-path", help="高级服务器的数据库路径（默认使用临时文件）")
+    parser.add_argument("--output", help="把结果保存为 JSON 文件")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    mode = f"{args.rate:g} 请求/秒" if args.rate else f"并发 {args.concurrency}"
+    print(f"=== {SERVERS[args.server]}: {mode}, {args.connections} 个连接, 用时 {results['elapsed_s']:.2f} 秒 ===")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if "first_error" in results:
+        print(f"\n首个错误: {results['first_error']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+    if results["total"]["errors"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+MCP stdio 客户端
+启动服务器子进程，完成 initialize 握手后通过 JSON-RPC 调用工具和读取资源；
+一条连接上可以同时有多个请求在途（流水线），响应按 id 匹配，不要求按发送顺序返回。
+供 test_mcp.py、demo.py 和 load_test.py 共用
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = "2025-06-18"
+# 单行响应的最大字节数，大列表结果可能超过 asyncio 默认的 64 KiB
+MAX_LINE_BYTES = 64 * 1024 * 1024
+# 服务器发来的请求中客户端不支持的方法
+METHOD_NOT_FOUND = -32601
+
+class MCPError(Exception):
+    """服务器返回的 JSON-RPC 错误"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"[{code}] {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+class MCPClient:
+    """通过 stdio 与一个 MCP 服务器子进程通信
+
+    每个请求在 _pending 中登记一个以 JSON-RPC id 为键的 Future，由后台读取任务
+    按 id 完成，因此多个协程可以同时调用，请求连续写出而不必等待上一个响应。
+    服务器发来的通知交给 on_notification 注册的回调；服务器发来的请求中 ping
+    直接应答，其余回复 Method not found。
+
+    用法::
+
+        async with MCPClient("simple_mcp_server.py") as client:
+            results = await asyncio.gather(*(client.call_tool("get_time") for _ in range(100)))
+    """
+
+    def __init__(self, script: str, *args: str, cwd: Optional[str] = None,
+                 env: Optional[Dict[str, str]] = None, stderr: Optional[int] = asyncio.subprocess.DEVNULL,
+                 client_name: str = "mcp-client"):
+        self.command = [sys.executable, script, *args]
+        self.cwd = cwd
+        self.env = env
+        # 服务器日志默认丢弃：不读取的 stderr 管道写满后会阻塞服务器
+        self.stderr = stderr
+        self.client_name = client_name
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.server_info: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._notification_handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        # Python 3.10 之前并发 drain() 会触发断言，写出后的 drain 串行执行
+        self._drain_lock = asyncio.Lock()
+        self._closed_error: Optional[Exception] = None
+
+    async def start(self) -> Dict[str, Any]:
+        """启动服务器并完成 initialize 握手，返回服务器的 initialize 结果"""
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            cwd=self.cwd,
+            env=self.env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=self.stderr,
+            limit=MAX_LINE_BYTES,
+        )
+        self._closed_error = None
+        self._reader = asyncio.ensure_future(self._read_loop())
+        self.server_info = await self.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": self.client_name, "version": "1.0.0"},
+        })
+        await self.notify("notifications/initialized")
+        return self.server_info
+
+    @property
+    def pending(self) -> int:
+        """在途请求数"""
+        return len(self._pending)
+
+    def on_notification(self, method: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """注册服务器通知的回调，参数为通知的 params；method 为 "*" 时接收全部通知"""
+        self._notification_handlers.setdefault(method, []).append(handler)
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        if self.process is None or self._closed_error is not None:
+            raise ConnectionError(f"连接已关闭: {self._closed_error or '客户端未启动'}")
+        # 整行一次写入缓冲区，并发调用的消息不会交错
+        self.process.stdin.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+        async with self._drain_lock:
+            await self.process.stdin.drain()
+
+    async def _read_loop(self) -> None:
+        """读取服务器消息：响应按 id 完成 Future，通知分发给回调，请求直接应答"""
+        error: Exception = ConnectionError("服务器已关闭连接")
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    logger.warning(f"忽略无法解析的服务器输出: {line[:200]!r}")
+                    continue
+                if "method" not in message:
+                    future = self._pending.pop(message.get("id"), None)
+                    if future is None:
+                        # 已超时放弃的请求，或服务器无法关联到请求的错误 (id 为 null)
+                        logger.debug(f"丢弃无人等待的响应: {message.get('id')!r}")
+                    elif not future.done():
+                        future.set_result(message)
+                elif "id" in message:
+                    await self._answer_server_request(message)
+                else:
+                    self._dispatch_notification(message)
+        except Exception as e:
+            error = e
+        finally:
+            self._closed_error = error
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(str(error)))
+
+    async def _answer_server_request(self, message: Dict[str, Any]) -> None:
+        if message["method"] == "ping":
+            response = {"jsonrpc": "2.0", "id": message["id"], "result": {}}
+        else:
+            response = {"jsonrpc": "2.0", "id": message["id"],
+                        "error": {"code": METHOD_NOT_FOUND, "message": f"不支持的方法: {message['method']}"}}
+        try:
+            await self._send(response)
+        except ConnectionError:
+            pass
+
+    def _dispatch_notification(self, message: Dict[str, Any]) -> None:
+        handlers = self._notification_handlers.get(message["method"], []) + self._notification_handlers.get("*", [])
+        if not handlers:
+            logger.debug(f"忽略服务器通知: {message['method']}")
+        for handler in handlers:
+            try:
+                handler(message.get("params") or {})
+            except Exception:
+                logger.exception(f"处理通知 {message['method']} 时出错")
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """发送不需要响应的通知"""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._send(message)
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Any:
+        """发送请求并等待对应 id 的响应，返回 result；错误响应抛出 MCPError
+
+        不等待之前的请求完成；timeout 秒内没有响应时抛出 asyncio.TimeoutError，
+        之后到达的响应被丢弃。
+        """
+        request_id = next(self._ids)
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._send(message)
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in response:
+            error = response["error"]
+            raise MCPError(error.get("code", 0), error.get("message", ""), error.get("data"))
+        return response.get("result")
+
+    async def list_tools(self) -> List[Dict[str, Any]]:
+        return (await self.request("tools/list"))["tools"]
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """调用工具，返回 CallToolResult（工具失败时 isError 为 True，不抛异常）"""
+        return await self.request("tools/call", {"name": name, "arguments": arguments or {}})
+
+    async def list_resources(self) -> List[Dict[str, Any]]:
+        return (await self.request("resources/list"))["resources"]
+
+    async def read_resource(self, uri: str) -> Dict[str, Any]:
+        return await self.request("resources/read", {"uri": uri})
+
+    async def close(self) -> None:
+        """关闭 stdin 让服务器正常退出，超时后终止进程"""
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        if process.stdin is not None:
+            process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            process.terminate()
+            await process.wait()
+        if self._reader is not None:
+            await self._reader
+            self._reader = None
+        await asyncio.sleep(0)  # 让管道的关闭回调在事件循环结束前执行
+
+    async def __aenter__(self) -> "MCPClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+def result_text(result: Dict[str, Any]) -> str:
+    """拼接工具结果中的文本内容"""
+    return "\n".join(item.get("text", "") for item in result.get("content", []) if item.get("type") == "text")
@@ -5,13 +5,14 @@ MCP (Model Context Protocol) 服务器应用
 """
 
 import asyncio
+import copy
 import json
 import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Sequence
 from pathlib import Path
 
-from mcp.server import Server
+from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import (
@@ -22,11 +23,16 @@ from mcp.types import (
     ReadResourceRequest,
     ReadResourceResult,
     Resource,
-    Tool,
-    WriteResourceRequest,
-    WriteResourceResult,
 )
 
+from http_transport import DEFAULT_HTTP_HOST, DEFAULT_HTTP_PORT, parse_transport_args, serve_http
+from json_patch import apply_patch, merge_patch
+from note_store import NoteStore
+from persistence import DATA_DIR, Persistence
+from profiler import ToolProfiler, register_profiling_tool
+from renderer import OUTPUT_FORMATS, Field, ListRenderer, join_list, truncate
+from tool_registry import ToolRegistry
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,68 +40,108 @@ logger = logging.getLogger(__name__)
 # 创建MCP服务器实例
 server = Server("mcp-demo-server")
 
+# 抽样性能剖析，默认关闭，可用 MCP_PROFILE_RATE 或 profiling 工具开启
+profiler = ToolProfiler()
+
+# 工具注册表：各工具通过 @tools.tool 注册
+tools = ToolRegistry(profiler=profiler)
+
+# 列表渲染器
+NOTE_RENDERER = ListRenderer("笔记列表:", [
+    Field("id", "ID"),
+    Field("title", "标题"),
+    Field("content", "内容", truncate(100)),
+    Field("tags", "标签", join_list()),
+    Field("created_at", "创建时间"),
+], empty_text="暂无笔记")
+
+# 笔记存储（按 id 和标签索引）
+note_store = NoteStore()
+
 # 存储简单的数据
 data_store = {
-    "notes": [],
     "tasks": [],
-    "config": {}
+    "config": {},
+    "config_version": 0
 }
 
+# 持久化引擎，设置 MCP_DATA_DIR 时在 main() 中打开
+persistence: Optional[Persistence] = None
+
+def record_change(entry: Dict[str, Any]) -> None:
+    """把内存修改写入预写日志；整体替换直接写快照，不记录整份数据"""
+    if entry["t"] == "notes_replace":
+        persistence.snapshot()
+    else:
+        persistence.append(entry)
+
+def apply_log_entry(entry: Dict[str, Any]) -> None:
+    if entry["t"] == "config":
+        data_store["config"] = entry["value"]
+        data_store["config_version"] = entry["v"]
+    else:
+        note_store.apply_log_entry(entry)
+
+def dump_state() -> Dict[str, Any]:
+    return {
+        "notes": note_store.dump_state(),
+        "tasks": list(data_store["tasks"]),
+        "config": data_store["config"],
+        "config_version": data_store["config_version"],
+    }
+
+def load_state(state: Dict[str, Any]) -> None:
+    note_store.load_state(state["notes"])
+    data_store["tasks"] = state["tasks"]
+    data_store["config"] = state["config"]
+    data_store["config_version"] = state["config_version"]
+
+def open_persistence(directory: str) -> Persistence:
+    """从磁盘恢复数据，之后的每次修改都写入日志"""
+    global persistence
+    persistence = Persistence(directory, "mcp-demo-server", apply_log_entry, dump_state, load_state)
+    persistence.open()
+    note_store.listener = record_change
+    return persistence
+
+# 资源写入方式：replace 整体替换，json 为 RFC 6902 JSON Patch，merge 为 RFC 7396 merge patch
+WRITE_MODES = ("replace", "json", "merge")
+
+class PreconditionFailed(Exception):
+    """if_match 与资源当前版本不一致"""
+
+    def __init__(self, etag: str):
+        super().__init__("资源已被修改，请重新读取后再写入")
+        self.etag = etag
+
+def make_etag(version: int) -> str:
+    return f'"{version}"'
+
+def resource_version(uri: str) -> int:
+    if uri == "data://notes":
+        return note_store.version
+    if uri == "data://config":
+        return data_store["config_version"]
+    raise ValueError(f"资源不存在: {uri}")
+
+def etag_matches(if_match: Optional[str], version: int) -> bool:
+    """if_match 为空或 * 时不检查；接受带或不带引号、W/ 前缀的 ETag"""
+    if if_match is None or if_match == "*":
+        return True
+    if if_match.startswith("W/"):
+        if_match = if_match[2:]
+    return if_match.strip('"') == str(version)
+
 @server.list_tools()
 async def handle_list_tools() -> ListToolsResult:
     """列出可用的工具"""
-    tools = [
-        Tool(
-            name="add_note",
-            description="添加一个新的笔记",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string", "description": "笔记标题"},
-                    "content": {"type": "string", "description": "笔记内容"},
-                    "tags": {"type": "array", "items": {"type": "string"}, "description": "标签列表"}
-                },
-                "required": ["title", "content"]
-            }
-        ),
-        Tool(
-            name="list_notes",
-            description="列出所有笔记",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "limit": {"type": "integer", "description": "返回的笔记数量限制"}
-                }
-            }
-        ),
-        Tool(
-            name="get_time",
-            description="获取当前时间",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "format": {"type": "string", "description": "时间格式 (可选)"}
-                }
-            }
-        )
-    ]
-    return ListToolsResult(tools=tools)
+    return tools.list_tools()
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
     """处理工具调用"""
     try:
-        if name == "add_note":
-            return await add_note(arguments)
-        elif name == "list_notes":
-            return await list_notes(arguments)
-        elif name == "get_time":
-            return await get_time(arguments)
-        else:
-            return CallToolResult(
-                content=[{"type": "text", "text": f"未知工具: {name}"}],
-                isError=True
-            )
+        return await tools.call(name, arguments)
     except Exception as e:
         logger.error(f"工具调用错误: {e}")
         return CallToolResult(
@@ -103,53 +149,157 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
             isError=True
         )
 
+@tools.tool(
+    name="add_note",
+    description="添加一个新的笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "笔记标题"},
+            "content": {"type": "string", "description": "笔记内容"},
+            "tags": {"type": "array", "items": {"type": "string"}, "description": "标签列表"}
+        },
+        "required": ["title", "content"]
+    }
+)
 async def add_note(arguments: Dict[str, Any]) -> CallToolResult:
     """添加笔记"""
     title = arguments.get("title", "")
     content = arguments.get("content", "")
     tags = arguments.get("tags", [])
     
-    note = {
-        "id": len(data_store["notes"]) + 1,
-        "title": title,
-        "content": content,
-        "tags": tags,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
-    
-    data_store["notes"].append(note)
+    note = note_store.add(title, content, tags)
     
     return CallToolResult(
         content=[{
             "type": "text",
-            "text": f"笔记已添加: {title}\nID: {note['id']}\n内容: {content[:100]}{'...' if len(content) > 100 else ''}"
+            "text": f"笔记已添加: {title}\nID: {note.id}\n内容: {content[:100]}{'...' if len(content) > 100 else ''}"
         }]
     )
 
+@tools.tool(
+    name="list_notes",
+    description="列出所有笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "limit": {"type": "integer", "description": "返回的笔记数量限制"},
+            "tag": {"type": "string", "description": "只列出带有该标签的笔记"},
+            "format": {"type": "string", "enum": list(OUTPUT_FORMATS), "description": "输出格式 (默认 text)"}
+        }
+    }
+)
 async def list_notes(arguments: Dict[str, Any]) -> CallToolResult:
     """列出笔记"""
     limit = arguments.get("limit", 10)
-    notes = data_store["notes"][-limit:] if limit > 0 else data_store["notes"]
+    tag = arguments.get("tag")
+    limit = limit if limit > 0 else None
     
-    if not notes:
+    if tag:
+        notes = note_store.with_tag(tag, limit)
+    else:
+        notes = note_store.latest(limit) if limit else list(note_store)
+    
+    result = NOTE_RENDERER.render([note.to_dict() for note in notes], arguments.get("format", "text"))
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": result}]
+    )
+
+@tools.tool(
+    name="get_note",
+    description="按 ID 查看笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "note_id": {"type": "integer", "description": "笔记ID"},
+            "format": {"type": "string", "enum": list(OUTPUT_FORMATS), "description": "输出格式 (默认 text)"}
+        },
+        "required": ["note_id"]
+    }
+)
+async def get_note(arguments: Dict[str, Any]) -> CallToolResult:
+    """查看笔记"""
+    note_id = arguments.get("note_id")
+    note = note_store.get(note_id)
+    
+    if note is None:
         return CallToolResult(
-            content=[{"type": "text", "text": "暂无笔记"}]
+            content=[{"type": "text", "text": f"笔记 {note_id} 不存在"}],
+            isError=True
         )
     
-    result = "笔记列表:\n\n"
-    for note in notes:
-        result += f"ID: {note['id']}\n"
-        result += f"标题: {note['title']}\n"
-        result += f"内容: {note['content'][:100]}{'...' if len(note['content']) > 100 else ''}\n"
-        result += f"标签: {', '.join(note['tags']) if note['tags'] else '无'}\n"
-        result += f"创建时间: {note['created_at']}\n"
-        result += "-" * 50 + "\n"
+    result = NOTE_RENDERER.render([note.to_dict()], arguments.get("format", "text"), title="笔记详情:")
     
     return CallToolResult(
         content=[{"type": "text", "text": result}]
     )
 
+@tools.tool(
+    name="update_note",
+    description="修改笔记的标题、内容或标签",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "note_id": {"type": "integer", "description": "笔记ID"},
+            "title": {"type": "string", "description": "新的标题"},
+            "content": {"type": "string", "description": "新的内容"},
+            "tags": {"type": "array", "items": {"type": "string"}, "description": "新的标签列表"}
+        },
+        "required": ["note_id"]
+    }
+)
+async def update_note(arguments: Dict[str, Any]) -> CallToolResult:
+    """修改笔记"""
+    note_id = arguments.get("note_id")
+    fields = {key: arguments[key] for key in ("title", "content", "tags") if key in arguments}
+    note = note_store.update(note_id, **fields)
+    
+    if note is None:
+        return CallToolResult(
+            content=[{"type": "text", "text": f"笔记 {note_id} 不存在"}],
+            isError=True
+        )
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": f"笔记 {note_id} 已更新"}]
+    )
+
+@tools.tool(
+    name="delete_note",
+    description="删除笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "note_id": {"type": "integer", "description": "笔记ID"}
+        },
+        "required": ["note_id"]
+    }
+)
+async def delete_note(arguments: Dict[str, Any]) -> CallToolResult:
+    """删除笔记"""
+    note_id = arguments.get("note_id")
+    
+    if not note_store.delete(note_id):
+        return CallToolResult(
+            content=[{"type": "text", "text": f"笔记 {note_id} 不存在"}],
+            isError=True
+        )
+    
+    return CallToolResult(
+        content=[{"type": "text", "text": f"笔记 {note_id} 已删除"}]
+    )
+
+@tools.tool(
+    name="get_time",
+    description="获取当前时间",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "format": {"type": "string", "description": "时间格式 (可选)"}
+        }
+    }
+)
 async def get_time(arguments: Dict[str, Any]) -> CallToolResult:
     """获取当前时间"""
     time_format = arguments.get("format", "default")
@@ -166,6 +316,112 @@ async def get_time(arguments: Dict[str, Any]) -> CallToolResult:
         content=[{"type": "text", "text": f"当前时间: {time_str}"}]
     )
 
+def write_resource(uri: str, body: Any, mode: str = "replace", if_match: Optional[str] = None) -> str:
+    """写入 data://notes 或 data://config，返回新的 ETag
+
+    data://notes 的 JSON Patch 路径以笔记 id 开头（如 /3/title，/- 追加新笔记），
+    merge patch 以笔记 id 为键。if_match 与当前版本不一致时抛出 PreconditionFailed，
+    避免覆盖其他客户端的修改；补丁中任何一步失败都不修改资源。
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f"未知的写入方式: {mode}")
+    version = resource_version(uri)
+    if not etag_matches(if_match, version):
+        raise PreconditionFailed(make_etag(version))
+    
+    if uri == "data://notes":
+        if mode == "json":
+            note_store.apply_patch(body)
+        elif mode == "merge":
+            note_store.apply_merge_patch(body)
+        else:
+            note_store.replace(body)
+        return make_etag(note_store.version)
+    
+    # 配置很小，在副本上打补丁，失败时原配置不变
+    if mode == "json":
+        config = apply_patch(copy.deepcopy(data_store["config"]), body)
+    elif mode == "merge":
+        config = merge_patch(copy.deepcopy(data_store["config"]), body)
+    else:
+        config = body
+    data_store["config"] = config
+    data_store["config_version"] += 1
+    if persistence is not None:
+        persistence.append({"t": "config", "value": config, "v": data_store["config_version"]})
+    return make_etag(data_store["config_version"])
+
+def patch_input_schema(patch_description: str) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "patch": {"type": ["array", "object"], "description": patch_description},
+            "mode": {"type": "string", "enum": list(WRITE_MODES),
+                     "description": "json: RFC 6902 JSON Patch（默认），merge: RFC 7396 merge patch，replace: 整体替换"},
+            "if_match": {"type": "string", "description": "上次读取或写入得到的 ETag，资源已被修改时拒绝写入"}
+        },
+        "required": ["patch"]
+    }
+
+def write_result(uri: str, arguments: Dict[str, Any]) -> CallToolResult:
+    """执行写入并在结果中返回新的 ETag；版本冲突时返回错误和当前 ETag"""
+    try:
+        etag = write_resource(uri, arguments.get("patch"), arguments.get("mode", "json"), arguments.get("if_match"))
+    except PreconditionFailed as e:
+        return CallToolResult(
+            content=[{"type": "text", "text": f"{e}\n当前 ETag: {e.etag}"}],
+            isError=True
+        )
+    except ValueError as e:
+        return CallToolResult(
+            content=[{"type": "text", "text": f"写入失败: {e}"}],
+            isError=True
+        )
+    return CallToolResult(
+        content=[{"type": "text", "text": f"{uri} 已更新\nETag: {etag}"}]
+    )
+
+@tools.tool(
+    name="patch_notes",
+    description="增量修改笔记：JSON Patch、merge patch 或整体替换，可用 if_match 做乐观并发检查",
+    input_schema=patch_input_schema(
+        "json 方式为操作数组，路径以笔记 id 开头（如 /3/title，/- 追加新笔记）；"
+        "merge 方式为以笔记 id 为键的对象，null 删除笔记；replace 方式为完整的笔记数组"
+    )
+)
+async def patch_notes(arguments: Dict[str, Any]) -> CallToolResult:
+    """修改 data://notes"""
+    return write_result("data://notes", arguments)
+
+@tools.tool(
+    name="patch_config",
+    description="增量修改配置：JSON Patch、merge patch 或整体替换，可用 if_match 做乐观并发检查",
+    input_schema=patch_input_schema("json 方式为操作数组，merge 方式为要合并的对象，replace 方式为新的完整配置")
+)
+async def patch_config(arguments: Dict[str, Any]) -> CallToolResult:
+    """修改 data://config"""
+    return write_result("data://config", arguments)
+
+@tools.tool(
+    name="get_etag",
+    description="获取资源当前的 ETag，用作 patch_notes / patch_config 的 if_match",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "uri": {"type": "string", "enum": ["data://notes", "data://config"], "description": "资源 URI"}
+        },
+        "required": ["uri"]
+    }
+)
+async def get_etag(arguments: Dict[str, Any]) -> CallToolResult:
+    """查看资源版本"""
+    uri = arguments.get("uri")
+    return CallToolResult(
+        content=[{"type": "text", "text": f"ETag: {make_etag(resource_version(uri))}"}]
+    )
+
+register_profiling_tool(tools, profiler)
+
 @server.list_resources()
 async def handle_list_resources() -> List[Resource]:
     """列出可用的资源"""
@@ -190,47 +446,43 @@ async def handle_read_resource(uri: str) -> ReadResourceResult:
     """读取资源"""
     try:
         if uri == "data://notes":
-            content = json.dumps(data_store["notes"], ensure_ascii=False, indent=2)
-            return ReadResourceResult(contents=content)
+            content = json.dumps(note_store.to_list(), ensure_ascii=False, indent=2)
+            return ReadResourceResult(contents=content, etag=make_etag(note_store.version))
         elif uri == "data://config":
             content = json.dumps(data_store["config"], ensure_ascii=False, indent=2)
-            return ReadResourceResult(contents=content)
+            return ReadResourceResult(contents=content, etag=make_etag(data_store["config_version"]))
         else:
             return ReadResourceResult(contents="资源不存在", isError=True)
     except Exception as e:
         return ReadResourceResult(contents=f"读取资源失败: {str(e)}", isError=True)
 
-@server.write_resource()
-async def handle_write_resource(uri: str, contents: str) -> WriteResourceResult:
-    """写入资源"""
+async def main(transport: str = "stdio", host: str = DEFAULT_HTTP_HOST, port: int = DEFAULT_HTTP_PORT,
+               json_response: bool = False):
+    """主函数"""
+    if DATA_DIR:
+        open_persistence(DATA_DIR)
     try:
-        if uri == "data://notes":
-            data_store["notes"] = json.loads(contents)
-            return WriteResourceResult()
-        elif uri == "data://config":
-            data_store["config"] = json.loads(contents)
-            return WriteResourceResult()
+        if transport == "http":
+            await serve_http(server, host, port, json_response)
         else:
-            return WriteResourceResult(isError=True)
-    except Exception as e:
-        return WriteResourceResult(isError=True)
-
-async def main():
-    """主函数"""
-    # 使用stdio服务器
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="mcp-demo-server",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=None,
-                    experimental_capabilities=None,
-                ),
-            ),
-        )
+            # 使用stdio服务器
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="mcp-demo-server",
+                        server_version="1.0.0",
+                        capabilities=server.get_capabilities(
+                            notification_options=NotificationOptions(),
+                            experimental_capabilities={},
+                        ),
+                    ),
+                )
+    finally:
+        if persistence is not None:
+            persistence.close()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    args = parse_transport_args("MCP演示服务器")
+    asyncio.run(main(args.transport, args.host, args.port, args.json_response)) 
\ No newline at end of file
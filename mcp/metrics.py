@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+服务器指标
+每个工具和数据库方法的调用次数、错误数、在途数和 HDR 风格的延迟直方图；
+可以输出为 JSON 快照或 Prometheus 文本格式，并可选在本地端口上提供 /metrics
+"""
+
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prometheus 文本导出的端口，未设置时不启动
+METRICS_PORT = os.environ.get("MCP_METRICS_PORT")
+METRICS_HOST = os.environ.get("MCP_METRICS_HOST", "127.0.0.1")
+
+# 直方图以微秒为单位：每个 2 的幂区间再等分为 2**SUB_BUCKET_BITS 个桶，相对误差不超过 1/16
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# 最大可区分 2**36 微秒（约 19 小时），更大的值计入最后一个桶
+MAX_MAGNITUDE = 36
+BUCKET_COUNT = (MAX_MAGNITUDE - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+# 导出给 Prometheus 的桶上界（秒）
+EXPORT_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+def bucket_index(microseconds: int) -> int:
+    """值所在的桶：小于 SUB_BUCKETS 的值各占一个桶，之后每个 2 的幂区间 SUB_BUCKETS 个桶"""
+    if microseconds < SUB_BUCKETS:
+        return microseconds if microseconds > 0 else 0
+    shift = microseconds.bit_length() - SUB_BUCKET_BITS - 1
+    index = ((shift + 1) << SUB_BUCKET_BITS) + (microseconds >> shift) - SUB_BUCKETS
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """桶覆盖的微秒区间 [low, high)"""
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    if shift <= 0:
+        return index, index + 1
+    mantissa = (index & (SUB_BUCKETS - 1)) + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+class Histogram:
+    """对数-线性分桶的延迟直方图（HDR 风格），记录为 O(1)，可从任意线程调用"""
+
+    __slots__ = ("_lock", "_counts", "count", "sum", "max")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._record_locked(seconds)
+
+    def _record_locked(self, seconds: float) -> None:
+        """调用方已持有 _lock；桶计算内联自 bucket_index，省去一次函数调用"""
+        microseconds = int(seconds * 1_000_000)
+        if microseconds < SUB_BUCKETS:
+            index = microseconds if microseconds > 0 else 0
+        else:
+            shift = microseconds.bit_length() - SUB_BUCKET_BITS - 1
+            index = ((shift + 1) << SUB_BUCKET_BITS) + (microseconds >> shift) - SUB_BUCKETS
+            if index >= BUCKET_COUNT:
+                index = BUCKET_COUNT - 1
+        self._counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def _snapshot(self) -> Tuple[List[int], int, float, float]:
+        with self._lock:
+            return list(self._counts), self.count, self.sum, self.max
+
+    @staticmethod
+    def _percentiles(counts: List[int], count: int, maximum: float) -> Dict[str, float]:
+        """各百分位数（秒），取所在桶的中点且不超过最大值"""
+        result = {}
+        if not count:
+            return {f"p{p:g}": 0.0 for p in PERCENTILES}
+        targets = [(p, max(1, -int(-count * p // 100))) for p in PERCENTILES]
+        seen = 0
+        position = 0
+        for index, bucket in enumerate(counts):
+            if not bucket:
+                continue
+            seen += bucket
+            while position < len(targets) and seen >= targets[position][1]:
+                low, high = bucket_bounds(index)
+                result[f"p{targets[position][0]:g}"] = min((low + high) / 2 / 1_000_000, maximum)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """调用次数、平均值、最大值和百分位数（毫秒）"""
+        counts, count, total, maximum = self._snapshot()
+        summary = {
+            "count": count,
+            "mean_ms": total / count * 1000 if count else 0.0,
+            "max_ms": maximum * 1000,
+        }
+        for name, value in self._percentiles(counts, count, maximum).items():
+            summary[f"{name}_ms"] = value * 1000
+        return summary
+
+    def export_buckets(self) -> Tuple[List[Tuple[float, int]], int, float]:
+        """按 EXPORT_BOUNDS 累计的 (上界, 数量)，以及总数和总和；桶上界不超过 le 的计入该行"""
+        counts, count, total, _ = self._snapshot()
+        cumulative = []
+        seen = 0
+        index = 0
+        for bound in EXPORT_BOUNDS:
+            limit = bound * 1_000_000
+            while index < BUCKET_COUNT and bucket_bounds(index)[1] <= limit:
+                seen += counts[index]
+                index += 1
+            cumulative.append((bound, seen))
+        return cumulative, count, total
+
+class OperationMetrics:
+    """一类操作（一个工具或一个数据库方法）的计数、在途数和延迟直方图"""
+
+    __slots__ = ("calls", "errors", "in_flight", "latency", "_lock")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency = Histogram()
+        # 计数与直方图共用一把锁，结束一次操作只需加锁一次
+        self._lock = self.latency._lock
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "latency": self.latency.summary(),
+        }
+
+class OperationGroup:
+    """按名称分组的操作指标，例如 tool=add_note 或 method=get_notes_page"""
+
+    def __init__(self, metric: str, label: str, help_text: str):
+        self.metric = metric
+        self.label = label
+        self.help_text = help_text
+        self._operations: Dict[str, OperationMetrics] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> OperationMetrics:
+        operation = self._operations.get(name)
+        if operation is None:
+            with self._lock:
+                operation = self._operations.setdefault(name, OperationMetrics())
+        return operation
+
+    def start(self, name: str) -> OperationMetrics:
+        """开始一次操作：调用数和在途数加一"""
+        operation = self.get(name)
+        with operation._lock:
+            operation.calls += 1
+            operation.in_flight += 1
+        return operation
+
+    @staticmethod
+    def finish(operation: OperationMetrics, seconds: float, failed: bool = False) -> None:
+        """结束一次操作：记录延迟，在途数减一"""
+        with operation._lock:
+            operation.latency._record_locked(seconds)
+            operation.in_flight -= 1
+            if failed:
+                operation.errors += 1
+
+    def timed(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """包装同步函数，记录每次调用"""
+        def wrapper(*args, **kwargs):
+            operation = self.start(name)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self.finish(operation, time.perf_counter() - start, failed)
+        wrapper.__name__ = getattr(func, "__name__", name)
+        wrapper.__doc__ = getattr(func, "__doc__", None)
+        return wrapper
+
+    def items(self) -> Iterator[Tuple[str, OperationMetrics]]:
+        with self._lock:
+            return iter(sorted(self._operations.items()))
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: operation.summary() for name, operation in self.items()}
+
+    def render_prometheus(self, lines: List[str]) -> None:
+        operations = list(self.items())
+        base = f"mcp_{self.metric}"
+        lines.append(f"# HELP {base}_calls_total {self.help_text}调用次数")
+        lines.append(f"# TYPE {base}_calls_total counter")
+        lines.extend(f'{base}_calls_total{{{self.label}="{name}"}} {op.calls}' for name, op in operations)
+        lines.append(f"# HELP {base}_errors_total {self.help_text}失败次数")
+        lines.append(f"# TYPE {base}_errors_total counter")
+        lines.extend(f'{base}_errors_total{{{self.label}="{name}"}} {op.errors}' for name, op in operations)
+        lines.append(f"# HELP {base}_in_flight {self.help_text}在途数")
+        lines.append(f"# TYPE {base}_in_flight gauge")
+        lines.extend(f'{base}_in_flight{{{self.label}="{name}"}} {op.in_flight}' for name, op in operations)
+        lines.append(f"# HELP {base}_latency_seconds {self.help_text}耗时")
+        lines.append(f"# TYPE {base}_latency_seconds histogram")
+        for name, op in operations:
+            buckets, count, total = op.latency.export_buckets()
+            for bound, cumulative in buckets:
+                lines.append(f'{base}_latency_seconds_bucket{{{self.label}="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{base}_latency_seconds_bucket{{{self.label}="{name}",le="+Inf"}} {count}')
+            lines.append(f'{base}_latency_seconds_sum{{{self.label}="{name}"}} {total:.6f}')
+            lines.append(f'{base}_latency_seconds_count{{{self.label}="{name}"}} {count}')
+
+class Metrics:
+    """一个服务器进程的全部指标"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.tools = OperationGroup("tool", "tool", "工具")
+        self.db = OperationGroup("db", "method", "数据库方法")
+        self._collectors: List[Any] = []
+
+    def add_collector(self, collector: Any) -> None:
+        """加入其他组件的统计：collector 需提供 name、summary() 和 render_prometheus(lines)"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 快照，供 server_stats 工具和 data://metrics 资源使用"""
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "pid": os.getpid(),
+            "tools": self.tools.summary(),
+            "db": self.db.summary(),
+            **{collector.name: collector.summary() for collector in self._collectors},
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式 (text/plain; version=0.0.4)"""
+        lines = [
+            "# HELP mcp_uptime_seconds 进程运行时间",
+            "# TYPE mcp_uptime_seconds gauge",
+            f"mcp_uptime_seconds {time.time() - self.started:.3f}",
+        ]
+        self.tools.render_prometheus(lines)
+        self.db.render_prometheus(lines)
+        for collector in self._collectors:
+            collector.render_prometheus(lines)
+        return "\n".join(lines) + "\n"
+
+def serve_prometheus(metrics: Metrics, port: int, host: str = METRICS_HOST) -> ThreadingHTTPServer:
+    """在后台线程中提供 GET /metrics，返回 HTTP 服务器（调用 shutdown() 停止）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="mcp-metrics", daemon=True).start()
+    logger.info(f"指标导出已启动: http://{host}:{httpd.server_address[1]}/metrics")
+    return httpd
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+内存笔记存储
+按 id 和标签建立字典索引：按 id 读取、更新、删除为 O(1)，按标签查询为 O(命中数)；
+id 由单调递增的计数器分配，整体替换后也不会与已分配的 id 冲突；
+每次修改递增 version，供资源写入做乐观并发检查；
+设置 listener 后每次修改都会收到一条可 JSON 序列化的变更记录，用于持久化
+"""
+
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+from json_patch import PatchError, apply_patch, merge_patch, parse_pointer
+
+# 可通过 update 修改的字段
+MUTABLE_FIELDS = ("title", "content", "tags")
+
+def _timestamp(value: Any) -> float:
+    """把 ISO 字符串或时间戳统一为时间戳"""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+def _tags(tags: Optional[Iterable[str]]) -> tuple:
+    """标签去重并驻留，相同标签在所有笔记间共享同一个字符串对象"""
+    if not tags:
+        return ()
+    return tuple(dict.fromkeys(sys.intern(str(tag)) for tag in tags))
+
+class NoteRecord:
+    """单条笔记；时间以浮点时间戳保存，输出时再格式化为 ISO 字符串
+
+    放入存储后不再原地修改（更新时换成新对象），持久化可以在后台线程编码已取出的快照
+    """
+
+    __slots__ = ("id", "title", "content", "tags", "created_at", "updated_at")
+
+    def __init__(self, note_id: int, title: str, content: str, tags: tuple,
+                 created_at: float, updated_at: float):
+        self.id = note_id
+        self.title = title
+        self.content = content
+        self.tags = tags
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "content": self.content,
+            "tags": list(self.tags),
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "updated_at": datetime.fromtimestamp(self.updated_at).isoformat(),
+        }
+
+    def to_state(self) -> list:
+        """紧凑的持久化格式，时间保留为时间戳"""
+        return [self.id, self.title, self.content, list(self.tags), self.created_at, self.updated_at]
+
+    @classmethod
+    def from_state(cls, state: list) -> "NoteRecord":
+        note_id, title, content, tags, created_at, updated_at = state
+        return cls(note_id, title, content, _tags(tags), created_at, updated_at)
+
+class NoteStore:
+    """按创建顺序保存笔记，并维护 id 和标签索引"""
+
+    def __init__(self):
+        # dict 保持插入顺序，同时充当主存储和 id 索引
+        self._notes: Dict[int, NoteRecord] = {}
+        # 标签 -> {id: 笔记}，同样按插入顺序
+        self._by_tag: Dict[str, Dict[int, NoteRecord]] = {}
+        self._next_id = 1
+        self.version = 0
+        # 变更监听：接收 {"t": "note" | "note_del" | "notes_batch" | "notes_replace", ...}
+        self.listener: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def __iter__(self) -> Iterator[NoteRecord]:
+        return iter(self._notes.values())
+
+    def __contains__(self, note_id: int) -> bool:
+        return note_id in self._notes
+
+    def _index(self, note: NoteRecord) -> None:
+        self._notes[note.id] = note
+        for tag in note.tags:
+            self._by_tag.setdefault(tag, {})[note.id] = note
+
+    def _unindex_tags(self, note: NoteRecord) -> None:
+        for tag in note.tags:
+            tagged = self._by_tag[tag]
+            del tagged[note.id]
+            if not tagged:
+                del self._by_tag[tag]
+
+    def _emit(self, entry: Dict[str, Any]) -> None:
+        entry["n"] = self._next_id
+        entry["v"] = self.version
+        self.listener(entry)
+
+    def add(self, title: str, content: str, tags: Sequence[str] = None) -> NoteRecord:
+        """添加笔记并分配新 id"""
+        now = time.time()
+        note = NoteRecord(self._next_id, title, content, _tags(tags), now, now)
+        self._next_id += 1
+        self._index(note)
+        self.version += 1
+        if self.listener is not None:
+            self._emit({"t": "note", "r": note.to_state()})
+        return note
+
+    def get(self, note_id: int) -> Optional[NoteRecord]:
+        return self._notes.get(note_id)
+
+    def update(self, note_id: int, **fields: Any) -> Optional[NoteRecord]:
+        """更新笔记字段，笔记不存在时返回 None"""
+        note = self._notes.get(note_id)
+        if note is None:
+            return None
+        unknown = set(fields) - set(MUTABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"不能修改的字段: {', '.join(sorted(unknown))}")
+        updated = NoteRecord(
+            note_id,
+            fields.get("title", note.title),
+            fields.get("content", note.content),
+            _tags(fields["tags"]) if "tags" in fields else note.tags,
+            note.created_at,
+            time.time(),
+        )
+        if "tags" in fields:
+            self._unindex_tags(note)
+            self._index(updated)
+        else:
+            # 原键赋值不改变字典中的顺序
+            self._notes[note_id] = updated
+            for tag in updated.tags:
+                self._by_tag[tag][note_id] = updated
+        self.version += 1
+        if self.listener is not None:
+            self._emit({"t": "note", "r": updated.to_state()})
+        return updated
+
+    def delete(self, note_id: int) -> bool:
+        """删除笔记，返回是否存在"""
+        note = self._notes.pop(note_id, None)
+        if note is None:
+            return False
+        self._unindex_tags(note)
+        self.version += 1
+        if self.listener is not None:
+            self._emit({"t": "note_del", "id": note_id})
+        return True
+
+    def latest(self, limit: int) -> List[NoteRecord]:
+        """最近创建的 limit 条笔记，按创建顺序返回"""
+        notes = list(islice(reversed(self._notes.values()), limit))
+        notes.reverse()
+        return notes
+
+    def with_tag(self, tag: str, limit: int = None) -> List[NoteRecord]:
+        """带有指定标签的笔记，limit 不为空时只返回最近的 limit 条"""
+        tagged = self._by_tag.get(tag)
+        if not tagged:
+            return []
+        if limit is None:
+            return list(tagged.values())
+        notes = list(islice(reversed(tagged.values()), limit))
+        notes.reverse()
+        return notes
+
+    def tag_counts(self) -> Dict[str, int]:
+        return {tag: len(tagged) for tag, tagged in self._by_tag.items()}
+
+    def replace(self, items: Iterable[Mapping[str, Any]]) -> None:
+        """用 items 整体替换所有笔记并重建索引
+
+        保留 items 中已有的 id，没有 id 的项分配新 id；计数器只增不减，
+        之后添加的笔记不会复用替换前或替换后任何一个 id。
+        """
+        notes: Dict[int, NoteRecord] = {}
+        pending = []
+        for item in items:
+            if not isinstance(item, Mapping):
+                raise ValueError("每条笔记必须是 JSON 对象")
+            note_id = item.get("id")
+            if note_id is None:
+                pending.append(item)
+                continue
+            if isinstance(note_id, bool) or not isinstance(note_id, int) or note_id < 1:
+                raise ValueError(f"无效的笔记 id: {note_id!r}")
+            if note_id in notes:
+                raise ValueError(f"重复的笔记 id: {note_id}")
+            notes[note_id] = self._record(note_id, item)
+
+        next_id = max(self._next_id, max(notes, default=0) + 1)
+        for item in pending:
+            notes[next_id] = self._record(next_id, item)
+            next_id += 1
+
+        self._notes = {}
+        self._by_tag = {}
+        self._next_id = next_id
+        for note in notes.values():
+            self._index(note)
+        self.version += 1
+        if self.listener is not None:
+            self._emit({"t": "notes_replace"})
+
+    @staticmethod
+    def _parse_id(token: str) -> int:
+        if not token.isdigit() or token.startswith("0"):
+            raise PatchError(f"无效的笔记 id: {token}")
+        return int(token)
+
+    def _commit(self, records: Dict[int, Optional[NoteRecord]]) -> None:
+        """写回补丁结果：None 表示删除，已有笔记原位替换并重建标签索引"""
+        now = time.time()
+        for note_id, record in records.items():
+            existing = self._notes.get(note_id)
+            if record is None:
+                if existing is not None:
+                    del self._notes[note_id]
+                    self._unindex_tags(existing)
+                continue
+            if existing is not None:
+                self._unindex_tags(existing)
+            record.updated_at = now
+            self._index(record)
+            self._next_id = max(self._next_id, note_id + 1)
+        self.version += 1
+        if self.listener is not None:
+            # 一次补丁只产生一条记录，重放时要么全部生效，要么（日志被截断时）全部不生效
+            self._emit({"t": "notes_batch", "e": [
+                {"t": "note_del", "id": note_id} if record is None else {"t": "note", "r": record.to_state()}
+                for note_id, record in records.items()
+            ]})
+
+    def apply_patch(self, operations: List[Dict[str, Any]]) -> None:
+        """应用 JSON Patch，路径的第一段是笔记 id（如 /3/title），/- 追加新笔记
+
+        只取出补丁涉及的笔记组成子文档，全部操作成功后才写回，任何一步失败都不修改存储；
+        /- 的新 id 从局部计数器分配，写回时 _commit 才推进 _next_id，失败的补丁不消耗 id。
+        """
+        if not isinstance(operations, list):
+            raise PatchError("JSON Patch 必须是操作数组")
+        operations = [dict(operation) if isinstance(operation, dict) else operation
+                      for operation in operations]
+        next_id = self._next_id
+        touched: Dict[str, bool] = {}
+        for operation in operations:
+            if not isinstance(operation, dict):
+                raise PatchError(f"无效的补丁操作: {operation!r}")
+            for key in ("path", "from"):
+                if key not in operation:
+                    continue
+                tokens = parse_pointer(operation[key])
+                if not tokens:
+                    raise PatchError("不能对整个笔记集合打补丁，请整体写入")
+                head = tokens[0]
+                if head == "-":
+                    if key != "path" or operation.get("op") != "add" or len(tokens) > 1:
+                        raise PatchError("只有 add 操作可以用 /- 追加笔记")
+                    head = str(next_id)
+                    next_id += 1
+                    operation[key] = "/" + head
+                self._parse_id(head)
+                modified = key == "from" and operation.get("op") == "move" or (
+                    key == "path" and operation.get("op") != "test")
+                touched[head] = touched.get(head, False) or modified
+
+        document = {}
+        for head in touched:
+            note = self._notes.get(int(head))
+            if note is not None:
+                document[head] = note.to_dict()
+        document = apply_patch(document, operations)
+
+        records = {}
+        for head, modified in touched.items():
+            if modified:
+                item = document.get(head)
+                records[int(head)] = None if item is None else self._record(int(head), item)
+        self._commit(records)
+
+    def apply_merge_patch(self, patch: Mapping[str, Any]) -> None:
+        """应用 JSON Merge Patch：以笔记 id 为键，null 删除笔记，对象合并到已有笔记或新建"""
+        if not isinstance(patch, Mapping):
+            raise PatchError("merge patch 必须是以笔记 id 为键的对象")
+        records = {}
+        for head, value in patch.items():
+            note_id = self._parse_id(head)
+            if value is None:
+                records[note_id] = None
+                continue
+            note = self._notes.get(note_id)
+            item = merge_patch(note.to_dict() if note else {}, value)
+            records[note_id] = self._record(note_id, item)
+        self._commit(records)
+
+    @staticmethod
+    def _record(note_id: int, item: Mapping[str, Any]) -> NoteRecord:
+        if not isinstance(item, Mapping):
+            raise ValueError(f"笔记 {note_id} 必须是 JSON 对象")
+        title = item.get("title", "")
+        content = item.get("content", "")
+        tags = item.get("tags")
+        if not isinstance(title, str) or not isinstance(content, str):
+            raise ValueError(f"笔记 {note_id} 的 title 和 content 必须是字符串")
+        if tags is not None and not isinstance(tags, list):
+            raise ValueError(f"笔记 {note_id} 的 tags 必须是数组")
+        created_at = _timestamp(item.get("created_at"))
+        return NoteRecord(
+            note_id,
+            title,
+            content,
+            _tags(tags),
+            created_at,
+            _timestamp(item.get("updated_at", created_at)),
+        )
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [note.to_dict() for note in self._notes.values()]
+
+    def dump_state(self) -> Dict[str, Any]:
+        """整个存储的持久化快照；notes 只复制笔记对象的引用，编码时再逐条调用 to_state()"""
+        return {
+            "next_id": self._next_id,
+            "version": self.version,
+            "notes": list(self._notes.values()),
+        }
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        """从快照恢复，不触发 listener"""
+        self._notes = {}
+        self._by_tag = {}
+        for note_state in state["notes"]:
+            self._index(NoteRecord.from_state(note_state))
+        self._next_id = state["next_id"]
+        self.version = state["version"]
+
+    def apply_log_entry(self, entry: Mapping[str, Any]) -> None:
+        """重放一条 listener 产生的变更记录，不触发 listener"""
+        if entry["t"] == "notes_batch":
+            for change in entry["e"]:
+                self._apply_change(change)
+        else:
+            self._apply_change(entry)
+        self._next_id = entry["n"]
+        self.version = entry["v"]
+
+    def _apply_change(self, entry: Mapping[str, Any]) -> None:
+        kind = entry["t"]
+        if kind == "note":
+            note = NoteRecord.from_state(entry["r"])
+            existing = self._notes.get(note.id)
+            if existing is not None:
+                self._unindex_tags(existing)
+            self._index(note)
+        elif kind == "note_del":
+            note = self._notes.pop(entry["id"], None)
+            if note is not None:
+                self._unindex_tags(note)
+        else:
+            raise ValueError(f"无法重放的变更记录: {kind}")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+按需性能剖析
+对抽样的一部分工具调用运行 cProfile（可选 tracemalloc 内存分配对比），
+结果写入按数量轮转的文件：.prof 可用 pstats / snakeviz / gprof2dot 打开，
+.alloc.txt 是调用前后的分配差异。默认关闭，可用环境变量或 profiling 工具在运行时开关
+"""
+
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from mcp.types import CallToolResult
+
+if TYPE_CHECKING:
+    from tool_registry import ToolRegistry
+
+logger = logging.getLogger(__name__)
+
+# 抽样比例 (0~1)，0 表示关闭
+PROFILE_SAMPLE_RATE = float(os.environ.get("MCP_PROFILE_RATE", 0))
+PROFILE_DIR = os.environ.get("MCP_PROFILE_DIR", "profiles")
+# 目录中最多保留的结果数（每次抽样的 .prof 与 .alloc.txt 算一份），超出时删除最旧的
+PROFILE_MAX_FILES = int(os.environ.get("MCP_PROFILE_MAX_FILES", 100))
+# 是否同时用 tracemalloc 记录内存分配（开启期间所有分配都会变慢）
+PROFILE_MEMORY = os.environ.get("MCP_PROFILE_MEMORY", "0").lower() in ("1", "true", "yes")
+# 只剖析这些工具（逗号分隔），为空表示全部
+PROFILE_TOOLS = [name for name in os.environ.get("MCP_PROFILE_TOOLS", "").split(",") if name]
+
+TRACEMALLOC_FRAMES = 10
+ALLOCATION_TOP = 30
+# 分配对比中排除剖析自身的分配
+ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+class ToolProfiler:
+    """抽样剖析工具调用
+
+    cProfile 按线程生效：只记录事件循环线程，交给线程池执行的部分（如数据库查询）
+    在结果中表现为等待时间；被抽中的调用 await 期间，事件循环上同时执行的其他协程
+    也会出现在结果中。同一时刻只剖析一个调用，其余调用照常执行不受影响。
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, directory: str = PROFILE_DIR,
+                 max_files: int = PROFILE_MAX_FILES, memory: bool = PROFILE_MEMORY,
+                 tools: Optional[List[str]] = None):
+        self.directory = directory
+        self.max_files = max_files
+        self.sample_rate = 0.0
+        self.memory = False
+        self.tools = frozenset(PROFILE_TOOLS if tools is None else tools)
+        self.samples = 0
+        self._active = False
+        self._random = random.Random()
+        self._written: List[str] = []
+        self._write_lock = threading.Lock()
+        self.configure(sample_rate=sample_rate, memory=memory)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def configure(self, sample_rate: Optional[float] = None, memory: Optional[bool] = None,
+                  tools: Optional[List[str]] = None) -> None:
+        """修改抽样比例、内存追踪和工具过滤；未传入的参数保持不变"""
+        if sample_rate is not None:
+            if not 0 <= sample_rate <= 1:
+                raise ValueError(f"抽样比例必须在 0 到 1 之间: {sample_rate}")
+            self.sample_rate = sample_rate
+        if tools is not None:
+            self.tools = frozenset(tools)
+        if memory is not None:
+            self.memory = memory
+        # 只在需要时开启 tracemalloc，关闭剖析或内存追踪后立即停止
+        tracing = self.enabled and self.memory
+        if tracing and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        elif not tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "memory": self.memory,
+            "tools": sorted(self.tools),
+            "directory": os.path.abspath(self.directory),
+            "max_files": self.max_files,
+            "samples": self.samples,
+            "recent_files": list(self._written[-5:]),
+        }
+
+    def should_sample(self, name: str) -> bool:
+        if not self.enabled or self._active:
+            return False
+        if self.tools and name not in self.tools:
+            return False
+        return self._random.random() < self.sample_rate
+
+    async def profile(self, name: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """剖析一次调用；结果文件在默认线程池中写出，不增加这次调用的延迟"""
+        self._active = True
+        before = tracemalloc.take_snapshot() if self.memory and tracemalloc.is_tracing() else None
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            return await call()
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            # 调用期间可能已通过 profiling 工具关闭了内存追踪
+            after = tracemalloc.take_snapshot() if before is not None and tracemalloc.is_tracing() else None
+            self._active = False
+            self.samples += 1
+            asyncio.get_running_loop().run_in_executor(None, self._write, name, elapsed, profile, before, after)
+
+    def _write(self, name: str, elapsed: float, profile: cProfile.Profile,
+               before: Optional[tracemalloc.Snapshot], after: Optional[tracemalloc.Snapshot]) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            base = os.path.join(
+                self.directory, f"{stamp}-{int(time.time() * 1000) % 1000:03d}-{name}-{os.getpid()}-{elapsed * 1000:.1f}ms"
+            )
+            profile.dump_stats(base + ".prof")
+            files = [base + ".prof"]
+            if before is not None and after is not None:
+                with open(base + ".alloc.txt", "w", encoding="utf-8") as f:
+                    f.write(f"# {name}: {elapsed * 1000:.2f} ms，按分配增量排序的前 {ALLOCATION_TOP} 个位置\n")
+                    for stat in after.filter_traces(ALLOCATION_FILTERS).compare_to(
+                            before.filter_traces(ALLOCATION_FILTERS), "lineno")[:ALLOCATION_TOP]:
+                        f.write(f"{stat}\n")
+                files.append(base + ".alloc.txt")
+            self._rotate(files)
+        except Exception:
+            logger.exception(f"写入剖析结果失败: {name}")
+
+    def _rotate(self, files: List[str]) -> None:
+        """记录新文件并删除超出 max_files 份的最旧结果（包括之前进程留下的）"""
+        with self._write_lock:
+            if not self._written:
+                existing = [
+                    os.path.join(self.directory, entry) for entry in os.listdir(self.directory)
+                    if entry.endswith(".prof")
+                ]
+                self._written = sorted(existing, key=os.path.getmtime)
+                self._written = [path for path in self._written if path not in files]
+            self._written.append(files[0])
+            while len(self._written) > self.max_files:
+                oldest = self._written.pop(0)
+                for path in (oldest, oldest[:-len(".prof")] + ".alloc.txt"):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+def register_profiling_tool(tools: "ToolRegistry", profiler: ToolProfiler) -> None:
+    """在注册表上注册 profiling 工具：修改剖析设置并返回当前状态"""
+
+    @tools.tool(
+        name="profiling",
+        description="开关工具调用的抽样性能剖析，返回当前设置和最近的结果文件",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "sample_rate": {"type": "number", "minimum": 0, "maximum": 1,
+                                "description": "抽样比例，0 关闭，1 剖析每次调用"},
+                "memory": {"type": "boolean", "description": "是否用 tracemalloc 记录内存分配"},
+                "tools": {"type": "array", "items": {"type": "string"},
+                          "description": "只剖析这些工具，空数组表示全部"}
+            }
+        }
+    )
+    async def handle_profiling(arguments: Dict[str, Any]) -> CallToolResult:
+        profiler.configure(
+            sample_rate=arguments.get("sample_rate"),
+            memory=arguments.get("memory"),
+            tools=arguments.get("tools"),
+        )
+        return CallToolResult(
+            content=[{"type": "text", "text": json.dumps(profiler.status(), ensure_ascii=False, indent=2)}]
+        )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+列表渲染器
+各服务器共用，模板在创建渲染器时切分为字面量片段，渲染时按列取值并一次拼接所有行
+"""
+
+import json
+import operator
+from itertools import chain, repeat
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# 工具输出格式：text 为原有的纯文本，markdown 为表格，json 供机器客户端直接解析
+OUTPUT_FORMATS = ("text", "markdown", "json")
+
+def truncate(length: int) -> Callable[[Any], str]:
+    """超过 length 个字符时截断并追加省略号"""
+    def display(value: Any) -> str:
+        value = value or ""
+        return value[:length] + "..." if len(value) > length else value
+    return display
+
+def join_list(empty: str = "无") -> Callable[[Any], str]:
+    """用逗号连接列表，空列表显示 empty"""
+    def display(value: Any) -> str:
+        return ", ".join(value) if value else empty
+    return display
+
+def or_default(default: str = "无") -> Callable[[Any], str]:
+    """空值显示 default"""
+    def display(value: Any) -> str:
+        return value if value else default
+    return display
+
+class Field:
+    """渲染字段：字典键、显示名称和可选的显示转换"""
+
+    __slots__ = ("key", "label", "display")
+
+    def __init__(self, key: str, label: str, display: Callable[[Any], Any] = None):
+        self.key = key
+        self.label = label
+        self.display = display
+
+class ListRenderer:
+    """把字典行渲染为文本、Markdown 表格或 JSON"""
+
+    def __init__(self, title: str, fields: Sequence[Field], empty_text: str = "暂无数据",
+                 separator_width: int = 50):
+        self.title = title
+        self.fields = list(fields)
+        self.empty_text = empty_text
+        self.separator_width = separator_width
+        self._keys = [field.key for field in self.fields]
+        self._projections: Dict[tuple, "ListRenderer"] = {}
+
+        # 编译模板：每种格式生成一个 rows -> str 函数，渲染时不再解析模板
+        self._text_rows = self._compile(
+            [f"{field.label}: {{}}\n" for field in self.fields], "-" * separator_width + "\n"
+        )
+        self._markdown_rows = self._compile(
+            ["| " + " | ".join("{}" for _ in self.fields) + " |\n"], "", markdown=True
+        )
+        self._markdown_header = (
+            "| " + " | ".join(field.label for field in self.fields) + " |\n"
+            + "|" + "---|" * len(self.fields) + "\n"
+        )
+
+    def _compile(self, parts: List[str], suffix: str, markdown: bool = False) -> Callable[[Sequence[Dict]], str]:
+        """把带 {} 占位符的模板片段编译为 rows -> str 函数
+
+        模板在这里切分为字面量片段。渲染时按列处理：每个字段用 itemgetter 取出一列，
+        有显示转换的列再整体 map 一次，然后把字面量和各列逐行交错，一次 "".join 拼出所有行；
+        取值、转字符串和拼接都在 C 中完成，只有显示转换函数在 Python 中调用。
+        """
+        chunks = ("".join(parts) + suffix).split("{}")
+        tail = chunks[-1]
+        columns = [
+            (chunk, operator.itemgetter(field.key), field.display, self._markdown_cell if markdown else str)
+            for chunk, field in zip(chunks, self.fields)
+        ]
+
+        def render_rows(rows: Sequence[Dict]) -> str:
+            if not columns:
+                return tail * len(rows)
+            iterables = []
+            for chunk, getter, display, to_text in columns:
+                column = map(getter, rows)
+                if display:
+                    column = map(display, column)
+                iterables += (repeat(chunk), map(to_text, column))
+            iterables.append(repeat(tail))
+            return "".join(chain.from_iterable(zip(*iterables)))
+        return render_rows
+
+    def project(self, keys: Sequence[str]) -> "ListRenderer":
+        """只渲染 keys 中字段的渲染器（保持原有字段顺序），按字段组合缓存编译结果"""
+        keys = tuple(key for key in self._keys if key in keys)
+        if keys == tuple(self._keys):
+            return self
+        renderer = self._projections.get(keys)
+        if renderer is None:
+            renderer = ListRenderer(self.title, [field for field in self.fields if field.key in keys],
+                                    self.empty_text, self.separator_width)
+            self._projections[keys] = renderer
+        return renderer
+
+    @staticmethod
+    def _markdown_cell(value: Any) -> str:
+        return str(value).replace("|", "\\|").replace("\n", "<br>")
+
+    def render(self, rows: Sequence[Dict], fmt: str = "text", next_cursor: Optional[str] = None,
+               title: str = None, empty_text: str = None) -> str:
+        """渲染行列表；next_cursor 不为空时附加下一页游标，title/empty_text 可覆盖默认文字"""
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的输出格式: {fmt}")
+
+        if fmt == "json":
+            items = [{key: row[key] for key in self._keys} for row in rows]
+            return json.dumps({"items": items, "next_cursor": next_cursor}, ensure_ascii=False)
+
+        if not rows:
+            return empty_text or self.empty_text
+        title = title or self.title
+
+        if fmt == "markdown":
+            body = self._markdown_rows(rows)
+            result = f"{title}\n\n{self._markdown_header}{body}"
+        else:
+            body = self._text_rows(rows)
+            result = f"{title}\n\n{body}"
+
+        if next_cursor:
+            result += f"下一页游标: {next_cursor}\n"
+        return result
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+读结果缓存
+按工具名 + 规范化参数缓存只读工具和资源的结果，按条数和字节数做 LRU 淘汰；
+每个条目记录计算时依赖的表版本，写入后对应表的版本号加一，旧条目在下次读取时失效
+"""
+
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Sequence, Tuple
+
+# 最多缓存的结果条数，0 表示关闭缓存
+RESULT_CACHE_SIZE = int(os.environ.get("MCP_RESULT_CACHE_SIZE", 256))
+# 缓存结果文本的总字节数上限
+RESULT_CACHE_BYTES = int(os.environ.get("MCP_RESULT_CACHE_BYTES", 32 * 1024 * 1024))
+
+def normalize_arguments(arguments: Any) -> str:
+    """参数的规范形式：键排序、无空白，键顺序不同的相同参数得到同一个缓存键"""
+    return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+class CacheEntry:
+    __slots__ = ("versions", "value", "size")
+
+    def __init__(self, versions: Tuple[int, ...], value: Any, size: int):
+        self.versions = versions
+        self.value = value
+        self.size = size
+
+class ResultCache:
+    """带表版本失效的 LRU 结果缓存
+
+    只在事件循环线程中使用，不加锁。读取开始前记录依赖表的版本号并随结果保存，
+    写入在提交后才增加版本号，因此与写入并发的读取即使得到旧数据，也会在下次读取时失效。
+    只感知本进程内经过 bump() 的写入，其他进程写同一个数据库时不能使用。
+    """
+
+    name = "cache"
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, max_bytes: int = RESULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def disable(self) -> None:
+        """关闭缓存并清空已有条目"""
+        self.max_entries = 0
+        self.clear()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def bump(self, *tables: str) -> None:
+        """表已被修改：版本号加一，依赖它的条目在下次读取时失效"""
+        for table in tables:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def versions(self, tables: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get(self, key: Hashable, tables: Sequence[str]) -> Tuple[bool, Any]:
+        """返回 (是否命中, 结果)；条目依赖的表被修改过时删除并视为未命中"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if entry.versions != self.versions(tables):
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry.value
+
+    def put(self, key: Hashable, versions: Tuple[int, ...], value: Any, size: int) -> None:
+        """保存结果；超过单条上限的不缓存，之后淘汰最久未用的条目直到满足条数和字节数限制"""
+        if not self.enabled or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CacheEntry(versions, value, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+    async def get_or_compute(self, key: Hashable, tables: Sequence[str],
+                             compute: Callable[[], Awaitable[Any]],
+                             size: Callable[[Any], int], cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """命中时直接返回，否则计算并缓存（cacheable 返回 False 的结果不缓存，例如错误结果）"""
+        if not self.enabled:
+            return await compute()
+        hit, value = self.get(key, tables)
+        if hit:
+            return value
+        versions = self.versions(tables)
+        value = await compute()
+        if cacheable(value):
+            self.put(key, versions, value, size(value))
+        return value
+
+    def summary(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "table_versions": dict(self._versions),
+        }
+
+    def render_prometheus(self, lines: List[str]) -> None:
+        for metric, kind, help_text, value in (
+            ("hits_total", "counter", "结果缓存命中次数", self.hits),
+            ("misses_total", "counter", "结果缓存未命中次数", self.misses),
+            ("invalidations_total", "counter", "因表被修改而失效的缓存条目数", self.invalidations),
+            ("evictions_total", "counter", "LRU 淘汰的缓存条目数", self.evictions),
+            ("entries", "gauge", "结果缓存条目数", len(self._entries)),
+            ("bytes", "gauge", "结果缓存占用的字节数", self.bytes),
+        ):
+            lines.append(f"# HELP mcp_result_cache_{metric} {help_text}")
+            lines.append(f"# TYPE mcp_result_cache_{metric} {kind}")
+            lines.append(f"mcp_result_cache_{metric} {value}")
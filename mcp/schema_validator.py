@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+工具参数校验
+把 inputSchema（JSON Schema 的常用子集）在注册时编译为嵌套闭包，
+调用时只做类型判断和字典查找，校验通过的路径上不分配任何对象
+"""
+
+from typing import Any, Callable, Dict, List, Mapping
+
+Validator = Callable[[Any], None]
+
+# 只影响文档、不参与校验的关键字
+ANNOTATION_KEYWORDS = {"description", "title", "default", "examples"}
+
+SUPPORTED_KEYWORDS = ANNOTATION_KEYWORDS | {
+    "type", "properties", "required", "additionalProperties", "items", "enum",
+    "minimum", "maximum", "minLength", "maxLength", "minItems", "maxItems",
+}
+
+class ValidationError(ValueError):
+    """参数不符合 inputSchema"""
+
+    def __init__(self, message: str, path: List[Any] = None):
+        super().__init__(message)
+        self.message = message
+        self.path = path or []
+
+    def __str__(self) -> str:
+        if not self.path:
+            return self.message
+        location = "".join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in self.path)
+        return f"{location.lstrip('.')}: {self.message}"
+
+# 可以直接用 isinstance 判断的类型，省去一次函数调用
+TYPE_CLASSES = {"object": dict, "array": list, "string": str}
+
+def _is_integer(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": _is_integer,
+    "number": _is_number,
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+def _compile_type(schema_type: Any) -> List[Validator]:
+    names = schema_type if isinstance(schema_type, list) else [schema_type]
+    unknown = [name for name in names if name not in TYPE_CHECKS]
+    if unknown:
+        raise ValueError(f"不支持的类型: {', '.join(unknown)}")
+    checks = [TYPE_CHECKS[name] for name in names]
+    expected = " 或 ".join(names)
+
+    if len(names) == 1 and names[0] in TYPE_CLASSES:
+        cls = TYPE_CLASSES[names[0]]
+
+        def check(value):
+            if not isinstance(value, cls):
+                raise ValidationError(f"应为 {expected} 类型")
+    elif len(checks) == 1:
+        is_type = checks[0]
+
+        def check(value):
+            if not is_type(value):
+                raise ValidationError(f"应为 {expected} 类型")
+    else:
+        def check(value):
+            if not any(is_type(value) for is_type in checks):
+                raise ValidationError(f"应为 {expected} 类型")
+    return [check]
+
+def _compile_object(schema: Mapping[str, Any]) -> List[Validator]:
+    properties = {
+        name: compile_schema(sub_schema)
+        for name, sub_schema in schema.get("properties", {}).items()
+    }
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+    additional_check = None if isinstance(additional, bool) else compile_schema(additional)
+
+    def check(value):
+        if not isinstance(value, dict):
+            return  # 类型由 type 关键字检查
+        for name in required:
+            if name not in value:
+                raise ValidationError(f"缺少必填参数 {name}")
+        for key, item in value.items():
+            validator = properties.get(key, additional_check)
+            if validator is None:
+                if additional is False:
+                    raise ValidationError(f"不允许的参数 {key}")
+                continue
+            try:
+                validator(item)
+            except ValidationError as e:
+                e.path.insert(0, key)
+                raise
+    return [check]
+
+def _compile_array(schema: Mapping[str, Any]) -> List[Validator]:
+    validators = []
+    if "items" in schema:
+        item_check = compile_schema(schema["items"])
+
+        def check_items(value):
+            if not isinstance(value, list):
+                return
+            for index, item in enumerate(value):
+                try:
+                    item_check(item)
+                except ValidationError as e:
+                    e.path.insert(0, index)
+                    raise
+        validators.append(check_items)
+
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    if min_items is not None or max_items is not None:
+        def check_size(value):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                raise ValidationError(f"至少需要 {min_items} 项")
+            if max_items is not None and len(value) > max_items:
+                raise ValidationError(f"最多允许 {max_items} 项")
+        validators.append(check_size)
+    return validators
+
+def _compile_bounds(schema: Mapping[str, Any]) -> List[Validator]:
+    validators = []
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+    if minimum is not None or maximum is not None:
+        def check_range(value):
+            if not _is_number(value):
+                return
+            if minimum is not None and value < minimum:
+                raise ValidationError(f"不能小于 {minimum}")
+            if maximum is not None and value > maximum:
+                raise ValidationError(f"不能大于 {maximum}")
+        validators.append(check_range)
+
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    if min_length is not None or max_length is not None:
+        def check_length(value):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                raise ValidationError(f"长度不能少于 {min_length} 个字符")
+            if max_length is not None and len(value) > max_length:
+                raise ValidationError(f"长度不能超过 {max_length} 个字符")
+        validators.append(check_length)
+    return validators
+
+def _compile_enum(options: List[Any]) -> List[Validator]:
+    allowed = frozenset(options) if all(isinstance(o, (str, int, float)) for o in options) else options
+    listed = ", ".join(map(str, options))
+
+    def check(value):
+        try:
+            ok = value in allowed
+        except TypeError:  # 不可哈希的值不可能在 frozenset 中
+            ok = False
+        if not ok:
+            raise ValidationError(f"应为以下值之一: {listed}")
+    return [check]
+
+def compile_schema(schema: Mapping[str, Any]) -> Validator:
+    """编译 schema 为 value -> None 的校验函数，不符合时抛出 ValidationError
+
+    只支持服务器 inputSchema 用到的关键字，遇到其它关键字在编译时报错，
+    避免写了却不生效的约束。
+    """
+    unknown = set(schema) - SUPPORTED_KEYWORDS
+    if unknown:
+        raise ValueError(f"不支持的 schema 关键字: {', '.join(sorted(unknown))}")
+
+    validators: List[Validator] = []
+    if "type" in schema:
+        validators += _compile_type(schema["type"])
+    if "enum" in schema:
+        validators += _compile_enum(schema["enum"])
+    if "properties" in schema or "required" in schema or "additionalProperties" in schema:
+        validators += _compile_object(schema)
+    validators += _compile_array(schema)
+    validators += _compile_bounds(schema)
+
+    if not validators:
+        return lambda value: None
+    if len(validators) == 1:
+        return validators[0]
+    if len(validators) == 2:
+        first, second = validators
+
+        def check_both(value):
+            first(value)
+            second(value)
+        return check_both
+
+    def check_all(value):
+        for validator in validators:
+            validator(value)
+    return check_all
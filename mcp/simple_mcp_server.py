@@ -6,75 +6,76 @@
 import asyncio
 import json
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from mcp.server import Server
+from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
-from mcp.types import CallToolResult, ListToolsResult, Tool
+from mcp.types import CallToolResult, ListToolsResult
+
+from http_transport import DEFAULT_HTTP_HOST, DEFAULT_HTTP_PORT, parse_transport_args, serve_http
+from persistence import DATA_DIR, Persistence
+from profiler import ToolProfiler, register_profiling_tool
+from renderer import OUTPUT_FORMATS, Field, ListRenderer
+from tool_registry import ToolRegistry
 
 # 创建MCP服务器实例
 server = Server("simple-mcp-server")
 
+# 抽样性能剖析，默认关闭，可用 MCP_PROFILE_RATE 或 profiling 工具开启
+profiler = ToolProfiler()
+
+# 工具注册表：各工具通过 @tools.tool 注册
+tools = ToolRegistry(profiler=profiler)
+
+# 列表渲染器
+NOTE_RENDERER = ListRenderer("笔记列表:", [
+    Field("id", "ID"),
+    Field("title", "标题"),
+    Field("content", "内容"),
+    Field("created_at", "创建时间"),
+], empty_text="暂无笔记", separator_width=30)
+
 # 存储数据
 notes = []
 
+# 持久化引擎，设置 MCP_DATA_DIR 时在 main() 中打开
+persistence: Optional[Persistence] = None
+
+def apply_log_entry(entry: Dict[str, Any]) -> None:
+    notes.append(entry["note"])
+
+def load_state(state: List[Dict[str, Any]]) -> None:
+    notes[:] = state
+
 @server.list_tools()
 async def handle_list_tools() -> ListToolsResult:
     """列出可用的工具"""
-    tools = [
-        Tool(
-            name="add_note",
-            description="添加一个新的笔记",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {"type": "string", "description": "笔记标题"},
-                    "content": {"type": "string", "description": "笔记内容"}
-                },
-                "required": ["title", "content"]
-            }
-        ),
-        Tool(
-            name="list_notes",
-            description="列出所有笔记",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        ),
-        Tool(
-            name="get_time",
-            description="获取当前时间",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        )
-    ]
-    return ListToolsResult(tools=tools)
+    return tools.list_tools()
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
     """处理工具调用"""
     try:
-        if name == "add_note":
-            return await add_note(arguments)
-        elif name == "list_notes":
-            return await list_notes(arguments)
-        elif name == "get_time":
-            return await get_time(arguments)
-        else:
-            return CallToolResult(
-                content=[{"type": "text", "text": f"未知工具: {name}"}],
-                isError=True
-            )
+        return await tools.call(name, arguments)
     except Exception as e:
         return CallToolResult(
             content=[{"type": "text", "text": f"工具调用失败: {str(e)}"}],
             isError=True
         )
 
+@tools.tool(
+    name="add_note",
+    description="添加一个新的笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "笔记标题"},
+            "content": {"type": "string", "description": "笔记内容"}
+        },
+        "required": ["title", "content"]
+    }
+)
 async def add_note(arguments: Dict[str, Any]) -> CallToolResult:
     """添加笔记"""
     title = arguments.get("title", "")
@@ -88,6 +89,8 @@ async def add_note(arguments: Dict[str, Any]) -> CallToolResult:
     }
     
     notes.append(note)
+    if persistence is not None:
+        persistence.append({"t": "note", "note": note})
     
     return CallToolResult(
         content=[{
@@ -96,25 +99,32 @@ async def add_note(arguments: Dict[str, Any]) -> CallToolResult:
         }]
     )
 
+@tools.tool(
+    name="list_notes",
+    description="列出所有笔记",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "format": {"type": "string", "enum": list(OUTPUT_FORMATS), "description": "输出格式 (默认 text)"}
+        }
+    }
+)
 async def list_notes(arguments: Dict[str, Any]) -> CallToolResult:
     """列出笔记"""
-    if not notes:
-        return CallToolResult(
-            content=[{"type": "text", "text": "暂无笔记"}]
-        )
-    
-    result = "笔记列表:\n\n"
-    for note in notes:
-        result += f"ID: {note['id']}\n"
-        result += f"标题: {note['title']}\n"
-        result += f"内容: {note['content']}\n"
-        result += f"创建时间: {note['created_at']}\n"
-        result += "-" * 30 + "\n"
+    result = NOTE_RENDERER.render(notes, arguments.get("format", "text"))
     
     return CallToolResult(
         content=[{"type": "text", "text": result}]
     )
 
+@tools.tool(
+    name="get_time",
+    description="获取当前时间",
+    input_schema={
+        "type": "object",
+        "properties": {}
+    }
+)
 async def get_time(arguments: Dict[str, Any]) -> CallToolResult:
     """获取当前时间"""
     now = datetime.now()
@@ -124,21 +134,36 @@ async def get_time(arguments: Dict[str, Any]) -> CallToolResult:
         content=[{"type": "text", "text": f"当前时间: {time_str}"}]
     )
 
-async def main():
+register_profiling_tool(tools, profiler)
+
+async def main(transport: str = "stdio", host: str = DEFAULT_HTTP_HOST, port: int = DEFAULT_HTTP_PORT,
+               json_response: bool = False):
     """主函数"""
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="simple-mcp-server",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=None,
-                    experimental_capabilities=None,
-                ),
-            ),
-        )
+    global persistence
+    if DATA_DIR:
+        persistence = Persistence(DATA_DIR, "simple-mcp-server", apply_log_entry, lambda: list(notes), load_state)
+        persistence.open()
+    try:
+        if transport == "http":
+            await serve_http(server, host, port, json_response)
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="simple-mcp-server",
+                        server_version="1.0.0",
+                        capabilities=server.get_capabilities(
+                            notification_options=NotificationOptions(),
+                            experimental_capabilities={},
+                        ),
+                    ),
+                )
+    finally:
+        if persistence is not None:
+            persistence.close()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    args = parse_transport_args("简单MCP服务器")
+    asyncio.run(main(args.transport, args.host, args.port, args.json_response)) 
\ No newline at end of file
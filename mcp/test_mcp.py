@@ -5,46 +5,64 @@ MCP服务器测试脚本
 
 import asyncio
 import json
-import subprocess
-import sys
-from typing import Dict, Any
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from mcp_client import MCPClient, MCPError, result_text
+
+SERVER_DIR = Path(__file__).resolve().parent
+
+# 必须被 calculate 拒绝的表达式：超出整数位数、指数或列表长度限制，以及不在白名单内的语法
+REJECTED_EXPRESSIONS = [
+    "[0] * 10 ** 9",
+    "len([0] * (10 ** 7))",
+    "(1,) * 6000 + (1,) * 6000",
+    "len(sum([[0] * 10000] * 30, []))",
+    "9 ** 9 ** 9",
+    "2 ** 100000",
+    "__import__('os').getcwd()",
+    "(lambda: 1)()",
+]
+
+# batch_calculate 的向量化路径应与逐组求值给出相同的结果和错误：(表达式, 变量, 期望结果，None 表示该项报错)
+BATCH_CASES = [
+    ("len([x] * 10 ** 9)", {"x": [1, 2]}, [None, None]),
+    ("1 / x", {"x": [0, 4]}, [None, 0.25]),
+    ("x ** 1001", {"x": [1, 2]}, [None, None]),
+    ("max(x, 0) * y + sum([x, y, 1])", {"x": [-1, 2], "y": [3, 4]}, [3, 15]),
+]
 
 class MCPTester:
     def __init__(self):
-        self.process = None
+        self.client = None
+        self.failures = 0
         
     async def start_server(self):
-        """启动MCP服务器"""
+        """启动MCP服务器并完成 initialize 握手"""
         try:
-            self.process = await asyncio.create_subprocess_exec(
-                sys.executable, "simple_mcp_server.py",
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            print("MCP服务器已启动")
+            self.client = MCPClient("simple_mcp_server.py", cwd=str(SERVER_DIR), client_name="mcp-tester")
+            info = await self.client.start()
+            server = info.get("serverInfo", {})
+            print(f"MCP服务器已启动: {server.get('name')} {server.get('version')} (协议 {info.get('protocolVersion')})")
         except Exception as e:
             print(f"启动服务器失败: {e}")
             return False
         return True
     
-    async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """发送请求到MCP服务器"""
-        if not self.process:
-            return {"error": "服务器未启动"}
-        
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        """调用工具并检查结果，返回文本内容"""
         try:
-            # 发送请求
-            request_str = json.dumps(request) + "\n"
-            self.process.stdin.write(request_str.encode())
-            await self.process.stdin.drain()
-            
-            # 读取响应
-            response_line = await self.process.stdout.readline()
-            response = json.loads(response_line.decode().strip())
-            return response
-        except Exception as e:
-            return {"error": f"请求失败: {e}"}
+            result = await self.client.call_tool(name, arguments)
+        except (MCPError, ConnectionError) as e:
+            self.failures += 1
+            return f"✗ 请求失败: {e}"
+        if result.get("isError"):
+            self.failures += 1
+            return f"✗ {result_text(result)}"
+        return f"✓ {result_text(result)}"
     
     async def test_tools(self):
         """测试工具功能"""
@@ -52,67 +70,87 @@ class MCPTester:
         
         # 测试获取时间
         print("\n1. 测试获取时间:")
-        time_request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/call",
-            "params": {
-                "name": "get_time",
-                "arguments": {}
-            }
-        }
-        response = await self.send_request(time_request)
-        print(f"响应: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        print(await self.call_tool("get_time", {}))
         
         # 测试添加笔记
         print("\n2. 测试添加笔记:")
-        add_note_request = {
-            "jsonrpc": "2.0",
-            "id": 2,
-            "method": "tools/call",
-            "params": {
-                "name": "add_note",
-                "arguments": {
-                    "title": "测试笔记",
-                    "content": "这是一个测试笔记的内容"
-                }
-            }
-        }
-        response = await self.send_request(add_note_request)
-        print(f"响应: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        print(await self.call_tool("add_note", {
+            "title": "测试笔记",
+            "content": "这是一个测试笔记的内容"
+        }))
         
         # 测试列出笔记
         print("\n3. 测试列出笔记:")
-        list_notes_request = {
-            "jsonrpc": "2.0",
-            "id": 3,
-            "method": "tools/call",
-            "params": {
-                "name": "list_notes",
-                "arguments": {}
-            }
-        }
-        response = await self.send_request(list_notes_request)
-        print(f"响应: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        print(await self.call_tool("list_notes", {}))
+    
+    async def test_pipelining(self, count: int = 50):
+        """一条连接上同时发出多个请求，检查每个响应都回到了对应的调用"""
+        print(f"\n=== 测试流水线请求 ({count} 个并发调用) ===")
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            self.client.call_tool("add_note", {"title": f"并发笔记 {i}", "content": f"第 {i} 条"})
+            for i in range(count)
+        ), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        
+        mismatched = [
+            i for i, result in enumerate(results)
+            if isinstance(result, Exception) or result.get("isError")
+            or f"并发笔记 {i}\n" not in result_text(result)
+        ]
+        if mismatched:
+            self.failures += len(mismatched)
+            print(f"✗ {len(mismatched)} 个响应失败或与请求不匹配: {mismatched[:10]}")
+        else:
+            print(f"✓ {count} 个响应全部匹配，用时 {elapsed * 1000:.1f} ms")
+    
+    async def test_expression_limits(self):
+        """高级服务器的 calculate 应拒绝可能占满 CPU 或内存的表达式，且服务器仍能正常响应"""
+        print("\n=== 测试表达式限制 (advanced_mcp_server.py) ===")
+        
+        env = dict(os.environ, MCP_DB_PATH=os.path.join(tempfile.mkdtemp(), "test.db"))
+        async with MCPClient("advanced_mcp_server.py", cwd=str(SERVER_DIR), env=env,
+                             client_name="mcp-tester") as client:
+            for expression in REJECTED_EXPRESSIONS:
+                start = time.perf_counter()
+                result = await client.call_tool("calculate", {"expression": expression})
+                elapsed = time.perf_counter() - start
+                if result.get("isError"):
+                    print(f"✓ 已拒绝 {expression} ({elapsed * 1000:.1f} ms): {result_text(result)}")
+                else:
+                    self.failures += 1
+                    print(f"✗ 未拒绝 {expression}: {result_text(result)}")
+            for expression, variables, expected in BATCH_CASES:
+                result = await client.call_tool("batch_calculate", {
+                    "expression": expression, "variables": variables, "format": "json"
+                })
+                results = None if result.get("isError") else json.loads(result_text(result))["results"]
+                if results == expected:
+                    print(f"✓ batch {expression}: {results}")
+                else:
+                    self.failures += 1
+                    print(f"✗ batch {expression}: 期望 {expected}，实际 {results or result_text(result)}")
+            result = await client.call_tool("calculate", {"expression": "len([0] * 100) + 2 ** 10"})
+            if result.get("isError") or "1124" not in result_text(result):
+                self.failures += 1
+                print(f"✗ 正常表达式计算失败: {result_text(result)}")
+            else:
+                print(f"✓ {result_text(result)}")
     
     async def test_list_tools(self):
         """测试工具列表功能"""
         print("\n=== 测试工具列表 ===")
         
-        list_tools_request = {
-            "jsonrpc": "2.0",
-            "id": 4,
-            "method": "tools/list",
-            "params": {}
-        }
-        response = await self.send_request(list_tools_request)
-        print(f"可用工具: {json.dumps(response, indent=2, ensure_ascii=False)}")
+        tools = await self.client.list_tools()
+        for tool in tools:
+            print(f"- {tool['name']}: {tool.get('description', '')}")
+        print(f"可用工具: {json.dumps([tool['name'] for tool in tools], ensure_ascii=False)}")
     
     async def cleanup(self):
         """清理资源"""
-        if self.process:
-            self.process.terminate()
-            await self.process.wait()
+        if self.client:
+            await self.client.close()
             print("MCP服务器已停止")
 
 async def main():
@@ -124,21 +162,27 @@ async def main():
         if not await tester.start_server():
             return
         
-        # 等待服务器启动
-        await asyncio.sleep(1)
-        
         # 测试工具列表
         await tester.test_list_tools()
         
         # 测试工具功能
         await tester.test_tools()
         
+        # 测试流水线请求
+        await tester.test_pipelining()
+        
+        # 测试表达式限制
+        await tester.test_expression_limits()
+        
     except Exception as e:
         print(f"测试过程中出现错误: {e}")
     finally:
         await tester.cleanup()
+    
+    if tester.failures:
+        print(f"\n{tester.failures} 个调用失败")
 
 if __name__ == "__main__":
     print("开始测试MCP服务器...")
     asyncio.run(main())
-    print("测试完成!") 
\ No newline at end of file
+    print("测试完成! 吞吐量和延迟请使用 load_test.py 测量")
\ No newline at end of file
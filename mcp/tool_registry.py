@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+工具注册表
+各服务器共用：用装饰器在导入时注册工具的处理函数和 inputSchema，
+调用时按名称查字典分发并先用预编译的 schema 校验参数，
+tools/list 返回构建一次后缓存的结果；传入 metrics 时记录每个工具的调用指标，
+传入 profiler 时对抽中的调用做性能剖析
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp.types import CallToolResult, ListToolsResult, Tool
+
+from metrics import OperationGroup
+from profiler import ToolProfiler
+from schema_validator import ValidationError, Validator, compile_schema
+
+ToolHandler = Callable[[Dict[str, Any]], Awaitable[CallToolResult]]
+
+class ToolRegistry:
+    """工具名称到处理函数的映射，按注册顺序列出工具"""
+
+    def __init__(self, metrics: Optional[OperationGroup] = None, profiler: Optional[ToolProfiler] = None):
+        self.metrics = metrics
+        self.profiler = profiler
+        self._handlers: Dict[str, Tuple[ToolHandler, Validator]] = {}
+        self._tools: List[Tool] = []
+        self._list_result: Optional[ListToolsResult] = None
+
+    def tool(self, name: str, description: str, input_schema: Dict[str, Any]) -> Callable[[ToolHandler], ToolHandler]:
+        """装饰器：把异步处理函数注册为工具"""
+        def decorator(handler: ToolHandler) -> ToolHandler:
+            self.register(name, description, input_schema, handler)
+            return handler
+        return decorator
+
+    def register(self, name: str, description: str, input_schema: Dict[str, Any],
+                 handler: ToolHandler) -> None:
+        """注册工具并编译参数校验函数，名称重复时报错"""
+        if name in self._handlers:
+            raise ValueError(f"工具已注册: {name}")
+        self._handlers[name] = (handler, compile_schema(input_schema))
+        self._tools.append(Tool(name=name, description=description, inputSchema=input_schema))
+        self._list_result = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._handlers
+
+    def __len__(self) -> int:
+        return len(self._handlers)
+
+    def get(self, name: str) -> Optional[ToolHandler]:
+        """按名称查找处理函数"""
+        entry = self._handlers.get(name)
+        return entry[0] if entry else None
+
+    def validate(self, name: str, arguments: Dict[str, Any]) -> None:
+        """按工具的 inputSchema 校验参数，不符合时抛出 ValidationError"""
+        self._handlers[name][1](arguments)
+
+    def list_tools(self) -> ListToolsResult:
+        """返回缓存的工具列表，注册新工具后重新构建"""
+        if self._list_result is None:
+            self._list_result = ListToolsResult(tools=list(self._tools))
+        return self._list_result
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        """校验参数后分发工具调用，未知工具或参数不合法时返回错误结果"""
+        entry = self._handlers.get(name)
+        if entry is None:
+            return CallToolResult(
+                content=[{"type": "text", "text": f"未知工具: {name}"}],
+                isError=True
+            )
+        if self.profiler is not None and self.profiler.should_sample(name):
+            dispatch = self.profiler.profile(name, lambda: self._dispatch(entry, arguments))
+        else:
+            dispatch = self._dispatch(entry, arguments)
+        if self.metrics is None:
+            return await dispatch
+        # 未知工具不计入指标，避免任意名称撑大指标表
+        operation = self.metrics.start(name)
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await dispatch
+            failed = bool(getattr(result, "isError", False))
+            return result
+        finally:
+            self.metrics.finish(operation, time.perf_counter() - start, failed)
+
+    @staticmethod
+    async def _dispatch(entry: Tuple[ToolHandler, Validator], arguments: Optional[Dict[str, Any]]) -> CallToolResult:
+        handler, validate = entry
+        if arguments is None:
+            arguments = {}
+        try:
+            validate(arguments)
+        except ValidationError as e:
+            return CallToolResult(
+                content=[{"type": "text", "text": f"参数错误: {e}"}],
+                isError=True
+            )
+        return await handler(arguments)